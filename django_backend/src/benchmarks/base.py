@@ -0,0 +1,75 @@
+"""
+Harness of benchmarks, which are run as tests on scaled dataset.
+
+Dataset size is multiplied by BENCHMARK_SCALE and every measurement is repeated BENCHMARK_REPEAT times.
+Every benchmark writes its own report, <report_name>.json in BENCHMARK_REPORT_DIR (current directory by default),
+so reports of benchmarks run together do not overwrite each other.
+"""
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+from collections import Counter
+
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from qazline.catalog_generator import CatalogGenerator
+
+SCALE = float(os.environ.get('BENCHMARK_SCALE', 1))
+REPEAT = int(os.environ.get('BENCHMARK_REPEAT', 5))
+REPORT_DIR = os.environ.get('BENCHMARK_REPORT_DIR', '.')
+MEDIA_ROOT = tempfile.mkdtemp(prefix='qazline-benchmark-')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class Benchmark(APITestCase):
+    """ Builds dataset once for class, collects results of measurements and writes them to report. """
+    report_name = None
+    # Key of results in report
+    results_name = 'results'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.results = []
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        started_at = time.perf_counter()
+        cls.dataset = Counter()
+        for counts in CatalogGenerator(seed=0).generate(n_lessons=max(int(200 * SCALE), 1)):
+            cls.dataset.update(counts)
+        cls.dataset_build_seconds = round(time.perf_counter() - started_at, 3)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        with open(os.path.join(REPORT_DIR, f'{cls.report_name}.json'), 'w') as report_file:
+            json.dump(cls.get_report(), report_file, indent=2)
+
+    @classmethod
+    def get_report(cls):
+        return {
+            'scale': SCALE,
+            'repeat': REPEAT,
+            'python': platform.python_version(),
+            'dataset': cls.dataset,
+            'dataset_build_seconds': cls.dataset_build_seconds,
+            cls.results_name: sorted(cls.results, key=lambda result: result['name']),
+        }
+
+    @staticmethod
+    def time_functions(functions):
+        """ Calls functions by turns REPEAT times, returns their last outputs and timings in milliseconds by key. """
+        timings = {key: [] for key in functions}
+        outputs = {}
+        for _ in range(REPEAT):
+            for key, function in functions.items():
+                started_at = time.perf_counter()
+                outputs[key] = function()
+                timings[key].append((time.perf_counter() - started_at) * 1000)
+        return outputs, timings
@@ -0,0 +1,229 @@
+"""
+Query budgets and latency of API endpoints on scaled dataset.
+
+Usage: python manage.py test benchmarks.bench_endpoints
+
+Every route of qazline.urls is requested BENCHMARK_REPEAT times, the first request is checked
+against query budget of the route. Writes send JSON bodies and change the dataset, so each of them takes
+its own rows. Timings are written to endpoint_benchmark_report.json, see benchmarks.base,
+and can be compared between commits.
+"""
+import statistics
+import time
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from benchmarks.base import Benchmark, REPEAT
+from qazline.models import Lesson, Subject, VideoMaterial, ImageMaterial, AssignmentMaterial, QuizMaterial, Image, Task
+
+
+class EndpointBenchmark(Benchmark):
+    report_name = 'endpoint_benchmark_report'
+    results_name = 'endpoints'
+
+    def measure(self, name, method, urls, budget, expected_status=200, latency_budget_ms=None, payloads=None):
+        """
+        Requests urls one by one, checks the first request against query budget and records timings.
+        payloads are JSON bodies of requests, one by url.
+        Median of timings is checked against latency budget, if route has one.
+        """
+        timings = []
+        n_queries = None
+        for url, payload in zip(urls, payloads or [None] * len(urls)):
+            with CaptureQueriesContext(connection) as queries:
+                started_at = time.perf_counter()
+                response = getattr(self.client, method)(url, payload, format='json')
+                timings.append((time.perf_counter() - started_at) * 1000)
+            self.assertEqual(response.status_code, expected_status, url)
+            if n_queries is None:
+                n_queries = len(queries)
+                self.assertLessEqual(
+                    n_queries, budget,
+                    f'{name} executed {n_queries} queries, budget is {budget}:\n'
+                    + '\n'.join(query['sql'] for query in queries.captured_queries),
+                )
+        median_ms = statistics.median(timings)
+        if latency_budget_ms is not None:
+            self.assertLessEqual(median_ms, latency_budget_ms, f'{name} took {median_ms:.3f} ms')
+        self.results.append({
+            'name': name,
+            'method': method.upper(),
+            'url': urls[0],
+            'queries': n_queries,
+            'budget': budget,
+            'min_ms': round(min(timings), 3),
+            'median_ms': round(median_ms, 3),
+            'max_ms': round(max(timings), 3),
+        })
+
+    def repeat(self, url):
+        return [url] * REPEAT
+
+    @staticmethod
+    def first_subject(model):
+        return Subject.objects.select_related('lesson').filter(material_type=model._meta.model_name).first()
+
+    # Every read is paid with one query for ETag and Last-Modified, see ConditionalGetMixin
+
+    def test_lesson_list(self):
+        self.measure('lesson-list', 'get', self.repeat(reverse('lesson-list')), budget=3)
+
+    def test_lesson_detail(self):
+        lesson = Lesson.objects.first()
+        self.measure('lesson-detail', 'get', self.repeat(reverse('lesson-detail', args=[lesson.pk])), budget=3)
+
+    def test_subject_list(self):
+        self.measure('subject-list', 'get', self.repeat(reverse('subject-list')), budget=2)
+
+    def test_course_tree(self):
+        # The first read builds trees of all lessons by four queries and saves snapshot of every lesson,
+        # the next ones read snapshots by one query
+        url = reverse('course-tree')
+        self.measure('course-tree (cold)', 'get', [url], budget=6 + self.dataset['lesson'])
+        self.measure('course-tree', 'get', self.repeat(url), budget=2)
+
+    def test_subject_material_detail(self):
+        budgets = {VideoMaterial: 2, AssignmentMaterial: 2, ImageMaterial: 3, QuizMaterial: 3}
+        for model, budget in budgets.items():
+            subject = self.first_subject(model)
+            url = reverse('subject-material-detail', args=[subject.lesson.numeral, subject.numeral])
+            self.measure(f'subject-material-detail ({model._meta.model_name})', 'get', self.repeat(url), budget)
+
+    def test_material_lists(self):
+        budgets = {'video-material': 2, 'assignment-material': 2, 'image-material': 3, 'quiz-material': 3}
+        for basename, budget in budgets.items():
+            self.measure(f'{basename}-list', 'get', self.repeat(reverse(f'{basename}-list')), budget)
+
+    def test_material_details(self):
+        # GET images/<pk>/ is resolved to image-delete route, so image-material-detail is not reachable by GET
+        budgets = {
+            'video-material': (VideoMaterial, 2),
+            'assignment-material': (AssignmentMaterial, 2),
+            'quiz-material': (QuizMaterial, 3),
+        }
+        for basename, (model, budget) in budgets.items():
+            url = reverse(f'{basename}-detail', args=[model.objects.first().pk])
+            self.measure(f'{basename}-detail', 'get', self.repeat(url), budget)
+
+    def test_task_detail(self):
+        url = reverse('task-detail', args=[Task.objects.first().pk])
+        self.measure('task-detail', 'get', self.repeat(url), budget=2)
+
+    # Every write also invalidates snapshots of lessons and bumps revision of written table, see qazline.signals
+
+    def test_lesson_create(self):
+        first_numeral = Lesson.objects.order_by('-numeral').first().numeral + 1
+        payloads = [{'numeral': first_numeral + i, 'title': f'lesson {i}'} for i in range(REPEAT)]
+        url = reverse('lesson-list')
+        self.measure('lesson-list', 'post', [url] * REPEAT, budget=5, expected_status=201, payloads=payloads)
+
+    def test_lesson_update(self):
+        url = reverse('lesson-detail', args=[Lesson.objects.first().pk])
+        payloads = [{'title': f'lesson {i}'} for i in range(REPEAT)]
+        self.measure('lesson-detail', 'patch', self.repeat(url), budget=6, payloads=payloads)
+
+    def test_material_create(self):
+        lesson = Lesson.objects.first()
+        first_numeral = lesson.subjects.order_by('-numeral').first().numeral + 1
+        task = {'question': 'Capital of Kazakhstan is _____', 'answers': [{'answer_text': 'Astana'}]}
+        # Subject and material are saved one after another, tasks of quiz are inserted by one query
+        budgets = {
+            'video-material': ({'url': 'http://sample.com'}, 10),
+            'assignment-material': ({'task': 'assignment'}, 10),
+            'quiz-material': ({'tasks': [task] * 5}, 15),
+        }
+        for n, (basename, (content, budget)) in enumerate(budgets.items()):
+            payloads = [
+                {
+                    'lesson': lesson.pk, 'subject_numeral': first_numeral + n * REPEAT + i,
+                    'subject_title': f'subject {i}', 'topic': f'topic {i}', **content,
+                } for i in range(REPEAT)
+            ]
+            url = reverse(f'{basename}-list')
+            self.measure(f'{basename}-list', 'post', [url] * REPEAT, budget, expected_status=201, payloads=payloads)
+
+    def test_material_update(self):
+        budgets = {
+            'video-material': (VideoMaterial, 9),
+            'assignment-material': (AssignmentMaterial, 9),
+            'quiz-material': (QuizMaterial, 12),
+        }
+        for basename, (model, budget) in budgets.items():
+            url = reverse(f'{basename}-detail', args=[model.objects.first().pk])
+            payloads = [{'topic': f'topic {i}', 'subject_title': f'subject {i}'} for i in range(REPEAT)]
+            self.measure(f'{basename}-detail', 'patch', self.repeat(url), budget, payloads=payloads)
+
+    def test_task_update(self):
+        url = reverse('task-detail', args=[Task.objects.first().pk])
+        payloads = [
+            {'question': f'Question {i} is _____', 'answers': [{'answer_text': f'answer {i}'}]} for i in range(REPEAT)
+        ]
+        self.measure('task-detail', 'put', self.repeat(url), budget=4, payloads=payloads)
+
+    def test_task_delete(self):
+        urls = [reverse('task-detail', args=[pk]) for pk in Task.objects.values_list('pk', flat=True)[:REPEAT]]
+        self.measure('task-detail', 'delete', urls, budget=4, expected_status=204)
+
+    def test_image_delete(self):
+        # Files of image are scheduled for deletion by one INSERT, see qazline.media_collector
+        urls = [reverse('image-delete', args=[pk]) for pk in Image.objects.values_list('pk', flat=True)[:REPEAT]]
+        self.measure('image-delete', 'delete', urls, budget=6, expected_status=204)
+
+    def test_lesson_reorder(self):
+        # Moved subjects are renumbered by one UPDATE, every request reverses order of subjects
+        lesson = Lesson.objects.first()
+        subjects = list(lesson.subjects.order_by('numeral').values_list('pk', flat=True))
+        payloads = [{'subjects': subjects[::-1] if i % 2 == 0 else subjects} for i in range(REPEAT)]
+        url = reverse('lesson-reorder', args=[lesson.pk])
+        self.measure('lesson-reorder', 'post', self.repeat(url), budget=8, payloads=payloads)
+
+    def test_material_batch_update(self):
+        # Number of queries depends on types of materials in batch, not on number of updates
+        subjects = list(
+            Subject.objects.exclude(material_type=Subject.MaterialType.NO_MATERIAL).order_by('pk')
+            .values_list('pk', flat=True)[:100]
+        )
+        url = reverse('material-batch-update')
+        for n_updates in (10, 100):
+            payloads = [
+                {'updates': [{'subject': pk, 'topic': f'topic {i}'} for pk in subjects[:n_updates]]}
+                for i in range(REPEAT)
+            ]
+            self.measure(
+                f'material-batch-update ({n_updates} updates)', 'patch', self.repeat(url), budget=13, payloads=payloads,
+            )
+
+    def test_material_bulk_delete(self):
+        # Every table is cleaned by one DELETE, number of queries does not depend on number of materials
+        subjects = list(
+            Subject.objects.exclude(material_type=Subject.MaterialType.NO_MATERIAL).order_by('pk')
+            .values_list('pk', flat=True)[:20 * REPEAT]
+        )
+        payloads = [{'subjects': subjects[i::REPEAT]} for i in range(REPEAT)]
+        url = reverse('material-bulk-delete')
+        self.measure('material-bulk-delete', 'post', self.repeat(url), budget=15, payloads=payloads)
+
+    def test_lesson_materials_delete(self):
+        urls = [reverse('lesson-materials', args=[pk]) for pk in Lesson.objects.values_list('pk', flat=True)[:REPEAT]]
+        self.measure('lesson-materials', 'delete', urls, budget=16)
+
+    def test_quiz_grade(self):
+        # Quiz and answer keys of its tasks are read once for any number of attempts
+        quiz = QuizMaterial.objects.first()
+        answers = {
+            pk: [''] * n_answers if task_type == Task.TaskType.FILL_IN_THE_BLANK else [0]
+            for pk, task_type, n_answers in quiz.tasks.values_list('pk', 'task_type', 'n_answers')
+        }
+        url = reverse('quiz-material-grade', args=[quiz.pk])
+        payloads = [{'answers': answers}] * REPEAT
+        self.measure('quiz-material-grade', 'post', self.repeat(url), budget=2, payloads=payloads)
+        payloads = [{'attempts': [{'answers': answers}] * 100}] * REPEAT
+        self.measure('quiz-material-grade (100 attempts)', 'post', self.repeat(url), budget=2, payloads=payloads)
+
+    def test_search(self):
+        # Common words and prefixes match most rows of catalog, latency must not grow with number of matches
+        for q in ('qa', 'qaza', 'su la ra'):
+            url = f"{reverse('search')}?q={q}"
+            self.measure(f'search ({q})', 'get', self.repeat(url), budget=2, latency_budget_ms=500)
@@ -0,0 +1,70 @@
+"""
+JSONRenderer and JSONParser of DRF against FastJSONRenderer and FastJSONParser of qazline.renderers on scaled dataset.
+
+Usage: python manage.py test benchmarks.bench_renderers
+
+Pages of quizzes are read with answers of tasks decoded by JSONField and rendered by both renderers, and read with
+answers as stored JSON (RawJSON) by QuizMaterialReadSerializer and rendered by FastJSONRenderer. Outputs are checked
+to be the same JSON. Rendered pages are parsed by both parsers. Every page is read BENCHMARK_REPEAT times, timings
+include queries and are written to renderer_benchmark_report.json, see benchmarks.base.
+"""
+import io
+import json
+import statistics
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from benchmarks.base import Benchmark
+from qazline.models import QuizMaterial
+from qazline.read_serializers import QuizMaterialReadSerializer
+from qazline.renderers import FastJSONRenderer, FastJSONParser
+
+PAGE_SIZE = 100
+
+
+class RendererBenchmark(Benchmark):
+    report_name = 'renderer_benchmark_report'
+    results_name = 'pages'
+
+    @classmethod
+    def get_report(cls):
+        return {**super().get_report(), 'page_size': PAGE_SIZE}
+
+    def measure(self, name, functions, content=None):
+        """ Times functions returning output of page or parsed content, checks that outputs are the same JSON. """
+        outputs, timings = self.time_functions(functions)
+        baseline, *others = functions
+        for key in others:
+            self.assertEqual(self.decode(outputs[key]), self.decode(outputs[baseline]), f'{name}: {key}')
+        medians = {key: statistics.median(values) for key, values in timings.items()}
+        self.results.append({
+            'name': name,
+            'bytes': len(outputs[baseline] if content is None else content),
+            **{f'{key}_median_ms': round(median, 3) for key, median in medians.items()},
+            **{f'{key}_speedup': round(medians[baseline] / medians[key], 2) for key in others},
+        })
+
+    @staticmethod
+    def decode(output):
+        return json.loads(output) if isinstance(output, bytes) else output
+
+    def test_quiz_page(self):
+        materials = list(QuizMaterial.objects.order_by('pk')[:PAGE_SIZE])
+
+        def read_page(raw_answers):
+            return QuizMaterialReadSerializer(materials, many=True, raw_answers=raw_answers).data
+
+        self.measure('quiz page', {
+            'json_renderer': lambda: JSONRenderer().render(read_page(raw_answers=False)),
+            'fast_json_renderer': lambda: FastJSONRenderer().render(read_page(raw_answers=False)),
+            'raw_answers': lambda: FastJSONRenderer().render(read_page(raw_answers=True)),
+        })
+
+    def test_quiz_page_parsing(self):
+        materials = list(QuizMaterial.objects.order_by('pk')[:PAGE_SIZE])
+        content = JSONRenderer().render(QuizMaterialReadSerializer(materials, many=True, raw_answers=False).data)
+        self.measure('quiz page parsing', {
+            'json_parser': lambda: JSONParser().parse(io.BytesIO(content)),
+            'fast_json_parser': lambda: FastJSONParser().parse(io.BytesIO(content)),
+        }, content)
@@ -0,0 +1,88 @@
+"""
+Serializers of qazline.serializers against read serializers of qazline.read_serializers on scaled dataset.
+
+Usage: python manage.py test benchmarks.bench_serializers
+
+Pages of lessons and of materials of every type are read and rendered to JSON by both, outputs are checked
+to be equal byte for byte. Every page is read BENCHMARK_REPEAT times, timings include queries and rendering
+and are written to serializer_benchmark_report.json, see benchmarks.base.
+"""
+import statistics
+
+from django.db.models import Prefetch
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from benchmarks.base import Benchmark
+from qazline.models import Lesson, Subject, get_subclasses
+from qazline.read_serializers import LessonReadSerializer, MATERIAL_READ_SERIALIZERS
+from qazline.renderers import FastJSONRenderer
+from qazline.serializers import LessonSerializer, MATERIAL_SERIALIZERS
+
+PAGE_SIZE = 100
+
+
+class SerializerBenchmark(Benchmark):
+    report_name = 'serializer_benchmark_report'
+    results_name = 'pages'
+    renderer = FastJSONRenderer()
+
+    @classmethod
+    def get_report(cls):
+        return {**super().get_report(), 'page_size': PAGE_SIZE}
+
+    def setUp(self):
+        self.context = {'request': Request(APIRequestFactory().get('/'))}
+
+    @staticmethod
+    def get_materials(model):
+        return model.objects.prefetch_related(*model.prefetch_children)
+
+    def measure(self, name, serialize, read):
+        """ Times both functions returning data of page, checks that rendered outputs are the same. """
+        outputs, timings = self.time_functions({
+            'serializer': lambda: self.renderer.render(serialize()),
+            'read_serializer': lambda: self.renderer.render(read()),
+        })
+        self.assertEqual(outputs['read_serializer'], outputs['serializer'], name)
+        medians = {key: statistics.median(values) for key, values in timings.items()}
+        self.results.append({
+            'name': name,
+            'bytes': len(outputs['serializer']),
+            'serializer_median_ms': round(medians['serializer'], 3),
+            'read_serializer_median_ms': round(medians['read_serializer'], 3),
+            'speedup': round(medians['serializer'] / medians['read_serializer'], 2),
+        })
+
+    def test_lesson_page(self):
+        lessons = Lesson.objects.prefetch_related(
+            Prefetch('subjects', queryset=Subject.objects.order_by('numeral')),
+        ).order_by('numeral')[:PAGE_SIZE]
+        rows = Lesson.objects.values(*LessonReadSerializer.fields).order_by('numeral')[:PAGE_SIZE]
+        self.measure(
+            'lesson page',
+            lambda: LessonSerializer(lessons.all(), many=True, context=self.context).data,
+            lambda: LessonReadSerializer(rows.all(), many=True, context=self.context).data,
+        )
+
+    def test_material_pages(self):
+        for model in get_subclasses():
+            material_type = model._meta.model_name
+            materials = self.get_materials(model).order_by('pk')[:PAGE_SIZE]
+            self.measure(
+                f'{material_type} page',
+                lambda: MATERIAL_SERIALIZERS[material_type](materials.all(), many=True, context=self.context).data,
+                lambda: MATERIAL_READ_SERIALIZERS[material_type](materials.all(), many=True, context=self.context).data,
+            )
+
+    def test_material_details(self):
+        for model in get_subclasses():
+            material_type = model._meta.model_name
+            pk = model.objects.order_by('pk').values_list('pk', flat=True).first()
+            self.measure(
+                f'{material_type} detail',
+                lambda: MATERIAL_SERIALIZERS[material_type](
+                    self.get_materials(model).get(pk=pk), context=self.context,
+                ).data,
+                lambda: MATERIAL_READ_SERIALIZERS[material_type](model.objects.get(pk=pk), context=self.context).data,
+            )
@@ -0,0 +1,38 @@
+"""
+Micro-benchmark of Task.answers validation.
+
+Usage: python -m benchmarks.bench_validators
+"""
+import timeit
+
+import jsonschema
+
+from qazline.validators import ANSWER_JSON_FIELD_SCHEMA, JSONSchemaValidator
+
+N_RUNS = 20000
+
+ANSWERS = [
+    {'answer_text': 'John', 'correct': True},
+    {'answer_text': 'James', 'correct': False},
+    {'answer_text': 'Jack', 'correct': False},
+]
+
+
+def validate_by_jsonschema():
+    jsonschema.validate(ANSWERS, ANSWER_JSON_FIELD_SCHEMA)
+
+
+def main():
+    validator = JSONSchemaValidator(limit_value=ANSWER_JSON_FIELD_SCHEMA)
+    answers_list = [ANSWERS] * N_RUNS
+    results = {
+        'jsonschema.validate': timeit.timeit(validate_by_jsonschema, number=N_RUNS),
+        'JSONSchemaValidator': timeit.timeit(lambda: validator(ANSWERS), number=N_RUNS),
+        'JSONSchemaValidator.validate_many': timeit.timeit(lambda: validator.validate_many(answers_list), number=1),
+    }
+    for name, seconds in results.items():
+        print(f'{name:<36} {seconds / N_RUNS * 1e6:8.2f} us per task')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""
+PostgreSQL backend, which takes connections from bounded per-process pool instead of opening them
+on every request. Options of pool are read from POOL key of database settings.
+"""
+from django.db.backends.postgresql import base, creation
+
+from config.postgresql_pool.pool import get_pool, close_idle_connections
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Database can not be dropped while pooled connections are open
+        close_idle_connections(database=test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pool = None
+        self._pooled_connection = None
+
+    def get_new_connection(self, conn_params):
+        def connect():
+            connection = super(DatabaseWrapper, self).get_new_connection(conn_params)
+            return connection, self.isolation_level
+
+        self._pool = get_pool(self.alias, conn_params, self.settings_dict.get('POOL', {}), connect)
+        self._pooled_connection = self._pool.acquire()
+        self.isolation_level = self._pooled_connection.isolation_level
+        return self._pooled_connection.connection
+
+    def _close(self):
+        if self.connection is not None:
+            pooled_connection, self._pooled_connection = self._pooled_connection, None
+            self._pool.release(pooled_connection)
@@ -0,0 +1,202 @@
+import collections
+import threading
+import time
+
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    pass
+
+
+class PooledConnection:
+
+    def __init__(self, connection, isolation_level):
+        self.connection = connection
+        self.isolation_level = isolation_level
+        self.created_at = time.monotonic()
+        self.released_at = self.created_at
+
+
+class ConnectionPool:
+    """
+    Bounded pool of psycopg2 connections of one database.
+    Idle connections are pinged before reuse when they were idle longer than ping_interval,
+    connections older than max_lifetime are closed instead of being reused.
+    """
+
+    def __init__(self, connect, max_size=10, max_lifetime=30 * 60, ping_interval=30, acquire_timeout=10):
+        self.connect = connect
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.ping_interval = ping_interval
+        self.acquire_timeout = acquire_timeout
+        self._idle = collections.deque()
+        self._condition = threading.Condition()
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._counters = collections.Counter()
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def acquire(self):
+        started_at = time.monotonic()
+        with self._condition:
+            self._waiting += 1
+            try:
+                pooled = self._take(started_at)
+            finally:
+                self._waiting -= 1
+            self._in_use += 1
+            wait = time.monotonic() - started_at
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+            self._counters['acquired'] += 1
+        # Connections are checked and opened outside of lock, place in pool is already reserved
+        if pooled is not None and not self._is_healthy(pooled):
+            self._close(pooled)
+            pooled = None
+        if pooled is None:
+            try:
+                pooled = PooledConnection(*self.connect())
+            except Exception:
+                with self._condition:
+                    self._size -= 1
+                    self._in_use -= 1
+                    self._condition.notify()
+                raise
+            with self._condition:
+                self._counters['created'] += 1
+        return pooled
+
+    def release(self, pooled):
+        reusable = self._reset(pooled) and not self._is_expired(pooled)
+        if not reusable:
+            self._close(pooled)
+        with self._condition:
+            self._in_use -= 1
+            if reusable:
+                pooled.released_at = time.monotonic()
+                self._idle.append(pooled)
+            else:
+                self._size -= 1
+            self._condition.notify()
+
+    def close_idle(self):
+        with self._condition:
+            idle, self._idle = list(self._idle), collections.deque()
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for pooled in idle:
+            self._close(pooled)
+
+    def get_stats(self):
+        with self._condition:
+            n_acquired = self._counters['acquired']
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'acquired': n_acquired,
+                'created': self._counters['created'],
+                'closed': self._counters['closed'],
+                'failed_checks': self._counters['failed_checks'],
+                'timeouts': self._counters['timeouts'],
+                'average_wait_ms': self._total_wait / n_acquired * 1000 if n_acquired else 0.0,
+                'max_wait_ms': self._max_wait * 1000,
+            }
+
+    def _take(self, started_at):
+        while True:
+            if self._idle:
+                # The most recently used connection is the most likely one to be alive
+                return self._idle.pop()
+            if self._size < self.max_size:
+                self._size += 1
+                return None
+            remaining = self.acquire_timeout - (time.monotonic() - started_at)
+            if remaining <= 0:
+                self._counters['timeouts'] += 1
+                raise PoolTimeout(f'No database connection is available in {self.acquire_timeout} seconds')
+            self._condition.wait(remaining)
+
+    def _is_expired(self, pooled):
+        return time.monotonic() - pooled.created_at > self.max_lifetime
+
+    def _is_healthy(self, pooled):
+        connection = pooled.connection
+        if connection.closed or self._is_expired(pooled):
+            return False
+        if time.monotonic() - pooled.released_at < self.ping_interval:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if not connection.autocommit:
+                connection.rollback()
+        except psycopg2.Error:
+            with self._condition:
+                self._counters['failed_checks'] += 1
+            return False
+        return True
+
+    @staticmethod
+    def _reset(pooled):
+        """ Rolls back transaction left by the previous user, returns whether connection can be reused. """
+        connection = pooled.connection
+        if connection.closed:
+            return False
+        try:
+            if connection.info.transaction_status != TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def _close(self, pooled):
+        try:
+            pooled.connection.close()
+        except psycopg2.Error:
+            pass
+        with self._condition:
+            self._counters['closed'] += 1
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, conn_params, options, connect):
+    key = (alias, tuple(sorted((name, str(value)) for name, value in conn_params.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(
+                connect,
+                max_size=options.get('MAX_SIZE', 10),
+                max_lifetime=options.get('MAX_LIFETIME', 30 * 60),
+                ping_interval=options.get('PING_INTERVAL', 30),
+                acquire_timeout=options.get('ACQUIRE_TIMEOUT', 10),
+            )
+    return pool
+
+
+def close_idle_connections(database=None):
+    with _pools_lock:
+        pools = [(conn_params, pool) for (_, conn_params), pool in _pools.items()]
+    for conn_params, pool in pools:
+        if database is None or ('database', database) in conn_params:
+            pool.close_idle()
+
+
+def get_pools_stats():
+    with _pools_lock:
+        pools = list(_pools.items())
+    return [
+        {'alias': alias, 'database': dict(conn_params).get('database'), **pool.get_stats()}
+        for (alias, conn_params), pool in pools
+    ]
@@ -0,0 +1,10 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+
+from config.postgresql_pool.pool import get_pools_stats
+
+
+@staff_member_required
+def pool_stats(request):
+    """ Statistics of database connection pools of this process, only for staff. """
+    return JsonResponse({'pools': get_pools_stats()})
@@ -26,12 +26,14 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'corsheaders',
     'qazline.apps.QazlineConfig',
 ]
 
 MIDDLEWARE = [
+    'qazline.middleware.QueryInstrumentationMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -46,6 +48,17 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
     ),
     'DEFAULT_FILTER_BACKENDS': ('django_filters.rest_framework.DjangoFilterBackend',),
+    'DEFAULT_RENDERER_CLASSES': (
+        'qazline.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'qazline.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    'DEFAULT_PAGINATION_CLASS': 'qazline.pagination.KeysetPagination',
+    'PAGE_SIZE': int(os.environ.get('API_PAGE_SIZE', 100)),
 }
 
 ROOT_URLCONF = 'config.urls'
@@ -72,14 +85,28 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
 
-DATABASES = {  # TODO: OPTIMIZATION: CONN_MAX_AGE
+DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # PostgreSQL backend with bounded per-process connection pool, see config/postgresql_pool
+        'ENGINE': 'config.postgresql_pool',
         'NAME': os.environ['POSTGRES_DB'],
         'USER': os.environ['POSTGRES_USER'],
         'PASSWORD': os.environ['POSTGRES_PASSWORD'],
         'HOST': os.environ['POSTGRES_HOST'],
         'PORT': os.environ['POSTGRES_PORT'],
+        # Connection is returned to pool at the end of every request
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MAX_SIZE': int(os.environ.get('POSTGRES_POOL_MAX_SIZE', 10)),
+            'MAX_LIFETIME': int(os.environ.get('POSTGRES_POOL_MAX_LIFETIME', 30 * 60)),
+            'PING_INTERVAL': int(os.environ.get('POSTGRES_POOL_PING_INTERVAL', 30)),
+            'ACQUIRE_TIMEOUT': int(os.environ.get('POSTGRES_POOL_ACQUIRE_TIMEOUT', 10)),
+        },
+        # Search parses Kazakh and Russian texts, so test database is UTF8 whatever encoding of template1 is
+        'TEST': {
+            'CHARSET': 'UTF8',
+            'TEMPLATE': 'template0',
+        },
     }
 }
 
@@ -118,10 +145,17 @@ LOGGING = {
                             'datefmt': '%d/%m/%Y %H:%M:%S'}},
     'handlers': {'console': {'level': 'INFO', 'class': 'logging.StreamHandler', 'formatter': 'main'}},
     'loggers': {
-        'django.db.backends': {'handlers': ['console'], 'propagate': False, 'level': 'DEBUG'},
+        'qazline': {'handlers': ['console'], 'propagate': False, 'level': 'INFO'},
     }
 }
 logging.config.dictConfig(LOGGING)
+
+# Per-request query summary of qazline.middleware.QueryInstrumentationMiddleware
+QUERY_INSTRUMENTATION = {
+    'SAMPLE_RATE': float(os.environ.get('QUERY_INSTRUMENTATION_SAMPLE_RATE', 0.1)),
+    'N_PLUS_ONE_THRESHOLD': int(os.environ.get('QUERY_INSTRUMENTATION_N_PLUS_ONE_THRESHOLD', 5)),
+}
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
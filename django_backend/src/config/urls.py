@@ -1,12 +1,19 @@
+import re
+
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 
-from qazline import urls as qazline_urls
+from config.postgresql_pool.views import pool_stats
+from qazline import async_urls as qazline_async_urls, urls as qazline_urls
+from qazline.views import serve_media
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('monitoring/db-pool/', pool_stats, name='db-pool-stats'),
+    path('async/', include(qazline_async_urls)),
     path('', include(qazline_urls)),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # Unlike static(), mounted without DEBUG too, so media is always served with immutable cache headers
+    re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve_media, name='media'),
+]
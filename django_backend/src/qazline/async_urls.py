@@ -0,0 +1,20 @@
+from django.urls import path
+
+from qazline.async_views import (
+    AsyncLessonListView,
+    AsyncLessonDetailView,
+    AsyncSubjectListView,
+    AsyncSubjectMaterialDetailView,
+    AsyncQuizMaterialDetailView,
+)
+
+urlpatterns = [
+    path('lessons/', AsyncLessonListView.as_view(), name='async-lesson-list'),
+    path('lessons/<int:pk>/', AsyncLessonDetailView.as_view(), name='async-lesson-detail'),
+    path('subjects/', AsyncSubjectListView.as_view(), name='async-subject-list'),
+    path(
+        'lessons/<int:lesson_numeral>/subjects/<int:subject_numeral>/',
+        AsyncSubjectMaterialDetailView.as_view(), name='async-subject-material-detail'
+    ),
+    path('quizzes/<int:pk>/', AsyncQuizMaterialDetailView.as_view(), name='async-quiz-material-detail'),
+]
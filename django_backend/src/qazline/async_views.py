@@ -0,0 +1,150 @@
+"""
+Async read-only views for ASGI deployment, mounted under async/ next to the sync API.
+
+Django 3.1 has no async ORM interface, so database access and serialization of every request run in thread pool
+by one sync_to_async call. The call is not thread sensitive, so concurrent requests use different threads and
+pooled connections, and the event loop is free to serve slow clients in the meantime.
+Responses are the same as responses of the sync views.
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.views import View
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+
+from qazline.models import Lesson, Subject, QuizMaterial, Task
+from qazline.read_serializers import (
+    LessonReadSerializer, RawAnswersQuizMaterialReadSerializer, ENDPOINT_READ_SERIALIZERS,
+)
+from qazline.renderers import FastJSONRenderer
+from qazline.serializers import SubjectSerializer
+from qazline.views import ConditionalGetMixin, CONTENT_MODELS, get_subject_material
+
+
+def database_sync_to_async(func):
+    """
+    Runs function in thread pool, database connection of the thread is closed (returned to pool) after the call,
+    as it would be after sync request.
+    """
+    def inner(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(inner, thread_sensitive=False)
+
+
+class AsyncReadView(ConditionalGetMixin, View):
+    """
+    View of Django 3.1 does not support async handlers, so view function is wrapped in coroutine function here.
+    Instance of queryset by pk is serialized by serializer_class, or page of queryset, if there is pagination_class.
+    """
+    http_method_names = ['get', 'head', 'options']
+    renderer = FastJSONRenderer()
+    queryset = None
+    serializer_class = None
+    pagination_class = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+
+        async def async_view(request, *args, **kwargs):
+            return await view(request, *args, **kwargs)
+
+        return functools.update_wrapper(async_view, view)
+
+    async def get(self, request, *args, **kwargs):
+        return await database_sync_to_async(self.get_response)(request, *args, **kwargs)
+
+    async def options(self, request, *args, **kwargs):
+        return super().options(request, *args, **kwargs)
+
+    async def http_method_not_allowed(self, request, *args, **kwargs):
+        return super().http_method_not_allowed(request, *args, **kwargs)
+
+    def get_response(self, request, *args, **kwargs):
+        request = Request(request)
+        try:
+            if self.pagination_class is not None:
+                return self.get_conditional_response(self.render_page, request)
+            # Object is looked up before validators are checked, so request of missing object is answered by 404
+            instance = self.get_object(**kwargs)
+            return self.get_conditional_response(self.render_object, request, instance)
+        except Exception as exc:
+            response = exception_handler(exc, {'view': self, 'request': request})
+            if response is None:
+                raise
+            return self.json_response(response.data, status=response.status_code)
+
+    def render_object(self, request, instance):
+        serializer = self.get_serializer_class(instance)(instance, context={'request': request})
+        return self.json_response(serializer.data)
+
+    def render_page(self, request):
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(self.queryset.all(), request, view=self)
+        data = self.serializer_class(page, many=True, context={'request': request}).data
+        return self.json_response(data, headers=paginator.get_headers())
+
+    def get_media_type(self, request):
+        # Content is not negotiated, responses are always rendered by renderer
+        return self.renderer.media_type
+
+    def get_object(self, pk):
+        return get_object_or_404(self.queryset, pk=pk)
+
+    def get_serializer_class(self, instance):
+        return self.serializer_class
+
+    def json_response(self, data, status=200, headers=None):
+        response = HttpResponse(self.renderer.render(data), content_type='application/json', status=status)
+        for name, value in (headers or {}).items():
+            response[name] = value
+        return response
+
+
+class AsyncListView(AsyncReadView):
+    pagination_class = api_settings.DEFAULT_PAGINATION_CLASS
+
+
+class AsyncLessonListView(AsyncListView):
+    revision_models = (Lesson, Subject)
+    queryset = Lesson.objects.values(*LessonReadSerializer.fields)
+    serializer_class = LessonReadSerializer
+
+
+class AsyncLessonDetailView(AsyncReadView):
+    revision_models = (Lesson, Subject)
+    queryset = Lesson.objects.values(*LessonReadSerializer.fields)
+    serializer_class = LessonReadSerializer
+
+
+class AsyncSubjectListView(AsyncListView):
+    revision_models = (Subject,)
+    keyset_ordering = ('lesson_id', 'numeral', 'id')
+    queryset = Subject.objects.all()
+    serializer_class = SubjectSerializer
+
+
+class AsyncSubjectMaterialDetailView(AsyncReadView):
+    revision_models = CONTENT_MODELS
+
+    def get_object(self, lesson_numeral, subject_numeral):
+        return get_subject_material(lesson_numeral, subject_numeral)
+
+    def get_serializer_class(self, instance):
+        return ENDPOINT_READ_SERIALIZERS[instance.subject.material_type]
+
+
+class AsyncQuizMaterialDetailView(AsyncReadView):
+    revision_models = (QuizMaterial, Task)
+    queryset = QuizMaterial.objects.all()
+    serializer_class = RawAnswersQuizMaterialReadSerializer
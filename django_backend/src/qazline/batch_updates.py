@@ -0,0 +1,102 @@
+"""
+Batch partial updates of materials of different types and of their subjects.
+
+Updates of the same material are coalesced, so every row is written once, and rows of every table are written
+by one bulk_update. The whole batch is applied in one transaction or, if any update is invalid, not applied.
+"""
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+
+from qazline.models import Lesson, Subject, MATERIAL_MODELS, SUBJECT_NUMERAL_CONSTRAINT
+from qazline.revisions import bump_revisions
+from qazline.snapshots import invalidate_lessons
+
+# Fields of update, which are stored in subject of material
+SUBJECT_FIELDS = {'subject_title': 'title', 'subject_numeral': 'numeral', 'lesson': 'lesson_id'}
+
+
+class MaterialBatchUpdater:
+
+    def __init__(self, updates):
+        self.updates = updates
+
+    def apply(self):
+        """
+        Returns results of updates in order of updates: id of subject, material type and new values of fields.
+        Raises ValidationError with errors of updates in the same order.
+        """
+        try:
+            with transaction.atomic():
+                return self._apply()
+        except IntegrityError as error:
+            diagnostics = getattr(error.__cause__, 'diag', None)
+            if diagnostics is None or diagnostics.constraint_name != SUBJECT_NUMERAL_CONSTRAINT:
+                raise
+            raise serializers.ValidationError({'updates': ['Numerals of subjects must be unique in lesson']})
+
+    def _apply(self):
+        # Rows are locked, so values of fields, which are not updated, are not overwritten by stale ones
+        subjects = Subject.objects.select_for_update().in_bulk({update['subject'] for update in self.updates})
+        self._check(subjects)
+
+        subject_changes = {}
+        material_changes = {}
+        for update in self.updates:
+            subject_pk = update['subject']
+            for name, value in update.items():
+                if name in SUBJECT_FIELDS:
+                    subject_changes.setdefault(subject_pk, {})[SUBJECT_FIELDS[name]] = value
+                elif name != 'subject':
+                    material_changes.setdefault(subject_pk, {})[name] = value
+
+        lesson_pks = {subjects[pk].lesson_id for pk in (*subject_changes, *material_changes)}
+        changed_models = set()
+        for material_type, model in MATERIAL_MODELS.items():
+            changes = {
+                pk: fields for pk, fields in material_changes.items() if subjects[pk].material_type == material_type
+            }
+            if changes:
+                self._bulk_update(model, model.objects.select_for_update().filter(pk__in=changes), changes)
+                changed_models.add(model)
+        if subject_changes:
+            self._bulk_update(Subject, [subjects[pk] for pk in subject_changes], subject_changes)
+            lesson_pks.update(fields['lesson_id'] for fields in subject_changes.values() if 'lesson_id' in fields)
+            changed_models.add(Subject)
+
+        # bulk_update skips signals
+        invalidate_lessons(lesson_pks - {None})
+        bump_revisions(changed_models)
+        return [
+            {'subject': update['subject'], 'material_type': subjects[update['subject']].material_type, **update}
+            for update in self.updates
+        ]
+
+    def _check(self, subjects):
+        lesson_pks = {update['lesson'] for update in self.updates if 'lesson' in update}
+        existing_lesson_pks = set(Lesson.objects.filter(pk__in=lesson_pks).values_list('pk', flat=True))
+        errors = []
+        for update in self.updates:
+            subject = subjects.get(update['subject'])
+            update_errors = {}
+            if subject is None or not subject.material_type:
+                update_errors['subject'] = [f'Material of subject {update["subject"]} does not exist']
+            else:
+                allowed_fields = {'subject', *SUBJECT_FIELDS, *MATERIAL_MODELS[subject.material_type].content_fields}
+                for name in update.keys() - allowed_fields:
+                    update_errors[name] = [f'Material of type {subject.material_type} has no field {name}']
+            if 'lesson' in update and update['lesson'] not in existing_lesson_pks:
+                update_errors['lesson'] = [f'Lesson {update["lesson"]} does not exist']
+            errors.append(update_errors)
+        if any(errors):
+            raise serializers.ValidationError({'updates': errors})
+
+    @staticmethod
+    def _bulk_update(model, instances, changes):
+        """ Sets changed fields of instances and writes them by one bulk_update. """
+        instances = list(instances)
+        fields = set()
+        for instance in instances:
+            for name, value in changes[instance.pk].items():
+                setattr(instance, name, value)
+                fields.add(name)
+        model.objects.bulk_update(instances, sorted(fields))
@@ -0,0 +1,63 @@
+"""
+Set-based deletion of materials together with their subjects, images and tasks.
+
+Deletion of one material deletes its subject by signal, and collector deletes children row by row.
+Here every table is cleaned by one DELETE in one transaction, children before parents, with the same end state:
+files of images are scheduled for deletion, snapshots of lessons are invalidated and revisions are bumped.
+"""
+from django.db import connection, transaction
+
+from qazline.media_collector import schedule_file_deletion
+from qazline.models import Subject, Image, ImageProcessingJob, Task, MATERIAL_MODELS
+from qazline.revisions import bump_revisions
+from qazline.snapshots import invalidate_lessons
+
+
+def delete_rows(model, field_name, values):
+    """
+    Deletes rows of model, whose field is one of values, by single DELETE without collector and signals.
+    Returns number of deleted rows.
+    """
+    if not values:
+        return 0
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(model._meta.get_field(field_name).column)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {column} = ANY(%s)', [list(values)])
+        return cursor.rowcount
+
+
+def delete_materials(subjects):
+    """ Deletes materials of subjects from queryset and the subjects, returns numbers of deleted rows by model name. """
+    with transaction.atomic():
+        rows = list(subjects.exclude(material_type=Subject.MaterialType.NO_MATERIAL).select_for_update().values_list(
+            'pk', 'lesson_id', 'material_type',
+        ))
+        pks_by_type = {material_type: [] for material_type in MATERIAL_MODELS}
+        for pk, _, material_type in rows:
+            pks_by_type[material_type].append(pk)
+        image_material_pks = pks_by_type[Subject.MaterialType.IMAGE]
+        images = list(Image.objects.filter(image_material_id__in=image_material_pks).values_list(
+            'pk', 'image', 'thumbnail',
+        ))
+        file_names = [name for _, *names in images for name in names if name]
+
+        # Rows referring to deleted ones are already deleted
+        deletions = [
+            (ImageProcessingJob, 'image', [pk for pk, _, _ in images]),
+            (Image, 'image_material', image_material_pks),
+            (Task, 'quiz_material', pks_by_type[Subject.MaterialType.QUIZ]),
+            *((model, 'subject', pks_by_type[name]) for name, model in MATERIAL_MODELS.items()),
+            (Subject, 'id', [pk for pk, _, _ in rows]),
+        ]
+        counts = {
+            model._meta.model_name: delete_rows(model, field_name, values) for model, field_name, values in deletions
+        }
+
+        schedule_file_deletion(file_names)
+        invalidate_lessons({lesson_pk for _, lesson_pk, _ in rows if lesson_pk is not None})
+        bump_revisions([
+            model for model, _, _ in deletions
+            if model is not ImageProcessingJob and counts[model._meta.model_name]
+        ])
+    return counts
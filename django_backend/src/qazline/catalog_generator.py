@@ -0,0 +1,149 @@
+"""
+Synthetic course content for scale testing: lessons, subjects, materials of all types, images and tasks.
+Rows are inserted by bulk queries, which skip signals, so snapshots, material types of subjects
+and revisions are maintained explicitly.
+"""
+import random
+from collections import Counter
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Max
+from PIL import Image as PillowImage, ImageDraw
+
+from qazline.image_processing import THUMBNAIL_SIZE
+from qazline.models import (
+    Lesson, LessonSnapshot, Subject, VideoMaterial, ImageMaterial, Image, AssignmentMaterial, QuizMaterial, Task,
+    get_subclasses, fs, FILL_THE_BLANK_SPECIAL_CHARS,
+)
+from qazline.revisions import bump_revisions
+
+SYLLABLES = ('qa', 'za', 'qs', 'ta', 'an', 'ba', 'la', 'me', 'ke', 'su', 'tu', 'ly', 'ar', 'dy', 'ne', 'ra')
+PICTURE_SIZE = (640, 480)
+
+
+class CatalogGenerator:
+    """
+    Generates catalog in chunks of lessons, every chunk is inserted in its own transaction.
+    The same seed generates the same catalog, images are drawn once and shared by content addressed storage.
+    """
+
+    def __init__(self, subjects_per_lesson=10, tasks_per_quiz=20, images_per_material=3, image_variants=16,
+                 seed=None, batch_size=5000):
+        self.subjects_per_lesson = subjects_per_lesson
+        self.tasks_per_quiz = tasks_per_quiz
+        self.images_per_material = images_per_material
+        self.image_variants = image_variants
+        self.batch_size = batch_size
+        self.random = random.Random(seed)
+        self._pictures = None
+
+    def generate(self, n_lessons, lessons_per_chunk=100):
+        """ Yields number of created rows by model name for every chunk of lessons. """
+        first_numeral = (Lesson.objects.aggregate(numeral=Max('numeral'))['numeral'] or 0) + 1
+        last_numeral = first_numeral + n_lessons
+        for chunk_start in range(first_numeral, last_numeral, lessons_per_chunk):
+            numerals = range(chunk_start, min(chunk_start + lessons_per_chunk, last_numeral))
+            with transaction.atomic():
+                counts = self._generate_lessons(numerals)
+                bump_revisions([Lesson, Subject, *get_subclasses(), Image, Task])
+            yield counts
+
+    def _generate_lessons(self, numerals):
+        counts = Counter()
+        lessons = Lesson.objects.bulk_create([
+            Lesson(numeral=numeral, title=self._sentence(2, 5)) for numeral in numerals
+        ])
+        LessonSnapshot.objects.bulk_create([LessonSnapshot(lesson=lesson) for lesson in lessons])
+        subjects = Subject.objects.bulk_create([
+            Subject(numeral=numeral, lesson=lesson, title=self._sentence(2, 5))
+            for lesson in lessons for numeral in range(1, self.subjects_per_lesson + 1)
+        ], batch_size=self.batch_size)
+        counts.update(lesson=len(lessons), subject=len(subjects))
+
+        material_models = get_subclasses()
+        subjects_by_model = {model: [] for model in material_models}
+        for subject in subjects:
+            subjects_by_model[self.random.choice(material_models)].append(subject)
+        materials_by_model = {}
+        for model, model_subjects in subjects_by_model.items():
+            materials_by_model[model] = model.objects.bulk_create(
+                [self._build_material(model, subject) for subject in model_subjects], batch_size=self.batch_size,
+            )
+            counts[model._meta.model_name] = len(model_subjects)
+
+        images = Image.objects.bulk_create([
+            self._build_image(material)
+            for material in materials_by_model[ImageMaterial] for _ in range(self.images_per_material)
+        ], batch_size=self.batch_size)
+        tasks = Task.objects.bulk_create([
+            self._build_task(material)
+            for material in materials_by_model[QuizMaterial] for _ in range(self.tasks_per_quiz)
+        ], batch_size=self.batch_size)
+        counts.update(image=len(images), task=len(tasks))
+        return counts
+
+    def _build_material(self, model, subject):
+        material = model(subject=subject, topic=self._sentence(2, 6))
+        if model is VideoMaterial:
+            material.url = f'https://video.example.com/{subject.lesson_id}/{subject.numeral}'
+        elif model is AssignmentMaterial:
+            material.task = self._sentence(10, 40)
+        return material
+
+    def _build_image(self, material):
+        image_name, thumbnail_name = self.random.choice(self._get_pictures())
+        return Image(image_material=material, image=image_name, thumbnail=thumbnail_name,
+                     description=self._sentence(3, 8))
+
+    def _build_task(self, quiz_material):
+        task_type = self.random.choice(Task.TaskType.values)
+        if task_type == Task.TaskType.FILL_IN_THE_BLANK:
+            n_blanks = self.random.randint(1, 3)
+            parts = [self._sentence(2, 5) for _ in range(n_blanks + 1)]
+            question = f' {FILL_THE_BLANK_SPECIAL_CHARS} '.join(parts)
+            answers = [{'answer_text': self._word()} for _ in range(n_blanks)]
+        else:
+            n_answers = self.random.randint(2, 5)
+            if task_type == Task.TaskType.SINGLE_ANSWER:
+                n_correct = 1
+            else:
+                n_correct = self.random.randint(2, n_answers)
+            correct = set(self.random.sample(range(n_answers), n_correct))
+            question = f'{self._sentence(3, 10)}?'
+            answers = [{'answer_text': self._sentence(1, 3), 'correct': i in correct} for i in range(n_answers)]
+        return Task.build(quiz_material=quiz_material, question=question, answers=answers)
+
+    def _get_pictures(self):
+        """ Returns names of generated images and their thumbnails, files are written once. """
+        if self._pictures is None:
+            self._pictures = [self._save_picture() for _ in range(self.image_variants)]
+        return self._pictures
+
+    def _save_picture(self):
+        picture = PillowImage.new('RGB', PICTURE_SIZE, self._color())
+        draw = ImageDraw.Draw(picture)
+        for _ in range(8):
+            x, y = self.random.randrange(PICTURE_SIZE[0]), self.random.randrange(PICTURE_SIZE[1])
+            width, height = self.random.randint(20, 200), self.random.randint(20, 200)
+            draw.rectangle((x, y, x + width, y + height), fill=self._color())
+        image_name = fs.save('picture.jpg', ContentFile(self._encode(picture)))
+        picture.thumbnail(THUMBNAIL_SIZE)
+        thumbnail_name = fs.save('thumbnail.jpg', ContentFile(self._encode(picture)))
+        return image_name, thumbnail_name
+
+    @staticmethod
+    def _encode(picture):
+        content = BytesIO()
+        picture.save(content, format='JPEG', quality=85)
+        return content.getvalue()
+
+    def _color(self):
+        return tuple(self.random.randrange(256) for _ in range(3))
+
+    def _word(self):
+        return ''.join(self.random.choices(SYLLABLES, k=self.random.randint(1, 4)))
+
+    def _sentence(self, min_words, max_words):
+        return ' '.join(self._word() for _ in range(self.random.randint(min_words, max_words))).capitalize()
@@ -0,0 +1,263 @@
+"""
+Export and import of whole course catalog as NDJSON: one JSON record per line, parents before children.
+
+Subjects are referred by natural key: numeral of lesson and numeral of subject, so records do not depend
+on primary keys of source database. Images are exported as references to files of content addressed storage,
+files themselves are copied separately.
+"""
+import json
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+
+from qazline.models import (
+    Lesson, LessonSnapshot, Subject, VideoMaterial, ImageMaterial, Image, ImageProcessingJob, AssignmentMaterial,
+    QuizMaterial, Task, get_subclasses,
+)
+from qazline.revisions import bump_revisions
+from qazline.snapshots import invalidate_lessons
+from qazline.validators import JSONSchemaValidator
+
+FORMAT_VERSION = 1
+CHUNK_SIZE = 2000
+
+MATERIAL_FIELDS = {model: model.content_fields for model in get_subclasses()}
+CHILD_FIELDS = {
+    Image: ('image_material', ('image', 'thumbnail', 'description', 'status')),
+    Task: ('quiz_material', ('question', 'answers')),
+}
+# Records of these types are inserted before records of the next ones
+RECORD_TYPES = (
+    'lesson', 'subject', *(model._meta.model_name for model in MATERIAL_FIELDS), 'image', 'task',
+)
+ANSWERS_VALIDATOR = next(
+    validator for validator in Task._meta.get_field('answers').validators
+    if isinstance(validator, JSONSchemaValidator)
+)
+
+
+def iter_chunks(items, size):
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class CatalogImportError(Exception):
+
+    def __init__(self, line_number, message):
+        self.line_number = line_number
+        super().__init__(f'Line {line_number}: {message}')
+
+
+def iter_catalog_records():
+    """
+    Yields records of catalog, rows are read by server side cursors, so memory use does not depend on size.
+    Subjects without lesson have no natural key and are skipped with their materials.
+    All tables are read in one REPEATABLE READ transaction, so writes committed during export are not seen
+    and children never miss their parents. Inside of outer transaction its isolation level applies.
+    """
+    outermost = not connection.in_atomic_block
+    with transaction.atomic():
+        if outermost:
+            with connection.cursor() as cursor:
+                cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY')
+        yield from _iter_catalog_records()
+
+
+def _iter_catalog_records():
+    yield {'type': 'catalog', 'version': FORMAT_VERSION}
+    lessons = Lesson.objects.order_by('numeral').values_list('numeral', 'title')
+    for numeral, title in lessons.iterator(chunk_size=CHUNK_SIZE):
+        yield {'type': 'lesson', 'numeral': numeral, 'title': title}
+    subjects = Subject.objects.filter(lesson__isnull=False).order_by('lesson_id', 'numeral').values_list(
+        'lesson_id', 'numeral', 'title',
+    )
+    for lesson, numeral, title in subjects.iterator(chunk_size=CHUNK_SIZE):
+        yield {'type': 'subject', 'lesson': lesson, 'numeral': numeral, 'title': title}
+    for model, fields in MATERIAL_FIELDS.items():
+        rows = model.objects.filter(subject__lesson__isnull=False).order_by(
+            'subject__lesson_id', 'subject__numeral',
+        ).values_list('subject__lesson_id', 'subject__numeral', *fields)
+        for lesson, subject, *values in rows.iterator(chunk_size=CHUNK_SIZE):
+            yield {'type': model._meta.model_name, 'lesson': lesson, 'subject': subject, **dict(zip(fields, values))}
+    for model, (parent, fields) in CHILD_FIELDS.items():
+        rows = model.objects.filter(**{f'{parent}__subject__lesson__isnull': False}).order_by('pk').values_list(
+            f'{parent}__subject__lesson_id', f'{parent}__subject__numeral', *fields,
+        )
+        for lesson, subject, *values in rows.iterator(chunk_size=CHUNK_SIZE):
+            yield {'type': model._meta.model_name, 'lesson': lesson, 'subject': subject, **dict(zip(fields, values))}
+
+
+def export_catalog(stream):
+    """ Writes catalog to text stream, returns number of written records. """
+    n_records = 0
+    for record in iter_catalog_records():
+        # One write per record, OutputWrapper of management commands appends missing line ending to every write
+        stream.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+        n_records += 1
+    return n_records
+
+
+class CatalogImporter:
+    """
+    Validates records and inserts them by bulk queries of batch_size rows.
+    Bulk inserts skip signals, so material types of subjects are claimed by MaterialQuerySet.bulk_create,
+    snapshots of lessons are created or invalidated and revisions are bumped explicitly.
+    """
+
+    def __init__(self, batch_size=5000):
+        self.batch_size = batch_size
+        self.buffers = {record_type: [] for record_type in RECORD_TYPES}
+        self.subject_pks = {}
+        self.touched_lessons = set()
+        self.counts = dict.fromkeys(RECORD_TYPES, 0)
+        self.material_models = {model._meta.model_name: model for model in MATERIAL_FIELDS}
+
+    def import_lines(self, lines, start_line=0, commit_every=None, on_commit=None):
+        """
+        Imports lines of NDJSON. Everything is imported in one transaction, unless commit_every is given:
+        then every commit_every lines are committed and on_commit is called with number of the last committed line,
+        so import can be resumed from start_line after failure.
+        """
+        numbered_lines = ((n, line) for n, line in enumerate(lines, start=1) if n > start_line)
+        chunks = iter_chunks(numbered_lines, commit_every) if commit_every else [numbered_lines]
+        for chunk in chunks:
+            line_number = None
+            with transaction.atomic():
+                for line_number, line in chunk:
+                    if line.strip():
+                        self.add(line_number, line)
+                self.flush()
+            if on_commit is not None and line_number is not None:
+                on_commit(line_number)
+        return self.counts
+
+    def add(self, line_number, line):
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            raise CatalogImportError(line_number, f'Invalid JSON: {error}')
+        if not isinstance(record, dict):
+            raise CatalogImportError(line_number, 'Record is not an object')
+        record_type = record.pop('type', None)
+        if record_type == 'catalog':
+            if record.get('version') != FORMAT_VERSION:
+                raise CatalogImportError(line_number, f'Unsupported format version: {record.get("version")}')
+            return
+        if record_type not in self.buffers:
+            raise CatalogImportError(line_number, f'Unknown record type: {record_type}')
+        self.buffers[record_type].append((line_number, record))
+        if len(self.buffers[record_type]) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """ Inserts buffered records of all types, parents are inserted before their children. """
+        if not any(self.buffers.values()):
+            return
+        self._insert_lessons(self._pop('lesson'))
+        self._insert_subjects(self._pop('subject'))
+        for name, model in self.material_models.items():
+            records = self._pop(name)
+            if records:
+                self._insert_materials(model, records)
+        self._insert_images(self._pop('image'))
+        self._insert_tasks(self._pop('task'))
+        if self.touched_lessons:
+            invalidate_lessons(self.touched_lessons)
+            self.touched_lessons = set()
+        bump_revisions([Lesson, Subject, *get_subclasses(), Image, Task])
+
+    def _pop(self, record_type):
+        records, self.buffers[record_type] = self.buffers[record_type], []
+        self.counts[record_type] += len(records)
+        return records
+
+    def _insert_lessons(self, records):
+        lessons = [self._build(Lesson, line_number, record, ('numeral', 'title')) for line_number, record in records]
+        Lesson.objects.bulk_create(lessons)
+        LessonSnapshot.objects.bulk_create([LessonSnapshot(lesson=lesson) for lesson in lessons])
+
+    def _insert_subjects(self, records):
+        subjects = [
+            self._build(Subject, line_number, record, ('numeral', 'title'), lesson_id=record.get('lesson'))
+            for line_number, record in records
+        ]
+        for subject in Subject.objects.bulk_create(subjects):
+            self.subject_pks[subject.lesson_id, subject.numeral] = subject.pk
+            self.touched_lessons.add(subject.lesson_id)
+
+    def _insert_materials(self, model, records):
+        materials = [
+            self._build(model, line_number, record, MATERIAL_FIELDS[model], subject_id=subject_pk)
+            for line_number, record, subject_pk in self._resolve_subjects(records)
+        ]
+        model.objects.bulk_create(materials)
+
+    def _insert_images(self, records):
+        fields = CHILD_FIELDS[Image][1]
+        images = [
+            self._build(Image, line_number, record, fields, image_material_id=subject_pk)
+            for line_number, record, subject_pk in self._resolve_subjects(records)
+        ]
+        # Images, which were not processed in source database, are queued again
+        for image in images:
+            if image.status == Image.Status.PROCESSING:
+                image.status = Image.Status.PENDING
+        images = Image.objects.bulk_create(images)
+        ImageProcessingJob.objects.bulk_create([
+            ImageProcessingJob(image=image) for image in images if image.status == Image.Status.PENDING
+        ])
+
+    def _insert_tasks(self, records):
+        fields = CHILD_FIELDS[Task][1]
+        items = list(self._resolve_subjects(records))
+        # Answers of all tasks are checked against schema at once, before answer keys are derived from them
+        errors = ANSWERS_VALIDATOR.validate_many([record.get('answers') for _, record, _ in items])
+        for index, error in errors.items():
+            raise CatalogImportError(items[index][0], self._format_error(error))
+        tasks = [
+            self._build(
+                Task, line_number, record, fields, exclude=('answers',), factory=Task.build,
+                quiz_material_id=subject_pk,
+            ) for line_number, record, subject_pk in items
+        ]
+        Task.objects.bulk_create(tasks)
+
+    def _resolve_subjects(self, records):
+        """ Yields records with primary keys of their subjects, subjects missing in memory are fetched by one query. """
+        keys = {(record.get('lesson'), record.get('subject')) for _, record in records}
+        missing = {key for key in keys if key not in self.subject_pks}
+        if missing:
+            lesson_pks = {lesson for lesson, _ in missing if isinstance(lesson, int)}
+            rows = Subject.objects.filter(lesson_id__in=lesson_pks).values_list('lesson_id', 'numeral', 'pk')
+            for lesson, numeral, pk in rows:
+                self.subject_pks[lesson, numeral] = pk
+        for line_number, record in records:
+            key = (record.get('lesson'), record.get('subject'))
+            if key not in self.subject_pks:
+                raise CatalogImportError(line_number, f'Subject {key[1]} of lesson {key[0]} does not exist')
+            self.touched_lessons.add(key[0])
+            yield line_number, record, self.subject_pks[key]
+
+    def _build(self, model, line_number, record, fields, exclude=(), factory=None, **relations):
+        """ Builds instance by model or by factory, e.g. Task.build, and validates its fields. """
+        unknown = set(record) - set(fields) - {'lesson', 'subject'}
+        if unknown:
+            raise CatalogImportError(line_number, f'Unknown fields: {", ".join(sorted(unknown))}')
+        relation_fields = [field.name for field in model._meta.fields if field.is_relation]
+        try:
+            instance = (factory or model)(**{field: record[field] for field in fields if field in record}, **relations)
+            instance.clean_fields(exclude=[*relation_fields, *exclude])
+        except ValidationError as error:
+            raise CatalogImportError(line_number, self._format_error(error))
+        return instance
+
+    @staticmethod
+    def _format_error(error):
+        if hasattr(error, 'message_dict'):
+            return '; '.join(f'{field}: {" ".join(messages)}' for field, messages in error.message_dict.items())
+        return ' '.join(error.messages)
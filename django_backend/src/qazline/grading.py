@@ -0,0 +1,93 @@
+"""
+Grading of quiz attempts on the server.
+
+Answer keys of all tasks of quiz are read by one query from fields, which Task.save derives from answers,
+then any number of attempts is graded against them without queries. Attempt maps id of task to response:
+indexes of chosen answers for single and multiple answer tasks, texts of blanks in order for fill in the blank tasks.
+"""
+from rest_framework import serializers
+
+from qazline.models import Task, normalize_blank
+
+
+class AnswerKey:
+    __slots__ = ('task_type', 'n_answers', 'correct_mask', 'blanks')
+
+    def __init__(self, task_type, n_answers, correct_mask, blanks):
+        self.task_type = task_type
+        self.n_answers = n_answers
+        self.correct_mask = correct_mask
+        self.blanks = blanks
+
+    @classmethod
+    def from_task(cls, task):
+        return cls(*(getattr(task, field) for field in Task.ANSWER_KEY_FIELDS))
+
+    def clean(self, response):
+        """ Checks type of response, returns error message or None. """
+        if not isinstance(response, list):
+            return 'Response must be a list'
+        if self.task_type == Task.TaskType.FILL_IN_THE_BLANK:
+            if len(response) != self.n_answers or not all(isinstance(text, str) for text in response):
+                return f'Expected {self.n_answers} blank texts'
+            return None
+        # bool is subclass of int, but true is not an index
+        if not all(isinstance(index, int) and not isinstance(index, bool) for index in response):
+            return 'Expected indexes of chosen answers'
+        if any(index < 0 or index >= self.n_answers for index in response):
+            return f'Indexes of answers must be from 0 to {self.n_answers - 1}'
+        if self.task_type == Task.TaskType.SINGLE_ANSWER and len(response) > 1:
+            return 'Only one answer can be chosen'
+        return None
+
+    def grade(self, response):
+        """ Returns score from 0 to 1, fill in the blank tasks get partial score by number of correct blanks. """
+        if response is None:
+            return 0.0
+        if self.task_type == Task.TaskType.FILL_IN_THE_BLANK:
+            n_correct = sum(normalize_blank(text) == blank for text, blank in zip(response, self.blanks))
+            return n_correct / self.n_answers
+        mask = 0
+        for index in response:
+            mask |= 1 << index
+        return 1.0 if mask == self.correct_mask else 0.0
+
+
+class QuizGrader:
+
+    def __init__(self, quiz_material):
+        tasks = quiz_material.tasks.order_by('pk').values_list('pk', *Task.ANSWER_KEY_FIELDS)
+        self.keys = {pk: AnswerKey(*answer_key) for pk, *answer_key in tasks}
+
+    def clean_answers(self, answers):
+        """ Converts task ids to int and checks responses, raises ValidationError with errors by task id. """
+        cleaned = {}
+        errors = {}
+        for task_id, response in answers.items():
+            try:
+                task_pk = int(task_id)
+            except ValueError:
+                errors[task_id] = 'Invalid task id'
+                continue
+            key = self.keys.get(task_pk)
+            if key is None:
+                errors[task_id] = 'Task does not belong to quiz'
+                continue
+            error = key.clean(response)
+            if error is not None:
+                errors[task_id] = error
+                continue
+            cleaned[task_pk] = response
+        if errors:
+            raise serializers.ValidationError(errors)
+        return cleaned
+
+    def grade(self, answers):
+        """ Grades cleaned answers, tasks without response get zero score. """
+        tasks = []
+        score = 0.0
+        for task_pk, key in self.keys.items():
+            task_score = key.grade(answers.get(task_pk))
+            score += task_score
+            tasks.append({'id': task_pk, 'score': task_score, 'correct': task_score == 1.0})
+        return {'score': score, 'max_score': len(self.keys), 'tasks': tasks}
@@ -0,0 +1,98 @@
+import logging
+from datetime import timedelta
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from PIL import Image as PillowImage, ImageOps
+
+from qazline.models import Image, ImageProcessingJob
+from qazline.revisions import bump_revisions
+from qazline.snapshots import invalidate_subjects
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+LOCK_TIMEOUT = timedelta(minutes=10)
+THUMBNAIL_SIZE = (320, 320)
+
+
+def claim_jobs(batch_size):
+    """
+    Locks batch of queued jobs for this worker. Rows locked by other workers are skipped,
+    jobs of crashed workers are claimed again after LOCK_TIMEOUT.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            ImageProcessingJob.objects.select_for_update(skip_locked=True).filter(
+                Q(locked_at__isnull=True) | Q(locked_at__lt=now - LOCK_TIMEOUT),
+                attempts__lt=MAX_ATTEMPTS,
+            ).order_by('created_at')[:batch_size]
+        )
+        job_pks = [job.pk for job in jobs]
+        ImageProcessingJob.objects.filter(pk__in=job_pks).update(locked_at=now, attempts=F('attempts') + 1)
+        images = Image.objects.filter(processing_job__in=job_pks)
+        images.update(status=Image.Status.PROCESSING)
+        if job_pks:
+            # Status is a part of materials, update() sends no signals, which would invalidate them
+            invalidate_subjects(images.values('image_material_id'))
+            bump_revisions([Image])
+    return job_pks
+
+
+def process_job(job_pk):
+    """
+    Verifies image, generates normalised thumbnail and marks image as ready, returns False if processing failed.
+    Any error of the job is recorded, so it does not stop the worker.
+    """
+    job = ImageProcessingJob.objects.select_related('image', 'image__image_material').get(pk=job_pk)
+    image = job.image
+    try:
+        thumbnail = make_thumbnail(image.image)
+        with transaction.atomic():
+            # Stored file is locked until the image referring to it is committed
+            image.thumbnail.save('thumbnail.jpg', thumbnail, save=False)
+            image.status = Image.Status.READY
+            image.save(update_fields=['thumbnail', 'status'])
+            job.delete()
+    except Exception as error:
+        logger.warning('Processing of image %s failed: %s', image.pk, error)
+        try:
+            record_failure(job, error)
+        except Exception:
+            # Job stays locked and is claimed again after LOCK_TIMEOUT
+            logger.exception('Failure of processing of image %s was not recorded', image.pk)
+        return False
+    return True
+
+
+def record_failure(job, error):
+    """ Queues job for the next attempt, after the last one job is deleted and image is marked as failed. """
+    image = job.image
+    with transaction.atomic():
+        if job.attempts >= MAX_ATTEMPTS:
+            job.delete()
+            image.status = Image.Status.FAILED
+        else:
+            job.error = str(error)
+            job.locked_at = None
+            job.save(update_fields=['error', 'locked_at'])
+            image.status = Image.Status.PENDING
+        image.save(update_fields=['status'])
+
+
+def make_thumbnail(field_file):
+    with field_file.open('rb') as file:
+        PillowImage.open(file).verify()
+    # Image has to be reopened after verify
+    with field_file.open('rb') as file:
+        picture = PillowImage.open(file)
+        picture = ImageOps.exif_transpose(picture)
+        picture = picture.convert('RGB')
+        picture.thumbnail(THUMBNAIL_SIZE)
+        content = BytesIO()
+        picture.save(content, format='JPEG', quality=85, optimize=True)
+    return ContentFile(content.getvalue())
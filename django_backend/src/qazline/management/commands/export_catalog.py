@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from qazline.catalog_transfer import export_catalog
+
+
+class Command(BaseCommand):
+    help = 'Exports lessons, subjects, materials, image references and tasks as NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', nargs='?', default='-', help='Path of NDJSON file, "-" for standard output')
+
+    def handle(self, *args, **options):
+        if options['output'] == '-':
+            export_catalog(self.stdout)
+            return
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            n_records = export_catalog(output)
+        self.stdout.write(f'Exported records: {n_records}')
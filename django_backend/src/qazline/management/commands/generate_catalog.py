@@ -0,0 +1,39 @@
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from qazline.catalog_generator import CatalogGenerator
+
+
+class Command(BaseCommand):
+    help = 'Generates synthetic lessons, subjects, materials, images and tasks for scale testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lessons', type=int, default=100, help='Number of generated lessons')
+        parser.add_argument('--subjects-per-lesson', type=int, default=10)
+        parser.add_argument('--tasks-per-quiz', type=int, default=20)
+        parser.add_argument('--images-per-material', type=int, default=3)
+        parser.add_argument('--image-variants', type=int, default=16, help='Number of distinct image files')
+        parser.add_argument('--seed', type=int, default=None, help='Seed of random generator')
+        parser.add_argument('--lessons-per-chunk', type=int, default=100, help='Lessons inserted by one transaction')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows inserted by one query')
+
+    def handle(self, *args, **options):
+        generator = CatalogGenerator(
+            subjects_per_lesson=options['subjects_per_lesson'],
+            tasks_per_quiz=options['tasks_per_quiz'],
+            images_per_material=options['images_per_material'],
+            image_variants=options['image_variants'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+        )
+        started_at = time.perf_counter()
+        counts = Counter()
+        for chunk_counts in generator.generate(options['lessons'], options['lessons_per_chunk']):
+            counts.update(chunk_counts)
+            self.stdout.write(
+                f'Lessons: {counts["lesson"]}/{options["lessons"]}, tasks: {counts["task"]}, '
+                f'{time.perf_counter() - started_at:.1f}s'
+            )
+        self.stdout.write(', '.join(f'{name}: {count}' for name, count in counts.items()))
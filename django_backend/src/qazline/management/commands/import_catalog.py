@@ -0,0 +1,48 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from qazline.catalog_transfer import CatalogImporter, CatalogImportError
+
+
+class Command(BaseCommand):
+    help = 'Imports NDJSON catalog exported by export_catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Path of NDJSON file')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows inserted by one query')
+        parser.add_argument(
+            '--commit-every', type=int, default=None,
+            help='Commit every N lines and save progress to checkpoint file, by default import is one transaction',
+        )
+        parser.add_argument('--checkpoint', help='Path of checkpoint file, input path with .checkpoint by default')
+        parser.add_argument('--resume', action='store_true', help='Skip lines committed before, see --commit-every')
+
+    def handle(self, *args, **options):
+        checkpoint_path = options['checkpoint'] or f'{options["input"]}.checkpoint'
+        start_line = 0
+        if options['resume'] and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as checkpoint:
+                start_line = json.load(checkpoint)['line']
+            self.stdout.write(f'Resuming after line {start_line}')
+
+        def save_checkpoint(line_number):
+            with open(checkpoint_path, 'w') as checkpoint:
+                json.dump({'line': line_number}, checkpoint)
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Committed line {line_number}')
+
+        importer = CatalogImporter(batch_size=options['batch_size'])
+        on_commit = save_checkpoint if options['commit_every'] else None
+        try:
+            with open(options['input'], encoding='utf-8') as lines:
+                counts = importer.import_lines(lines, start_line, options['commit_every'], on_commit)
+        except CatalogImportError as error:
+            raise CommandError(str(error))
+        except IntegrityError as error:
+            raise CommandError(f'Catalog conflicts with existing content: {error}')
+        if on_commit is not None:
+            os.remove(checkpoint_path)
+        self.stdout.write(', '.join(f'{name}: {count}' for name, count in counts.items()))
@@ -0,0 +1,49 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from qazline.image_processing import claim_jobs, process_job
+
+
+def _process_job_in_thread(job_pk):
+    try:
+        return process_job(job_pk)
+    finally:
+        # Every thread has its own database connection
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Processes queued uploaded images: verification, normalisation and thumbnail generation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Number of worker threads')
+        parser.add_argument('--batch-size', type=int, default=20, help='Number of jobs claimed at once')
+        parser.add_argument('--poll-interval', type=float, default=5.0, help='Seconds to wait for new jobs')
+        parser.add_argument('--once', action='store_true', help='Exit when queue is empty')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+        n_processed = 0
+        n_failed = 0
+        try:
+            while True:
+                job_pks = claim_jobs(options['batch_size'])
+                if not job_pks:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                if executor is None:
+                    results = [process_job(job_pk) for job_pk in job_pks]
+                else:
+                    results = list(executor.map(_process_job_in_thread, job_pks))
+                n_processed += results.count(True)
+                n_failed += results.count(False)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        self.stdout.write(f'Processed images: {n_processed}, failed attempts: {n_failed}')
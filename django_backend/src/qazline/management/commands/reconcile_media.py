@@ -0,0 +1,61 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from qazline.media_collector import delete_unreferenced_files, get_referenced_names
+from qazline.models import fs
+
+
+def iter_media_names(location, min_age):
+    """ Yields names of media files older than min_age seconds, directory is read lazily. """
+    modified_before = time.time() - min_age
+    for directory, _, filenames in os.walk(location):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            try:
+                if os.path.getmtime(path) > modified_before:
+                    continue
+            except FileNotFoundError:
+                continue
+            yield os.path.relpath(path, location).replace(os.sep, '/')
+
+
+def iter_batches(names, batch_size):
+    batch = []
+    for name in names:
+        batch.append(name)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Deletes media files, which are not referenced by any image'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of files checked by one query')
+        parser.add_argument(
+            '--min-age', type=int, default=60 * 60,
+            help='Files modified less than this number of seconds ago are skipped, their upload can be in progress',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only report orphan files')
+
+    def handle(self, *args, **options):
+        n_checked = 0
+        n_orphans = 0
+        names = iter_media_names(fs.location, options['min_age'])
+        for batch in iter_batches(names, options['batch_size']):
+            n_checked += len(batch)
+            if options['dry_run']:
+                orphans = set(batch) - get_referenced_names(batch)
+            else:
+                orphans = delete_unreferenced_files(batch)
+            n_orphans += len(orphans)
+            if options['verbosity'] > 1:
+                for name in sorted(orphans):
+                    self.stdout.write(name)
+        action = 'found' if options['dry_run'] else 'deleted'
+        self.stdout.write(f'Checked files: {n_checked}, orphan files {action}: {n_orphans}')
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from qazline.media_collector import sweep_scheduled_files
+
+
+class Command(BaseCommand):
+    help = 'Deletes files of deleted images, which are scheduled for deletion and not used by other images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of files checked at once')
+        parser.add_argument('--poll-interval', type=float, default=5.0, help='Seconds to wait for new files')
+        parser.add_argument('--once', action='store_true', help='Exit when nothing is left to check')
+
+    def handle(self, *args, **options):
+        n_checked = 0
+        n_deleted = 0
+        while True:
+            checked, deleted = sweep_scheduled_files(options['batch_size'])
+            n_checked += checked
+            n_deleted += deleted
+            if not checked:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        self.stdout.write(f'Checked files: {n_checked}, deleted files: {n_deleted}')
@@ -1,4 +1,7 @@
 from django.contrib.auth.base_user import BaseUserManager
+from django.db import models, transaction
+from django.db.models import Case, IntegerField, TextField, Value, When
+from django.db.models.functions import Cast
 
 
 class QazlineUserManager(BaseUserManager):
@@ -30,4 +33,44 @@ class QazlineUserManager(BaseUserManager):
         return self.create_user(email, password, **extra_fields)
 
 
+class SubjectQuerySet(models.QuerySet):
 
+    def with_material(self):
+        """
+        Join every material table, so concrete material of subject is resolved in the same query.
+        """
+        material_types = [value for value in self.model.MaterialType.values if value]
+        return self.select_related(*material_types)
+
+    def renumber(self, numerals):
+        """
+        Sets numerals of subjects by one UPDATE, numerals maps pk of subject to its new numeral.
+        Unique constraint of numerals is checked at the end of statement, so numerals can be swapped.
+        """
+        if not numerals:
+            return 0
+        whens = [When(pk=pk, then=Value(numeral)) for pk, numeral in numerals.items()]
+        return self.filter(pk__in=numerals).update(numeral=Case(*whens, output_field=IntegerField()))
+
+
+class MaterialQuerySet(models.QuerySet):
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """
+        Claim subjects of all materials by one UPDATE before insert, like Material.save does for one material.
+        Subject is primary key of material, so bulk_update can not reassign it and needs no check.
+        """
+        objs = list(objs)
+        with transaction.atomic(using=self.db):
+            self.model.claim_subjects([obj.subject_id for obj in objs], using=self.db)
+            return super().bulk_create(objs, *args, **kwargs)
+
+
+class TaskQuerySet(models.QuerySet):
+
+    def with_raw_answers(self):
+        """
+        answers are not read and decoded, raw_answers is their stored JSON text, which TaskSerializer
+        passes to renderer as it is.
+        """
+        return self.defer('answers').annotate(raw_answers=Cast('answers', TextField()))
@@ -0,0 +1,52 @@
+from django.db import transaction
+from django.db.models import Q
+
+from qazline.models import Image, FileDeletion, fs
+from qazline.storage import try_lock_file_names
+
+
+def schedule_file_deletion(names):
+    """
+    Records files for deletion in current transaction, sweep_media deletes them in batches, out of request.
+    Rows of rolled back deletions are rolled back too, and files still referenced by images are never deleted.
+    """
+    FileDeletion.objects.bulk_create([FileDeletion(name=name) for name in set(names)], ignore_conflicts=True)
+
+
+def sweep_scheduled_files(batch_size=1000):
+    """
+    Deletes batch of scheduled files, which are not used by images, returns numbers of checked and deleted files.
+    Rows are claimed with SKIP LOCKED, so sweepers run concurrently. Names locked by uploads in progress
+    stay scheduled and are checked again by a later sweep.
+    """
+    with transaction.atomic():
+        names = set(
+            FileDeletion.objects.select_for_update(skip_locked=True).order_by('created_at').values_list(
+                'name', flat=True,
+            )[:batch_size]
+        )
+        checked = try_lock_file_names(names)
+        orphans = checked - get_referenced_names(checked)
+        for name in orphans:
+            fs.delete(name)
+        FileDeletion.objects.filter(name__in=checked).delete()
+    return len(checked), len(orphans)
+
+
+def get_referenced_names(names):
+    """ Returns names of files, which are used by images, files with the same content are shared. """
+    rows = Image.objects.filter(Q(image__in=names) | Q(thumbnail__in=names)).values_list('image', 'thumbnail')
+    return {name for row in rows for name in row}
+
+
+def delete_unreferenced_files(names):
+    """
+    Deletes files, which are not used by images, and returns their names.
+    Names locked by uploads in progress are skipped, reconcile_media deletes them later, if they stay orphans.
+    """
+    with transaction.atomic():
+        names = try_lock_file_names(names)
+        orphans = names - get_referenced_names(names)
+        for name in orphans:
+            fs.delete(name)
+    return orphans
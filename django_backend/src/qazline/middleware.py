@@ -0,0 +1,158 @@
+import asyncio
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger('qazline.queries')
+
+# Recorder of the current request, context is copied to threads of sync_to_async, so queries
+# of async views, which run in thread pool, are recorded too
+current_recorder = ContextVar('current_recorder', default=None)
+
+WHITESPACE_RE = re.compile(r'\s+')
+PLACEHOLDERS_LIST_RE = re.compile(r'\((?:%s, )+%s\)')
+
+
+def get_fingerprint(sql):
+    """ Normalises SQL, so the same query with different parameters has the same fingerprint. """
+    sql = WHITESPACE_RE.sub(' ', sql).strip()
+    return PLACEHOLDERS_LIST_RE.sub('(%s, ...)', sql)
+
+
+class QueryRecorder:
+    """ Execute wrapper, which counts queries, their time and repetitions of the same query. """
+
+    def __init__(self):
+        self.n_queries = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started_at
+            self.n_queries += 1
+            self.fingerprints[get_fingerprint(sql)] += 1
+
+    def get_repeated_queries(self, threshold):
+        """ Returns queries executed at least threshold times, which is the usual sign of N+1 problem. """
+        return [
+            {'sql': fingerprint, 'count': count}
+            for fingerprint, count in self.fingerprints.most_common() if count >= threshold
+        ]
+
+
+def record_query(execute, sql, params, many, context):
+    recorder = current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_query_recording(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def install_query_recording_on_connect(sender, connection, **kwargs):
+    install_query_recording(connection)
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Logs one structured summary line per sampled request: number of queries, time spent in database
+    and queries repeated at least N_PLUS_ONE_THRESHOLD times, which are likely N+1 patterns.
+    Works in sync and async middleware chains. Summary of streaming response is logged after it is sent,
+    so queries run while it is sent are counted too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Marks instance as coroutine function for handler, like MiddlewareMixin does
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        options = getattr(settings, 'QUERY_INSTRUMENTATION', {})
+        self.sample_rate = options.get('SAMPLE_RATE', 1.0)
+        self.n_plus_one_threshold = options.get('N_PLUS_ONE_THRESHOLD', 5)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        for connection in connections.all():
+            install_query_recording(connection)
+        recorder = QueryRecorder()
+        token = current_recorder.set(recorder)
+        started_at = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        self.finish(request, response, recorder, started_at)
+        return response
+
+    async def __acall__(self, request):
+        if random.random() >= self.sample_rate:
+            return await self.get_response(request)
+        recorder = QueryRecorder()
+        token = current_recorder.set(recorder)
+        started_at = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        self.finish(request, response, recorder, started_at)
+        return response
+
+    def finish(self, request, response, recorder, started_at):
+        if response.streaming:
+            content = iter(response.streaming_content)
+            response.streaming_content = self.record_stream(content, request, response, recorder, started_at)
+        else:
+            self.log_summary(request, response, recorder, time.perf_counter() - started_at)
+
+    def record_stream(self, content, request, response, recorder, started_at):
+        """ Reads chunks of streaming response with recorder of the request, logs summary after the last one. """
+        try:
+            while True:
+                token = current_recorder.set(recorder)
+                try:
+                    chunk = next(content, None)
+                finally:
+                    current_recorder.reset(token)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            self.log_summary(request, response, recorder, time.perf_counter() - started_at)
+
+    def log_summary(self, request, response, recorder, duration):
+        repeated_queries = recorder.get_repeated_queries(self.n_plus_one_threshold)
+        resolver_match = request.resolver_match
+        summary = {
+            'method': request.method,
+            'path': request.path,
+            'view': resolver_match.view_name if resolver_match else None,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+            'queries': recorder.n_queries,
+            'db_time_ms': round(recorder.duration * 1000, 2),
+            'n_plus_one': repeated_queries,
+        }
+        log = logger.warning if repeated_queries else logger.info
+        log(json.dumps(summary, ensure_ascii=False))
@@ -0,0 +1,30 @@
+# Generated by Django 3.1.5 on 2026-10-18 00:53
+
+from django.db import migrations, models
+
+MATERIAL_MODEL_NAMES = ('videomaterial', 'imagematerial', 'assignmentmaterial', 'quizmaterial')
+
+
+def set_material_type(apps, schema_editor):
+    subject_model = apps.get_model('qazline', 'Subject')
+    for model_name in MATERIAL_MODEL_NAMES:
+        material_model = apps.get_model('qazline', model_name)
+        subject_model.objects.filter(
+            pk__in=material_model.objects.values('subject_id'),
+        ).update(material_type=model_name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qazline', '0007_auto_20210128_0156'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subject',
+            name='material_type',
+            field=models.CharField(blank=True, choices=[('', 'Без материала'), ('videomaterial', 'Видео'), ('imagematerial', 'Изображения'), ('assignmentmaterial', 'Задание'), ('quizmaterial', 'Тест')], default='', max_length=20),
+        ),
+        migrations.RunPython(set_material_type, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.1.5 on 2026-10-18 00:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_snapshots(apps, schema_editor):
+    lesson_model = apps.get_model('qazline', 'Lesson')
+    snapshot_model = apps.get_model('qazline', 'LessonSnapshot')
+    snapshot_model.objects.bulk_create([
+        snapshot_model(lesson_id=lesson_pk) for lesson_pk in lesson_model.objects.values_list('pk', flat=True)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qazline', '0008_subject_material_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LessonSnapshot',
+            fields=[
+                ('lesson', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='snapshot', serialize=False, to='qazline.lesson')),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('tree', models.JSONField(null=True)),
+            ],
+        ),
+        migrations.RunPython(create_snapshots, migrations.RunPython.noop),
+    ]
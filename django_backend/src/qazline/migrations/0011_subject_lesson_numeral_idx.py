@@ -0,0 +1,17 @@
+# Generated by Django 3.1.5 on 2026-10-18 00:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qazline', '0010_revision'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subject',
+            index=models.Index(fields=['lesson', 'numeral', 'id'], name='subject_lesson_numeral_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.1.5 on 2026-10-18 01:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import qazline.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qazline', '0011_subject_lesson_numeral_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='status',
+            field=models.CharField(choices=[('PE', 'В очереди'), ('PR', 'Обрабатывается'), ('RE', 'Готово'), ('FA', 'Ошибка')], default='RE', max_length=2),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='thumbnail',
+            field=models.ImageField(blank=True, upload_to=qazline.models.get_path_for_thumbnail),
+        ),
+        migrations.CreateModel(
+            name='ImageProcessingJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('locked_at', models.DateTimeField(null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('image', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='processing_job', to='qazline.image')),
+            ],
+        ),
+    ]
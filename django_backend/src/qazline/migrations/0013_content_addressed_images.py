@@ -0,0 +1,26 @@
+# Generated by Django 3.1.5 on 2026-10-18 01:01
+
+import django.core.validators
+from django.db import migrations, models
+import qazline.models
+import qazline.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qazline', '0012_image_processing'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='image',
+            name='image',
+            field=models.ImageField(db_index=True, storage=qazline.storage.ContentAddressedStorage(), upload_to=qazline.models.get_path_for_image, validators=[django.core.validators.validate_image_file_extension]),
+        ),
+        migrations.AlterField(
+            model_name='image',
+            name='thumbnail',
+            field=models.ImageField(blank=True, db_index=True, storage=qazline.storage.ContentAddressedStorage(), upload_to=qazline.models.get_path_for_thumbnail),
+        ),
+    ]
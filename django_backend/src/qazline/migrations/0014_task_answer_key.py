@@ -0,0 +1,70 @@
+# Generated by Django 3.1.5 on 2026-10-18 01:26
+
+import json
+
+from django.db import migrations, models
+
+from psycopg2.extras import execute_values
+
+BATCH_SIZE = 5000
+
+
+def get_answer_key(answers):
+    correct_mask = 0
+    for index, answer in enumerate(answers):
+        if answer.get('correct'):
+            correct_mask |= 1 << index
+    blanks = []
+    if not any('correct' in answer for answer in answers):
+        blanks = [' '.join(answer['answer_text'].split()).casefold() for answer in answers]
+    return len(answers), correct_mask, json.dumps(blanks)
+
+
+def set_answer_keys(apps, schema_editor):
+    # bulk_update builds CASE expression per row, UPDATE FROM VALUES is much faster on millions of tasks
+    task_model = apps.get_model('qazline', 'Task')
+    tasks = task_model.objects.order_by('pk').values_list('pk', 'answers')
+    with schema_editor.connection.cursor() as cursor:
+        batch = []
+        for pk, answers in tasks.iterator(chunk_size=BATCH_SIZE):
+            batch.append((pk, *get_answer_key(answers)))
+            if len(batch) == BATCH_SIZE:
+                update_answer_keys(cursor, batch)
+                batch = []
+        update_answer_keys(cursor, batch)
+
+
+def update_answer_keys(cursor, rows):
+    execute_values(
+        cursor.cursor,
+        'UPDATE qazline_task SET n_answers = v.n_answers, correct_mask = v.correct_mask, blanks = v.blanks::jsonb '
+        'FROM (VALUES %s) AS v (id, n_answers, correct_mask, blanks) WHERE qazline_task.id = v.id',
+        rows,
+        page_size=len(rows) or 1,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qazline', '0013_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='blanks',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='correct_mask',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='n_answers',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(set_answer_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations
+
+# Expression must be the same as expression of SearchVector(column, config='simple'), otherwise index is not used
+SEARCHED_COLUMNS = (
+    ('qazline_subject', 'title'),
+    ('qazline_videomaterial', 'topic'),
+    ('qazline_imagematerial', 'topic'),
+    ('qazline_assignmentmaterial', 'topic'),
+    ('qazline_assignmentmaterial', 'task'),
+    ('qazline_quizmaterial', 'topic'),
+    ('qazline_task', 'question'),
+)
+
+
+def create_index(table, column):
+    return migrations.RunSQL(
+        f'CREATE INDEX "{table}_{column}_search_idx" ON "{table}" '
+        f"USING gin (to_tsvector('simple'::regconfig, COALESCE(\"{column}\", '')))",
+        f'DROP INDEX "{table}_{column}_search_idx"',
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qazline', '0014_task_answer_key'),
+    ]
+
+    operations = [create_index(table, column) for table, column in SEARCHED_COLUMNS]
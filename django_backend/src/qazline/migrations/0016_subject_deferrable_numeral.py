@@ -0,0 +1,22 @@
+# Generated by Django 3.1.5 on 2026-10-18 01:39
+
+from django.db import migrations, models
+import django.db.models.constraints
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qazline', '0015_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='subject',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='subject',
+            constraint=models.UniqueConstraint(deferrable=django.db.models.constraints.Deferrable['IMMEDIATE'], fields=('lesson', 'numeral'), name='subject_lesson_numeral_uniq'),
+        ),
+    ]
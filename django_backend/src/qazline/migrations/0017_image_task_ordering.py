@@ -0,0 +1,21 @@
+# Generated by Django 3.1.5 on 2026-10-18 01:45
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qazline', '0016_subject_deferrable_numeral'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='image',
+            options={'ordering': ('pk',)},
+        ),
+        migrations.AlterModelOptions(
+            name='task',
+            options={'ordering': ('pk',)},
+        ),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations, models
+
+MATERIAL_MODEL_NAMES = ('videomaterial', 'imagematerial', 'assignmentmaterial', 'quizmaterial')
+
+
+def add_material_type_foreign_key(model_name):
+    """
+    Material table gets column material_type, which is unknown to Django and always equals model name,
+    and foreign key (subject_id, material_type), so subject of material must be claimed by its type.
+    """
+    table = f'qazline_{model_name}'
+    return migrations.RunSQL(
+        f'ALTER TABLE "{table}" '
+        f"ADD COLUMN \"material_type\" varchar(20) NOT NULL DEFAULT '{model_name}' "
+        f"CONSTRAINT \"{table}_material_type_check\" CHECK (\"material_type\" = '{model_name}'), "
+        f'ADD CONSTRAINT "{table}_subject_material_type_fk" FOREIGN KEY ("subject_id", "material_type") '
+        f'REFERENCES "qazline_subject" ("id", "material_type") DEFERRABLE INITIALLY DEFERRED',
+        f'ALTER TABLE "{table}" DROP COLUMN "material_type"',
+    )
+
+
+def set_material_type(apps, schema_editor):
+    subject_model = apps.get_model('qazline', 'Subject')
+    for model_name in MATERIAL_MODEL_NAMES:
+        material_model = apps.get_model('qazline', model_name)
+        subject_model.objects.filter(
+            pk__in=material_model.objects.values('subject_id'),
+        ).update(material_type=model_name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qazline', '0018_file_deletion'),
+    ]
+
+    operations = [
+        # Subjects of materials inserted bypassing claim must be claimed before foreign keys are checked
+        migrations.RunPython(set_material_type, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='subject',
+            constraint=models.UniqueConstraint(fields=('id', 'material_type'), name='subject_material_type_uniq'),
+        ),
+        *(add_material_type_foreign_key(model_name) for model_name in MATERIAL_MODEL_NAMES),
+    ]
@@ -1,27 +1,31 @@
 from datetime import datetime
-from functools import wraps
 
-from django.apps import apps
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
-from django.core.files.storage import FileSystemStorage
 from django.core.validators import validate_image_file_extension, ValidationError
-from django.db import models, IntegrityError
+from django.db import models, transaction, IntegrityError
 
-from qazline.managers import QazlineUserManager
+from qazline.managers import QazlineUserManager, SubjectQuerySet, MaterialQuerySet, TaskQuerySet
+from qazline.storage import ContentAddressedStorage
 from qazline.validators import JSONSchemaValidator, ANSWER_JSON_FIELD_SCHEMA
 
-fs = FileSystemStorage(location='/media/photos')
+fs = ContentAddressedStorage()
 
 FILL_THE_BLANK_SPECIAL_CHARS = '_____'
+SUBJECT_NUMERAL_CONSTRAINT = 'subject_lesson_numeral_uniq'
+
+
+def normalize_blank(text):
+    """ Blanks are compared case insensitively and regardless of whitespace. """
+    return ' '.join(text.split()).casefold()
+
+
+# Registry of concrete Material children by their model name, filled on class creation
+MATERIAL_MODELS = {}
 
 
 # Get subclasses of Material abstract model in qazline app
 def get_subclasses():
-    result = []
-    for model in apps.get_app_config('qazline').get_models():
-        if issubclass(model, Material) and model is not Material:
-            result.append(model)
-    return result
+    return list(MATERIAL_MODELS.values())
 
 
 def get_path_for_image(instance, filename):
@@ -32,17 +36,11 @@ def get_path_for_image(instance, filename):
     return path
 
 
-def check_subject_existence(save):
-    @wraps(save)
-    def wrapper(self, *args, **kwargs):
-        child_models = get_subclasses()
-        subject = self.subject
-        for child_model in child_models:
-            if not isinstance(self, child_model):
-                if child_model.objects.filter(subject=subject).exists():
-                    raise IntegrityError(f'{subject} exist in {child_model.__name__.lower()} table')
-        save(self, *args, **kwargs)
-    return wrapper
+def get_path_for_thumbnail(instance, filename):
+    base_name = str(datetime.now().timestamp()).replace('.', '')
+    image_material_pk = instance.image_material.pk
+    path = f'{image_material_pk}/thumbnails/{base_name}.jpg'
+    return path
 
 
 class QazlineUser(AbstractBaseUser, PermissionsMixin):
@@ -70,14 +68,53 @@ class Lesson(models.Model):
         return f'#{self.numeral}: {self.title}'  # pragma: no cover
 
 
+class Revision(models.Model):
+    """ Counter of writes into table of content model, used to build validators of HTTP responses. """
+    name = models.CharField(max_length=50, primary_key=True)
+    number = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    objects = models.Manager()
+
+
+class LessonSnapshot(models.Model):
+    """ Precomputed tree of lesson subjects and materials, tree is null while snapshot is stale. """
+    lesson = models.OneToOneField(Lesson, on_delete=models.CASCADE, primary_key=True, related_name='snapshot')
+    version = models.PositiveIntegerField(default=1)
+    tree = models.JSONField(null=True)
+    objects = models.Manager()
+
+
 class Subject(models.Model):
+
+    class MaterialType(models.TextChoices):
+        # Values are the names of reverse one-to-one accessors of Material children
+        NO_MATERIAL = '', 'Без материала'
+        VIDEO = 'videomaterial', 'Видео'
+        IMAGE = 'imagematerial', 'Изображения'
+        ASSIGNMENT = 'assignmentmaterial', 'Задание'
+        QUIZ = 'quizmaterial', 'Тест'
+
     numeral = models.IntegerField()
     lesson = models.ForeignKey(Lesson, null=True, on_delete=models.SET_NULL, related_name='subjects')
     title = models.CharField(max_length=50)
-    objects = models.Manager()
+    material_type = models.CharField(
+        max_length=20, choices=MaterialType.choices, default=MaterialType.NO_MATERIAL, blank=True,
+    )
+    objects = SubjectQuerySet.as_manager()
 
     class Meta:
-        unique_together = ('numeral', 'lesson',)
+        constraints = [
+            # Checked at the end of statement, not after every row, so one UPDATE can permute numerals of lesson
+            models.UniqueConstraint(
+                fields=['lesson', 'numeral'], name=SUBJECT_NUMERAL_CONSTRAINT, deferrable=models.Deferrable.IMMEDIATE,
+            ),
+            # Target of foreign keys (subject_id, material_type) of material tables, see migration 0019
+            models.UniqueConstraint(fields=['id', 'material_type'], name='subject_material_type_uniq'),
+        ]
+        indexes = [
+            # Keyset pagination of subjects
+            models.Index(fields=['lesson', 'numeral', 'id'], name='subject_lesson_numeral_idx'),
+        ]
 
     def __str__(self):
         return f'{self.title}'
@@ -94,41 +131,119 @@ class Subject(models.Model):
     def has_quiz_material(self):
         return hasattr(self, 'quizmaterial')
 
+    def get_material(self):
+        """ Returns concrete material using material type, without probing every material table. """
+        if not self.material_type:
+            return None
+        return getattr(self, self.material_type, None)
+
 
 class Material(models.Model):
     subject = models.OneToOneField(Subject, on_delete=models.CASCADE, primary_key=True)
     topic = models.CharField(blank=True, max_length=255)
-    objects = models.Manager()
+    objects = MaterialQuerySet.as_manager()
+    # Related names of children which are fetched together with material
+    prefetch_children = ()
+    # Own fields of material, which are edited by batch updates and exported with catalog
+    content_fields = ('topic',)
 
     class Meta:
         abstract = True
 
-    @check_subject_existence
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        MATERIAL_MODELS[cls.__name__.lower()] = cls
+
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
+        if not self._state.adding:
+            super().save(*args, **kwargs)
+            return
+        with transaction.atomic(using=kwargs.get('using')):
+            self.claim_subjects([self.subject_id], using=kwargs.get('using'))
+            super().save(*args, **kwargs)
+        subject_field = self._meta.get_field('subject')
+        if subject_field.is_cached(self):
+            self.subject.material_type = self._meta.model_name
+
+    @classmethod
+    def claim_subjects(cls, subject_pks, using=None):
+        """
+        Set material type of subjects to the type of this material by one conditional UPDATE.
+        Row lock taken by UPDATE makes concurrent claims of the same subject wait for each other,
+        so the subject which is already claimed by another material type is never updated.
+        Database checks the claim too: every material table references (id, material_type) of subject,
+        so material inserted by any other path, e.g. loaddata or raw SQL, fails on commit if it is not claimed.
+        """
+        material_type = cls._meta.model_name
+        subject_pks = set(subject_pks)
+        n_claimed = Subject.objects.using(using).filter(
+            pk__in=subject_pks,
+            material_type__in=[Subject.MaterialType.NO_MATERIAL, material_type],
+        ).update(material_type=material_type)
+        if n_claimed != len(subject_pks):
+            raise IntegrityError(f'Subjects {sorted(subject_pks)} already have material or do not exist')
 
 
 class VideoMaterial(Material):
     url = models.URLField()
+    content_fields = ('topic', 'url')
 
 
 class ImageMaterial(Material):
-    pass
+    prefetch_children = ('images',)
 
 
 class Image(models.Model):
+
+    class Status(models.TextChoices):
+        PENDING = 'PE', 'В очереди'
+        PROCESSING = 'PR', 'Обрабатывается'
+        READY = 'RE', 'Готово'
+        FAILED = 'FA', 'Ошибка'
+
     image_material = models.ForeignKey(ImageMaterial, on_delete=models.CASCADE, related_name='images')
-    image = models.ImageField(validators=[validate_image_file_extension], upload_to=get_path_for_image)
+    image = models.ImageField(
+        validators=[validate_image_file_extension], upload_to=get_path_for_image, storage=fs, db_index=True,
+    )
+    thumbnail = models.ImageField(blank=True, upload_to=get_path_for_thumbnail, storage=fs, db_index=True)
     description = models.CharField(blank=True, max_length=255)
+    status = models.CharField(max_length=2, choices=Status.choices, default=Status.READY)
+    objects = models.Manager()
+
+    class Meta:
+        # Images and tasks are listed in order of creation, the same by serializers and read serializers
+        ordering = ('pk',)
+
+    def save(self, *args, **kwargs):
+        # Stored files stay locked until the row referring to them is committed, see ContentAddressedStorage
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+class ImageProcessingJob(models.Model):
+    """ Queued verification and thumbnail generation of uploaded image, deleted when image is processed. """
+    image = models.OneToOneField(Image, on_delete=models.CASCADE, related_name='processing_job')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    locked_at = models.DateTimeField(null=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    objects = models.Manager()
+
+
+class FileDeletion(models.Model):
+    """ Stored file scheduled for deletion by the transaction, which deleted its image, see sweep_media. """
+    name = models.CharField(max_length=100, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
     objects = models.Manager()
 
 
 class AssignmentMaterial(Material):
     task = models.TextField(default='')
+    content_fields = ('topic', 'task')
 
 
 class QuizMaterial(Material):
-    pass
+    prefetch_children = ('tasks',)
 
 
 class Task(models.Model):
@@ -145,29 +260,56 @@ class Task(models.Model):
 
     ])
     task_type = models.CharField(max_length=2, choices=TaskType.choices, default=TaskType.SINGLE_ANSWER)
-    objects = models.Manager()
+    # Answer key derived from answers on save: bit i of correct_mask is set, if answer i is correct,
+    # blanks are normalized texts of fill in the blank answers
+    n_answers = models.PositiveSmallIntegerField(default=0)
+    correct_mask = models.PositiveSmallIntegerField(default=0)
+    blanks = models.JSONField(default=list, blank=True)
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        ordering = ('pk',)
+
+    ANSWER_KEY_FIELDS = ('task_type', 'n_answers', 'correct_mask', 'blanks')
 
     def save(self, *args, **kwargs):
         task_type = kwargs.get('task_type')
         if not task_type:
-            task_type = self._define_task_type()
-            self.task_type = task_type
+            self._define_answer_key()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'question', 'answers'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, *self.ANSWER_KEY_FIELDS}
         super().save(*args, **kwargs)
 
-    def _define_task_type(self):
+    @classmethod
+    def build(cls, **kwargs):
+        """ Returns unsaved task with defined task type and answer key, so it can be inserted by bulk_create. """
+        task = cls(**kwargs)
+        task._define_answer_key()
+        return task
+
+    def _define_answer_key(self):
+        """ Defines task type and answer key by one pass over answers. """
         answers = self.answers
         question = self.question
         n_is_correct_values = 0
         n_is_correct_keys = 0
-        for answer in answers:
+        correct_mask = 0
+        for index, answer in enumerate(answers):
             if 'correct' in answer:
                 n_is_correct_keys += 1
                 is_correct = answer['correct']
                 if is_correct:
                     n_is_correct_values += 1
+                    correct_mask |= 1 << index
         self._is_valid_answers(answers, question, n_is_correct_keys)
-        task_type = self._get_task_type(n_is_correct_keys, n_is_correct_values)
-        return task_type
+        self.task_type = self._get_task_type(n_is_correct_keys, n_is_correct_values)
+        self.n_answers = len(answers)
+        self.correct_mask = correct_mask
+        if self.task_type == Task.TaskType.FILL_IN_THE_BLANK:
+            self.blanks = [normalize_blank(answer['answer_text']) for answer in answers]
+        else:
+            self.blanks = []
 
     @staticmethod
     def _get_task_type(n_is_correct_keys, n_is_correct_values):
@@ -0,0 +1,111 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination by natural key of view (keyset_ordering attribute, primary key by default).
+    Next page is selected by range condition on ordering columns instead of OFFSET,
+    so it is read by index range scan. Body stays a plain list, next cursor is returned in headers.
+    """
+    page_size = api_settings.PAGE_SIZE or 100
+    max_page_size = 1000
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.fields = self.get_ordering_fields(queryset.model, view)
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*(field.attname for field in self.fields))
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(self.fields, position))
+        page = list(queryset[:page_size + 1])
+        self.next_cursor = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_cursor = self.encode_cursor(self.get_position(page[-1]))
+        return page
+
+    def get_position(self, row):
+        """ Values of ordering fields of instance or of row of values() queryset. """
+        if isinstance(row, dict):
+            return [row[field.attname] for field in self.fields]
+        return [getattr(row, field.attname) for field in self.fields]
+
+    def get_paginated_response(self, data):
+        return Response(data, headers=self.get_headers())
+
+    def get_headers(self):
+        headers = {}
+        if self.next_cursor is not None:
+            next_url = replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+            headers['X-Next-Cursor'] = self.next_cursor
+            headers['Link'] = f'<{next_url}>; rel="next"'
+        return headers
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    @staticmethod
+    def get_ordering_fields(model, view):
+        ordering = getattr(view, 'keyset_ordering', ('pk',))
+        return [model._meta.pk if name == 'pk' else model._meta.get_field(name) for name in ordering]
+
+    @classmethod
+    def get_keyset_filter(cls, fields, position):
+        """
+        Builds condition selecting rows after position in ascending order,
+        nulls are sorted after other values as PostgreSQL does.
+        """
+        field, value = fields[0], position[0]
+        following = None
+        if len(fields) > 1:
+            following = cls.get_keyset_filter(fields[1:], position[1:])
+        if value is None:
+            # Only rows with null in this field can follow
+            if following is None:
+                return Q(pk__in=[])
+            return Q(**{f'{field.attname}__isnull': True}) & following
+        after = Q(**{f'{field.attname}__gt': value})
+        if field.null:
+            after |= Q(**{f'{field.attname}__isnull': True})
+        if following is not None:
+            after |= Q(**{field.attname: value}) & following
+        if not field.null:
+            # Lower bound of index range scan
+            after &= Q(**{f'{field.attname}__gte': value})
+        return after
+
+    @staticmethod
+    def encode_cursor(position):
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor is None:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.fields):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            return [field.to_python(value) for field, value in zip(self.fields, position)]
+        except (ValidationError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
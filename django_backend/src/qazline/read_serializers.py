@@ -0,0 +1,135 @@
+"""
+Read-only serializers of hot GET endpoints.
+
+They have the interface of DRF serializers, which generic views use, but build output by plain Python code
+from rows of values() querysets and attributes of instances, without fields of DRF serializers.
+Rendered output is byte for byte the same as output of serializers in qazline.serializers.
+The exception is RawAnswersQuizMaterialReadSerializer of quiz GET endpoints, which outputs answers of tasks
+as stored JSON text (RawJSON), like TaskSerializer for tasks read by Task.objects.with_raw_answers().
+PostgreSQL formats the text with spaces after separators, so it is the same JSON, but not the same bytes,
+as answers decoded by JSONField.
+"""
+from qazline.models import Subject, Image, Task, fs
+from qazline.renderers import RawJSON
+
+
+class ReadSerializer:
+    """ Output of serializer with fields, which are attributes of instances. """
+    fields = ()
+
+    def __init__(self, instance=None, many=False, context=None, **kwargs):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+
+    @property
+    def data(self):
+        if self.many:
+            return self.to_representation_many(list(self.instance))
+        return self.to_representation_many([self.instance])[0]
+
+    def to_representation_many(self, instances):
+        return [{field: getattr(instance, field) for field in self.fields} for instance in instances]
+
+
+class LessonReadSerializer(ReadSerializer):
+    """ Output of LessonSerializer from rows of Lesson.objects.values(*LessonReadSerializer.fields). """
+    fields = ('numeral', 'title')
+
+    def to_representation_many(self, rows):
+        subjects = {row['numeral']: [] for row in rows}
+        subject_rows = Subject.objects.filter(lesson_id__in=subjects).order_by('numeral').values_list(
+            'lesson_id', 'numeral', 'title',
+        )
+        for lesson_pk, numeral, title in subject_rows:
+            subjects[lesson_pk].append({'numeral': numeral, 'title': title})
+        return [
+            {'numeral': row['numeral'], 'title': row['title'], 'subjects': subjects[row['numeral']]} for row in rows
+        ]
+
+
+class MaterialReadSerializer(ReadSerializer):
+    """ Output of material serializer from instances of material, children of all materials are read by one query. """
+    fields = ('topic',)
+
+
+class VideoMaterialReadSerializer(MaterialReadSerializer):
+    fields = ('topic', 'url')
+
+
+class AssignmentMaterialReadSerializer(MaterialReadSerializer):
+    fields = ('topic', 'task')
+
+
+class ImageMaterialReadSerializer(MaterialReadSerializer):
+
+    def to_representation_many(self, materials):
+        data = super().to_representation_many(materials)
+        images = {material.pk: [] for material in materials}
+        rows = Image.objects.filter(image_material_id__in=images).values_list(
+            'image_material_id', 'image', 'description', 'thumbnail', 'status',
+        )
+        for material_pk, image, description, thumbnail, status in rows:
+            images[material_pk].append({
+                'image': self.get_url(image),
+                'description': description,
+                'thumbnail': self.get_url(thumbnail),
+                'status': status,
+            })
+        for material_data, material in zip(data, materials):
+            material_data['images'] = images[material.pk]
+        return data
+
+    def get_url(self, name):
+        """ The same url as of ImageField with use_url, absolute if there is request in context. """
+        if not name:
+            return None
+        url = fs.url(name)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+
+class QuizMaterialReadSerializer(MaterialReadSerializer):
+    """ Answers are decoded by JSONField or, if raw_answers is set, stored JSON text. """
+    raw_answers = False
+
+    def __init__(self, instance=None, many=False, context=None, raw_answers=None, **kwargs):
+        super().__init__(instance, many, context, **kwargs)
+        if raw_answers is not None:
+            self.raw_answers = raw_answers
+
+    def to_representation_many(self, materials):
+        data = super().to_representation_many(materials)
+        tasks = {material.pk: [] for material in materials}
+        if self.raw_answers:
+            rows = Task.objects.with_raw_answers().values_list(
+                'quiz_material_id', 'id', 'question', 'raw_answers', 'task_type',
+            )
+        else:
+            rows = Task.objects.values_list('quiz_material_id', 'id', 'question', 'answers', 'task_type')
+        for material_pk, pk, question, answers, task_type in rows.filter(quiz_material_id__in=tasks):
+            tasks[material_pk].append({
+                'id': pk, 'question': question, 'answers': RawJSON(answers) if self.raw_answers else answers,
+                'task_type': task_type,
+            })
+        for material_data, material in zip(data, materials):
+            material_data['tasks'] = tasks[material.pk]
+        return data
+
+
+class RawAnswersQuizMaterialReadSerializer(QuizMaterialReadSerializer):
+    """ Serializer of quiz GET endpoints, output is the same JSON as of QuizMaterialSerializer, not the same bytes. """
+    raw_answers = True
+
+
+MATERIAL_READ_SERIALIZERS = {
+    Subject.MaterialType.VIDEO: VideoMaterialReadSerializer,
+    Subject.MaterialType.IMAGE: ImageMaterialReadSerializer,
+    Subject.MaterialType.ASSIGNMENT: AssignmentMaterialReadSerializer,
+    Subject.MaterialType.QUIZ: QuizMaterialReadSerializer,
+}
+
+# GET endpoints render answers of quizzes as stored
+ENDPOINT_READ_SERIALIZERS = {**MATERIAL_READ_SERIALIZERS, Subject.MaterialType.QUIZ: RawAnswersQuizMaterialReadSerializer}
@@ -0,0 +1,90 @@
+"""
+JSON renderer and parser on orjson, they fall back to JSONRenderer and JSONParser of DRF if orjson is not installed.
+
+Rendered output is byte for byte the same as output of JSONRenderer with default settings (compact UTF-8 with
+escaped U+2028 and U+2029), except that NaN and infinity are rendered as null instead of error.
+RawJSON is JSON text stored in database, it is spliced into output of orjson as it is (orjson.Fragment),
+without decoding and encoding again. So output has formatting of the text, e.g. jsonb text with spaces after
+separators, and is the same JSON, but not the same bytes, as output for decoded value. Other renderers,
+like the browsable API, decode it.
+"""
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+LINE_SEPARATORS = (('\u2028'.encode(), b'\\u2028'), ('\u2029'.encode(), b'\\u2029'))
+
+
+class RawJSON:
+    """ JSON text, e.g. of jsonb column cast to text, which is rendered as it is. """
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+    def __repr__(self):
+        return f'RawJSON({self.text!r})'
+
+    def __eq__(self, other):
+        return isinstance(other, RawJSON) and self.text == other.text
+
+    def decode(self):
+        return json.loads(self.text)
+
+
+class JSONEncoder(encoders.JSONEncoder):
+
+    def default(self, obj):
+        if isinstance(obj, RawJSON):
+            return obj.decode()
+        return super().default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    encoder_class = JSONEncoder
+    # Types without native orjson serialization, and datetimes, which DRF formats its own way, go to JSONEncoder
+    options = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        encoder = self.encoder_class()
+
+        def default(obj):
+            if isinstance(obj, RawJSON):
+                return orjson.Fragment(obj.text)
+            return encoder.default(obj)
+
+        ret = orjson.dumps(data, default=default, option=self.options)
+        for separator, escaped in LINE_SEPARATORS:
+            if separator in ret:
+                ret = ret.replace(separator, escaped)
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            data = stream.read()
+            if encoding.lower().replace('-', '') != 'utf8':
+                data = data.decode(encoding)
+            return orjson.loads(data)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,40 @@
+import hashlib
+
+from django.db import connection
+from django.utils.http import quote_etag
+
+from qazline.models import Revision
+
+
+def bump_revisions(models):
+    """
+    Increments write counters of tables of models.
+    Signals bump them on every save and delete, bulk writes have to bump them explicitly.
+    Missing counters are created by the same statement, so concurrent first writes can not lose an increment.
+    """
+    names = sorted({model._meta.model_name for model in models})
+    if not names:
+        return
+    table = connection.ops.quote_name(Revision._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (name, number, updated_at) SELECT name, 1, NOW() FROM UNNEST(%s::varchar[]) AS name '
+            f'ON CONFLICT (name) DO UPDATE SET number = {table}.number + 1, updated_at = EXCLUDED.updated_at',
+            [names],
+        )
+
+
+def get_validators(models, variant=''):
+    """
+    Returns ETag and timestamp of last modification built from write counters of tables of models.
+    Variant, e.g. media type of response, is part of ETag, so different representations have different ETags.
+    """
+    names = sorted(model._meta.model_name for model in models)
+    revisions = Revision.objects.filter(name__in=names).order_by('name').values_list('name', 'number', 'updated_at')
+    revisions = list(revisions)
+    version = ';'.join(f'{name}:{number}' for name, number, _ in revisions)
+    etag = quote_etag(hashlib.md5(f'{";".join(names)}|{version}|{variant}'.encode()).hexdigest())
+    last_modified = None
+    if revisions:
+        last_modified = int(max(updated_at for _, _, updated_at in revisions).timestamp())
+    return etag, last_modified
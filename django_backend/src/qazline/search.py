@@ -0,0 +1,75 @@
+"""
+Ranked full text search over titles of subjects, topics of materials, assignments and questions of tasks.
+
+Texts are Kazakh and Russian, PostgreSQL has no stemmer for Kazakh, so documents are parsed by 'simple'
+configuration, which only lowercases words, and every word of query is matched as prefix: both languages
+inflect words by suffixes, so prefix of word matches its forms. Words shorter than MIN_PREFIX_LENGTH are matched
+as whole words, their prefixes would match most of the catalog. Every searched column has GIN index
+on the same to_tsvector expression, which is built here, so lookups do not depend on number of rows.
+
+Ranking reads and parses every ranked row, so only the first MAX_CANDIDATES matches of index are ranked per source.
+Query of common word takes the same time as query of rare one, but its results are the best of these candidates.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import CharField, Value
+
+from qazline.models import Subject, VideoMaterial, ImageMaterial, AssignmentMaterial, QuizMaterial, Task
+
+SEARCH_CONFIG = 'simple'
+MAX_QUERY_WORDS = 8
+MIN_PREFIX_LENGTH = 3
+MAX_CANDIDATES = 1000
+WORD_RE = re.compile(r'\w+')
+
+# Searched columns: model, column, path to lesson numeral and path to subject numeral
+SEARCH_FIELDS = (
+    (Subject, 'title', 'lesson_id', 'numeral'),
+    *((model, 'topic', 'subject__lesson_id', 'subject__numeral') for model in (
+        VideoMaterial, ImageMaterial, AssignmentMaterial, QuizMaterial,
+    )),
+    (AssignmentMaterial, 'task', 'subject__lesson_id', 'subject__numeral'),
+    (Task, 'question', 'quiz_material__subject__lesson_id', 'quiz_material__subject__numeral'),
+)
+RESULT_FIELDS = ('type', 'field', 'id', 'lesson', 'subject', 'text', 'rank')
+
+
+def get_search_query(text):
+    """ Returns query matching all words of text, long ones as prefixes, or None if text has no words. """
+    words = WORD_RE.findall(text.casefold())[:MAX_QUERY_WORDS]
+    if not words:
+        return None
+    # Words consist of word characters only, so they need no escaping inside quotes
+    terms = (f"'{word}':*" if len(word) >= MIN_PREFIX_LENGTH else f"'{word}'" for word in words)
+    return SearchQuery(' & '.join(terms), search_type='raw', config=SEARCH_CONFIG)
+
+
+def search(text, limit=20):
+    """
+    Returns at most limit results ordered by rank, every source contributes its best limit rows
+    to one UNION query. Results refer to lesson and subject numerals, which address materials in API.
+    Candidates are ranked in table of source without joins, only the best limit rows are joined.
+    """
+    query = get_search_query(text)
+    if query is None:
+        return []
+    querysets = []
+    for model, field, lesson_path, subject_path in SEARCH_FIELDS:
+        vector = SearchVector(field, config=SEARCH_CONFIG)
+        # Without ordering, so matches are read from index of column, not by scan of primary key index
+        candidates = model.objects.annotate(search=vector).filter(search=query).order_by().values('pk')
+        best = model.objects.filter(pk__in=candidates[:MAX_CANDIDATES]).annotate(
+            rank=SearchRank(vector, query),
+        ).order_by('-rank').values('pk')[:limit]
+        querysets.append(
+            model.objects.filter(pk__in=best).annotate(
+                result_type=Value(model._meta.model_name, output_field=CharField()),
+                result_field=Value(field, output_field=CharField()),
+                rank=SearchRank(vector, query),
+            ).order_by('-rank').values_list(
+                'result_type', 'result_field', 'pk', lesson_path, subject_path, field, 'rank',
+            )[:limit]
+        )
+    rows = querysets[0].union(*querysets[1:], all=True).order_by('-rank')[:limit]
+    return [dict(zip(RESULT_FIELDS, row)) for row in rows]
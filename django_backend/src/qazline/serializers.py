@@ -1,8 +1,15 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.validators import validate_image_file_extension
+from django.db import models, transaction
 from rest_framework import serializers
+from rest_framework.validators import UniqueTogetherValidator
 
 from qazline.models import (
-    Lesson, Subject, Material, VideoMaterial, AssignmentMaterial, ImageMaterial, Image, QuizMaterial, Task,
+    Lesson, Subject, Material, VideoMaterial, AssignmentMaterial, ImageMaterial, Image, ImageProcessingJob,
+    QuizMaterial, Task,
 )
+from qazline.renderers import RawJSON
+from qazline.revisions import bump_revisions
 
 
 class SubjectSerializer(serializers.ModelSerializer):
@@ -11,6 +18,8 @@ class SubjectSerializer(serializers.ModelSerializer):
     class Meta:
         model = Subject
         fields = ('numeral', 'title', 'lesson')
+        # Validators are not derived from UniqueConstraint, like they were from unique_together
+        validators = [UniqueTogetherValidator(queryset=Subject.objects.all(), fields=('lesson', 'numeral'))]
 
 
 class ReadOnlySubjectSerializer(serializers.ModelSerializer):
@@ -31,6 +40,57 @@ class LessonSerializer(serializers.ModelSerializer):
         )
 
 
+class SubjectOrderSerializer(serializers.Serializer):
+    """ New order of all subjects of lesson instance as list of subject ids, numerals become 1, 2, ... """
+    subjects = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+
+    def validate_subjects(self, value):
+        self.numerals = dict(self.instance.subjects.values_list('pk', 'numeral'))
+        if len(set(value)) != len(value):
+            raise serializers.ValidationError('Subjects must not repeat')
+        unknown = set(value) - set(self.numerals)
+        if unknown:
+            raise serializers.ValidationError(f'Subjects {sorted(unknown)} do not belong to lesson')
+        missing = set(self.numerals) - set(value)
+        if missing:
+            raise serializers.ValidationError(f'Subjects {sorted(missing)} are missing')
+        return value
+
+    def update(self, instance, validated_data):
+        numerals = {
+            pk: numeral for numeral, pk in enumerate(validated_data['subjects'], start=1)
+            if self.numerals[pk] != numeral
+        }
+        Subject.objects.renumber(numerals)
+        return instance
+
+
+class MaterialPatchSerializer(serializers.Serializer):
+    """ Partial update of material of any type and its subject, material is addressed by id of subject. """
+    subject = serializers.IntegerField()
+    topic = serializers.CharField(max_length=255, allow_blank=True, required=False)
+    url = serializers.URLField(required=False)
+    task = serializers.CharField(allow_blank=True, required=False)
+    subject_title = serializers.CharField(max_length=50, required=False)
+    subject_numeral = serializers.IntegerField(required=False)
+    lesson = serializers.IntegerField(required=False)
+
+
+class MaterialBatchPatchSerializer(serializers.Serializer):
+    updates = MaterialPatchSerializer(many=True, allow_empty=False)
+
+    def validate_updates(self, value):
+        max_updates = self.context.get('max_updates')
+        if max_updates is not None and len(value) > max_updates:
+            raise serializers.ValidationError(f'Batch can contain at most {max_updates} updates')
+        return value
+
+
+class MaterialBulkDeleteSerializer(serializers.Serializer):
+    """ Materials are addressed by ids of their subjects. """
+    subjects = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=1000)
+
+
 class MaterialSerializer(serializers.ModelSerializer):
     subject_title = serializers.CharField(max_length=50, write_only=True)
     lesson = serializers.IntegerField(write_only=True)
@@ -89,17 +149,20 @@ class VideoMaterialSerializer(MaterialSerializer):
 
 class ImageSerializer(serializers.ModelSerializer):
     image = serializers.ImageField(use_url=True)
+    thumbnail = serializers.ImageField(use_url=True)
 
     class Meta:
         model = Image
-        fields = ('image', 'description',)
-        read_only_fields = ('image', 'description',)
+        fields = ('image', 'description', 'thumbnail', 'status',)
+        read_only_fields = ('image', 'description', 'thumbnail', 'status',)
 
 
 class ImageMaterialSerializer(MaterialSerializer):
 
+    # Images are verified by Pillow in background, see qazline.image_processing
     images = serializers.ListField(
-        child=serializers.ImageField(allow_empty_file=False), write_only=True,
+        child=serializers.FileField(allow_empty_file=False, validators=[validate_image_file_extension]),
+        write_only=True,
     )
     descriptions = serializers.ListField(
         child=serializers.CharField(max_length=255, allow_blank=True), write_only=True,
@@ -109,6 +172,7 @@ class ImageMaterialSerializer(MaterialSerializer):
         model = ImageMaterial
         fields = MaterialSerializer.Meta.fields + ('images', 'descriptions',)
 
+    @transaction.atomic
     def create(self, validated_data):
         super().create(validated_data)
         images = validated_data.pop('images')
@@ -117,6 +181,7 @@ class ImageMaterialSerializer(MaterialSerializer):
         self._save_images(images, descriptions, instance)
         return instance
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         images = validated_data.pop('images', None)
         descriptions = validated_data.pop('descriptions', None)
@@ -142,8 +207,12 @@ class ImageMaterialSerializer(MaterialSerializer):
     @staticmethod
     def _save_images(images, descriptions, instance):
         if images and descriptions:
-            for image, description in zip(images, descriptions):
-                Image.objects.create(image=image, description=description, image_material=instance)
+            images = Image.objects.bulk_create([
+                Image(image=image, description=description, image_material=instance, status=Image.Status.PENDING)
+                for image, description in zip(images, descriptions)
+            ])
+            ImageProcessingJob.objects.bulk_create([ImageProcessingJob(image=image) for image in images])
+            bump_revisions([Image])
 
     @staticmethod
     def _check_images_and_description(images, descriptions):
@@ -167,21 +236,35 @@ class AssignmentMaterialSerializer(MaterialSerializer):
         return instance
 
 
+class RawJSONField(serializers.JSONField):
+    """ Stored JSON text of raw_<source> attribute, if instance has it, is rendered as it is. """
+
+    def get_attribute(self, instance):
+        text = getattr(instance, f'raw_{self.source}', None)
+        if text is not None:
+            return RawJSON(text)
+        return super().get_attribute(instance)
+
+
 class TaskSerializer(serializers.ModelSerializer):
+    """ Answers of tasks read by Task.objects.with_raw_answers() are not decoded and encoded again. """
+    serializer_field_mapping = {**serializers.ModelSerializer.serializer_field_mapping, models.JSONField: RawJSONField}
 
     class Meta:
         model = Task
-        fields = ('question', 'answers', 'task_type',)
-        read_only_fields = ('task_type',)
+        fields = ('id', 'question', 'answers', 'task_type',)
+        read_only_fields = ('id', 'task_type',)
 
 
 class QuizMaterialSerializer(MaterialSerializer):
+    """ Answers are rendered as stored, if tasks are prefetched by Task.objects.with_raw_answers(). """
     tasks = TaskSerializer(many=True)
 
     class Meta:
         model = QuizMaterial
         fields = MaterialSerializer.Meta.fields + ('tasks',)
 
+    @transaction.atomic
     def create(self, validated_data):
         super().create(validated_data)
         tasks = validated_data.pop('tasks')
@@ -189,6 +272,7 @@ class QuizMaterialSerializer(MaterialSerializer):
         self._create_tasks(tasks, instance)
         return instance
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tasks = validated_data.pop('tasks', None)
         if tasks:
@@ -196,11 +280,51 @@ class QuizMaterialSerializer(MaterialSerializer):
         instance = super().update(instance, validated_data)
         return instance
 
+    def validate_tasks(self, value):
+        # Define task types of all tasks in one pass and collect errors by task index
+        tasks = []
+        errors = []
+        for task_data in value:
+            try:
+                task = Task.build(question=task_data['question'], answers=task_data['answers'])
+            except DjangoValidationError as error:
+                errors.append(error.message_dict)
+            else:
+                tasks.append(task)
+                errors.append({})
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return tasks
+
     @staticmethod
     def _create_tasks(tasks, quiz_material_instance):
         for task in tasks:
-            question = task['question']
-            answers = task['answers']
-            Task.objects.create(
-                question=question, answers=answers, quiz_material=quiz_material_instance
-            )
+            task.quiz_material = quiz_material_instance
+        Task.objects.bulk_create(tasks)
+        bump_revisions([Task])
+
+
+class AttemptSerializer(serializers.Serializer):
+    """ Attempt of quiz: responses by task id, checked by qazline.grading.QuizGrader from context. """
+    answers = serializers.DictField(child=serializers.JSONField())
+
+    def validate_answers(self, value):
+        return self.context['grader'].clean_answers(value)
+
+
+class AttemptBatchSerializer(serializers.Serializer):
+    attempts = AttemptSerializer(many=True, allow_empty=False)
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    """ Query parameters of search. """
+    q = serializers.CharField(max_length=200)
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=20)
+
+
+MATERIAL_SERIALIZERS = {
+    Subject.MaterialType.VIDEO: VideoMaterialSerializer,
+    Subject.MaterialType.IMAGE: ImageMaterialSerializer,
+    Subject.MaterialType.ASSIGNMENT: AssignmentMaterialSerializer,
+    Subject.MaterialType.QUIZ: QuizMaterialSerializer,
+}
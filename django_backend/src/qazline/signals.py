@@ -1,20 +1,18 @@
-import os
-
-from django.db.models.signals import post_delete
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
-from qazline.models import VideoMaterial, ImageMaterial, AssignmentMaterial, QuizMaterial, Image
-
-
-def _delete_file(path):
-    """ Deletes file from filesystem. """
-    if os.path.isfile(path):    # pragma: no cover
-        os.remove(path)
+from qazline.models import (
+    Lesson, LessonSnapshot, Subject, VideoMaterial, ImageMaterial, AssignmentMaterial, QuizMaterial, Image, Task,
+    get_subclasses,
+)
+from qazline.media_collector import schedule_file_deletion
+from qazline.revisions import bump_revisions
+from qazline.snapshots import invalidate_lessons, invalidate_subjects
 
 
 @receiver(post_delete, sender=Image)
 def delete_file(sender, instance, *args, **kwargs):
-    _delete_file(instance.image.path)  # pragma: no cover
+    schedule_file_deletion([field_file.name for field_file in (instance.image, instance.thumbnail) if field_file])
 
 
 def delete_related_material(sender, instance, **kwargs):
@@ -26,3 +24,62 @@ post_delete.connect(delete_related_material, sender=VideoMaterial)
 post_delete.connect(delete_related_material, sender=ImageMaterial)
 post_delete.connect(delete_related_material, sender=AssignmentMaterial)
 post_delete.connect(delete_related_material, sender=QuizMaterial)
+
+
+@receiver(post_save, sender=Lesson)
+def invalidate_lesson_snapshot(sender, instance, created, **kwargs):
+    if created:
+        LessonSnapshot.objects.create(lesson=instance)
+    else:
+        invalidate_lessons([instance.pk])
+
+
+@receiver(post_delete, sender=Lesson)
+def bump_detached_subjects_revision(sender, instance, **kwargs):
+    # Collector detaches subjects of deleted lesson by UPDATE, which sends no signals of subjects.
+    # Snapshot of the lesson is deleted with it, detached subjects are in no other snapshot.
+    bump_revisions([Subject])
+
+
+@receiver(pre_save, sender=Subject)
+def invalidate_previous_lesson_snapshot(sender, instance, **kwargs):
+    # Subject can be moved to another lesson, so snapshot of lesson it belonged to is stale too
+    if not instance._state.adding:
+        invalidate_subjects([instance.pk])
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def invalidate_subject_lesson_snapshot(sender, instance, **kwargs):
+    if instance.lesson_id is not None:
+        invalidate_lessons([instance.lesson_id])
+
+
+def invalidate_material_lesson_snapshot(sender, instance, **kwargs):
+    invalidate_subjects([instance.subject_id])
+
+
+for material_model in get_subclasses():
+    post_save.connect(invalidate_material_lesson_snapshot, sender=material_model)
+    post_delete.connect(invalidate_material_lesson_snapshot, sender=material_model)
+
+
+@receiver(post_save, sender=Image)
+@receiver(post_delete, sender=Image)
+def invalidate_image_lesson_snapshot(sender, instance, **kwargs):
+    invalidate_subjects([instance.image_material_id])
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_task_lesson_snapshot(sender, instance, **kwargs):
+    invalidate_subjects([instance.quiz_material_id])
+
+
+def bump_revision(sender, **kwargs):
+    bump_revisions([sender])
+
+
+for content_model in (Lesson, Subject, *get_subclasses(), Image, Task):
+    post_save.connect(bump_revision, sender=content_model)
+    post_delete.connect(bump_revision, sender=content_model)
@@ -0,0 +1,90 @@
+import hashlib
+
+from django.db.models import F, prefetch_related_objects
+
+from qazline.models import Lesson, LessonSnapshot, Subject, get_subclasses
+from qazline.serializers import MATERIAL_SERIALIZERS
+
+
+def invalidate_lessons(lesson_pks):
+    """ Marks snapshots of lessons as stale, they are rebuilt on the next read of course tree. """
+    LessonSnapshot.objects.filter(lesson_id__in=lesson_pks).update(tree=None, version=F('version') + 1)
+
+
+def invalidate_subjects(subject_pks):
+    """ Marks snapshots of lessons, which contain subjects, as stale. """
+    lesson_pks = Subject.objects.filter(pk__in=subject_pks).values('lesson_id')
+    invalidate_lessons(lesson_pks)
+
+
+def get_course_tree():
+    """
+    Returns version of course and list of lesson trees.
+    Fresh snapshots are read by one query, only stale lessons are rebuilt.
+    """
+    rows = Lesson.objects.order_by('numeral').values_list('numeral', 'snapshot__version', 'snapshot__tree')
+    versions = {}
+    trees = {}
+    for numeral, version, tree in rows:
+        versions[numeral] = version
+        trees[numeral] = tree
+    stale_pks = [numeral for numeral, tree in trees.items() if tree is None]
+    if stale_pks:
+        rebuilt_trees = build_lesson_trees(stale_pks)
+        _save_snapshots(rebuilt_trees, versions)
+        trees.update(rebuilt_trees)
+    course_version = ';'.join(f'{numeral}:{version}' for numeral, version in versions.items())
+    course_version = hashlib.md5(course_version.encode()).hexdigest()
+    return course_version, list(trees.values())
+
+
+def absolutize_image_urls(lessons, request):
+    """
+    Materials in snapshots are serialized without request, so urls of images are relative.
+    They are made absolute for response, like urls of images in other endpoints.
+    """
+    for lesson in lessons:
+        for subject in lesson['subjects']:
+            if subject['material_type'] != Subject.MaterialType.IMAGE or subject['material'] is None:
+                continue
+            for image in subject['material']['images']:
+                for field in ('image', 'thumbnail'):
+                    if image[field]:
+                        image[field] = request.build_absolute_uri(image[field])
+
+
+def build_lesson_trees(lesson_pks):
+    lessons = Lesson.objects.filter(pk__in=lesson_pks).order_by('numeral')
+    trees = {lesson.pk: {'numeral': lesson.numeral, 'title': lesson.title, 'subjects': []} for lesson in lessons}
+    subjects = list(Subject.objects.with_material().filter(lesson_id__in=lesson_pks).order_by('lesson_id', 'numeral'))
+    materials = [subject.get_material() for subject in subjects]
+    for material_model in get_subclasses():
+        children = material_model.prefetch_children
+        if children:
+            prefetch_related_objects([m for m in materials if isinstance(m, material_model)], *children)
+    for subject, material in zip(subjects, materials):
+        subject_tree = {
+            'numeral': subject.numeral,
+            'title': subject.title,
+            'material_type': subject.material_type,
+            'topic': None,
+            'material': None,
+        }
+        if material is not None:
+            subject_tree['topic'] = material.topic
+            subject_tree['material'] = MATERIAL_SERIALIZERS[subject.material_type](material).data
+        trees[subject.lesson_id]['subjects'].append(subject_tree)
+    return trees
+
+
+def _save_snapshots(trees, versions):
+    new_snapshots = []
+    for lesson_pk, tree in trees.items():
+        version = versions[lesson_pk]
+        if version is None:
+            versions[lesson_pk] = 1
+            new_snapshots.append(LessonSnapshot(lesson_id=lesson_pk, tree=tree))
+        else:
+            # Snapshot is not overwritten, if it was invalidated again while tree was built
+            LessonSnapshot.objects.filter(lesson_id=lesson_pk, version=version).update(tree=tree)
+    LessonSnapshot.objects.bulk_create(new_snapshots, ignore_conflicts=True)
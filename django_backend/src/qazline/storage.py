@@ -0,0 +1,72 @@
+import hashlib
+import os
+import uuid
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import connection
+
+# First key of advisory locks of stored files, the second one is hash of file name
+FILE_LOCK_NAMESPACE = 7301
+
+
+def lock_file_name(name):
+    """ Waits for advisory lock of file name, it is held until the end of current transaction. """
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_xact_lock(%s, hashtext(%s))', [FILE_LOCK_NAMESPACE, name])
+
+
+def try_lock_file_names(names):
+    """ Takes advisory locks of file names, which are free, returns names locked till the end of transaction. """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT name FROM UNNEST(%s::text[]) AS name WHERE pg_try_advisory_xact_lock(%s, hashtext(name))',
+            [sorted(names), FILE_LOCK_NAMESPACE],
+        )
+        return {name for name, in cursor.fetchall()}
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Names files by SHA-256 of their content, sharded by first bytes of hash: ab/cd/abcd....jpg.
+    Only extension of given name is kept, so identical files are stored once and never change.
+    Files are shared by Image rows, see qazline.signals.delete_file.
+    Name is locked on save, so sweep of unreferenced files can not delete existing file, which is reused by upload,
+    before row referring to it is committed. Rows have to be saved in the same transaction, Image.save is atomic.
+    """
+    shard_depth = 2
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.get_content_name(name, content)
+        lock_file_name(name)
+        if self.exists(name):
+            return name
+        return self._save(name, content)
+
+    def get_content_name(self, name, content):
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        extension = os.path.splitext(name)[1].lower()
+        shards = [digest[2 * i:2 * i + 2] for i in range(self.shard_depth)]
+        return '/'.join([*shards, f'{digest}{extension}'])
+
+    def _save(self, name, content):
+        # File is written under temporary name and linked, so readers never see partially written file
+        temporary_name = super()._save(f'{name}.{uuid.uuid4().hex}.tmp', content)
+        temporary_path = self.path(temporary_name)
+        try:
+            os.link(temporary_path, self.path(name))
+        except FileExistsError:
+            # The same content was stored concurrently
+            pass
+        finally:
+            os.remove(temporary_path)
+        return name
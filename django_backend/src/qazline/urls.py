@@ -15,6 +15,10 @@ from qazline.views import (
     QuizMaterialViewSet,
     ImageDeleteView,
     TaskRetrieveUpdateDestroyView,
+    CourseTreeView,
+    SearchView,
+    MaterialBatchUpdateView,
+    MaterialBulkDeleteView,
 )
 
 #
@@ -31,6 +35,10 @@ urlpatterns = [
     path('images/<int:pk>/', ImageDeleteView.as_view(), name='image-delete'),
     path('tasks/<int:pk>/', TaskRetrieveUpdateDestroyView.as_view(), name='task-detail'),
     path('subjects/', SubjectListView.as_view(), name='subject-list'),
+    path('course/tree/', CourseTreeView.as_view(), name='course-tree'),
+    path('search/', SearchView.as_view(), name='search'),
+    path('materials/batch/', MaterialBatchUpdateView.as_view(), name='material-batch-update'),
+    path('materials/bulk-delete/', MaterialBulkDeleteView.as_view(), name='material-bulk-delete'),
     path(
         'lessons/<int:lesson_numeral>/subjects/<int:subject_numeral>/',
         SubjectMaterialDetailView.as_view(), name='subject-material-detail'
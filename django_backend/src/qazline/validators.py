@@ -21,10 +21,56 @@ ANSWER_JSON_FIELD_SCHEMA = {
     "maxItems": 10,
 }
 
+# Compiled validators by id of schema, schema is kept in value, so its id can not be reused
+_schema_validators = {}
+
+
+class AnswersSchemaChecker:
+    """ Hand-written equivalent of jsonschema validator for ANSWER_JSON_FIELD_SCHEMA. """
+
+    @staticmethod
+    def is_valid(value):
+        if not isinstance(value, list) or not 1 <= len(value) <= 10:
+            return False
+        for answer in value:
+            if not isinstance(answer, dict) or not isinstance(answer.get('answer_text'), str):
+                return False
+            for key, item in answer.items():
+                if key == 'correct':
+                    if not isinstance(item, bool):
+                        return False
+                elif key != 'answer_text':
+                    return False
+        return True
+
+
+def get_schema_validator(schema):
+    """ Returns validator of schema, which is built and checked only once per schema. """
+    try:
+        return _schema_validators[id(schema)][1]
+    except KeyError:
+        pass
+    if schema == ANSWER_JSON_FIELD_SCHEMA:
+        validator = AnswersSchemaChecker()
+    else:
+        validator_class = jsonschema.validators.validator_for(schema)
+        validator_class.check_schema(schema)
+        validator = validator_class(schema)
+    _schema_validators[id(schema)] = (schema, validator)
+    return validator
+
 
 class JSONSchemaValidator(BaseValidator):
     def compare(self, value, schema):
-        try:
-            jsonschema.validate(value, schema)
-        except jsonschema.exceptions.ValidationError:
+        if not get_schema_validator(schema).is_valid(value):
             raise ValidationError({'answers': f'{value} failed JSON schema check'})
+
+    def validate_many(self, values):
+        """ Validates values in bulk, returns dict of errors by index of invalid value. """
+        schema = self.limit_value() if callable(self.limit_value) else self.limit_value
+        validator = get_schema_validator(schema)
+        errors = {}
+        for index, value in enumerate(values):
+            if not validator.is_valid(value):
+                errors[index] = ValidationError({'answers': f'{value} failed JSON schema check'})
+        return errors
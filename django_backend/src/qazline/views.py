@@ -1,79 +1,229 @@
+import tempfile
+from itertools import islice
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import FileResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from django.views.decorators.cache import cache_control
+from django.views.static import serve
+from rest_framework.decorators import action
 from rest_framework.exceptions import NotFound
 from rest_framework.generics import ListAPIView, DestroyAPIView, RetrieveDestroyAPIView, RetrieveUpdateDestroyAPIView
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
 from qazline.models import (
-    Lesson, Subject, VideoMaterial, ImageMaterial, AssignmentMaterial, QuizMaterial, Image, Task,
+    Lesson, Subject, VideoMaterial, ImageMaterial, AssignmentMaterial, QuizMaterial, Image, Task, get_subclasses,
 )
 from qazline.serializers import (
     VideoMaterialSerializer, AssignmentMaterialSerializer, SubjectSerializer, LessonSerializer,
-    ImageMaterialSerializer, ImageSerializer, QuizMaterialSerializer, TaskSerializer
+    ImageMaterialSerializer, ImageSerializer, QuizMaterialSerializer, TaskSerializer,
+    AttemptSerializer, AttemptBatchSerializer, SearchQuerySerializer, SubjectOrderSerializer,
+    MaterialBatchPatchSerializer, MaterialBulkDeleteSerializer,
+)
+from qazline.batch_updates import MaterialBatchUpdater
+from qazline.bulk_deletion import delete_materials
+from qazline.grading import QuizGrader
+from qazline.read_serializers import (
+    LessonReadSerializer, VideoMaterialReadSerializer, ImageMaterialReadSerializer, AssignmentMaterialReadSerializer,
+    RawAnswersQuizMaterialReadSerializer, ENDPOINT_READ_SERIALIZERS,
 )
+from qazline.renderers import FastJSONRenderer
+from qazline.revisions import bump_revisions, get_validators
+from qazline.search import search
+from qazline.snapshots import absolutize_image_urls, get_course_tree, invalidate_lessons
+
+CONTENT_MODELS = (Lesson, Subject, *get_subclasses(), Image, Task)
+
+
+def get_subject_material(lesson_numeral, subject_numeral):
+    """ Fetches subject with its material by one query, read serializers fetch children by another one. """
+    subject = get_object_or_404(
+        Subject.objects.with_material(), lesson__numeral=lesson_numeral, numeral=subject_numeral,
+    )
+    material = subject.get_material()
+    if material is None:
+        raise NotFound('Subject without material')
+    return material
+
+
+class ConditionalGetMixin:
+    """
+    Adds ETag and Last-Modified to read responses and answers 304 to conditional requests,
+    validators are built from write counters of revision_models, so the body is not serialized for 304.
+    ETag depends on negotiated media type too, so JSON and browsable API responses are cached separately.
+    """
+    revision_models = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        # Object is looked up before validators are checked, so request of missing object is answered by 404
+        instance = self.get_object()
+        return self.get_conditional_response(self.render_object, request, instance)
+
+    def render_object(self, request, instance):
+        return Response(self.get_serializer(instance).data)
+
+    def get_conditional_response(self, handler, request, *args, **kwargs):
+        etag, last_modified = get_validators(self.revision_models, self.get_media_type(request))
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ['Accept'])
+        return response
+
+    def get_media_type(self, request):
+        return request.accepted_media_type
 
 
-class LessonViewSet(ModelViewSet):
+class StreamingListMixin:
+    """
+    Opt-in streaming of the whole list by ?stream=1, instead of the page of paginated list.
+    Rows are read by server side cursor in chunks of stream_chunk_size, prefetches are done for every chunk,
+    and JSON array is written chunk by chunk, so memory use does not depend on number of rows.
+    Django 3.1 iterates streaming response of ASGI request in event loop, where ORM can not be used, so under ASGI
+    the array is written by the view in its thread to temporary file, which is streamed.
+    """
+    stream_query_param = 'stream'
+    stream_chunk_size = 500
+    renderer = FastJSONRenderer()
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get(self.stream_query_param) not in ('1', 'true'):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset = queryset.order_by(*getattr(self, 'keyset_ordering', ('pk',)))
+        if isinstance(request._request, ASGIRequest):
+            spool = tempfile.TemporaryFile()
+            for chunk in self.iter_json(queryset):
+                spool.write(chunk)
+            response = FileResponse(spool, content_type='application/json')
+            response['Content-Length'] = spool.tell()
+            spool.seek(0)
+            return response
+        return StreamingHttpResponse(self.iter_json(queryset), content_type='application/json')
+
+    def iter_json(self, queryset):
+        # iterator() ignores prefetch_related, so lookups are applied to every chunk
+        lookups = queryset._prefetch_related_lookups
+        rows = queryset.iterator(chunk_size=self.stream_chunk_size)
+        separator = b'['
+        while True:
+            chunk = list(islice(rows, self.stream_chunk_size))
+            if not chunk:
+                break
+            prefetch_related_objects(chunk, *lookups)
+            data = self.get_serializer(chunk, many=True).data
+            yield separator + self.renderer.render(data)[1:-1]
+            separator = b','
+        yield b'[]' if separator == b'[' else b']'
+
+
+class ReadSerializerMixin:
+    """
+    GET of list and detail is serialized by read_serializer_class, see qazline.read_serializers.
+    read_queryset replaces queryset for them, if read serializer takes values() rows instead of instances.
+    Browsable API and OPTIONS build forms of other methods, so they get the usual serializer.
+    """
+    read_serializer_class = None
+    read_queryset = None
+
+    def is_read(self):
+        return self.request.method in ('GET', 'HEAD') and self.action in ('list', 'retrieve')
+
+    def get_queryset(self):
+        if self.read_queryset is not None and self.is_read():
+            return self.read_queryset.all()
+        return super().get_queryset()
+
+    def get_serializer_class(self):
+        if self.is_read():
+            return self.read_serializer_class
+        return super().get_serializer_class()
+
+
+class LessonViewSet(ConditionalGetMixin, StreamingListMixin, ReadSerializerMixin, ModelViewSet):
+    revision_models = (Lesson, Subject)
     queryset = Lesson.objects.prefetch_related(
-        'subjects',
+        Prefetch('subjects', queryset=Subject.objects.order_by('numeral')),
     ).all()
     serializer_class = LessonSerializer
+    read_queryset = Lesson.objects.values(*LessonReadSerializer.fields)
+    read_serializer_class = LessonReadSerializer
+
+    @action(detail=True, methods=['post'])
+    def reorder(self, request, pk=None):
+        """
+        Sets order of all subjects of lesson {"subjects": [subject_id, ...]} by one UPDATE of moved subjects.
+        Lesson row is locked, so concurrent reorders of the same lesson are applied one after another.
+        UPDATE skips signals, so snapshot of lesson is invalidated and revision is bumped here.
+        """
+        with transaction.atomic():
+            lesson = get_object_or_404(Lesson.objects.select_for_update(), pk=pk)
+            serializer = SubjectOrderSerializer(lesson, data=request.data)
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+            invalidate_lessons([lesson.pk])
+            bump_revisions([Subject])
+        prefetch_related_objects([lesson], Prefetch('subjects', queryset=Subject.objects.order_by('numeral')))
+        return Response(self.get_serializer(lesson).data)
 
+    @action(detail=True, methods=['delete'])
+    def materials(self, request, pk=None):
+        """ Deletes all materials of lesson with their subjects, subjects without material are kept. """
+        lesson = get_object_or_404(Lesson, pk=pk)
+        return Response({'deleted': delete_materials(Subject.objects.filter(lesson=lesson))})
 
-class SubjectMaterialDetailView(RetrieveDestroyAPIView):
-    # TODO refactor, maybe add get_queryset method, cause get_object have permission check
+
+class SubjectMaterialDetailView(ConditionalGetMixin, RetrieveDestroyAPIView):
+    revision_models = CONTENT_MODELS
+    serializer_classes = ENDPOINT_READ_SERIALIZERS
 
     def get_object(self):
-        instance = get_object_or_404(
-            Subject,
-            lesson__numeral=self.kwargs['lesson_numeral'],
-            numeral=self.kwargs['subject_numeral'],
-        )
-        if instance.has_video_material():
-            obj = instance.videomaterial
-        elif instance.has_image_material():
-            obj = instance.imagematerial
-        elif instance.has_assignment_material():
-            obj = instance.assignmentmaterial
-        elif instance.has_quiz_material():
-            obj = instance.quizmaterial
-        else:
-            raise NotFound('Subject without material')
+        obj = self.get_material()
         self.check_object_permissions(self.request, obj)
         return obj
 
     def get_serializer_class(self):
-        # TODO override get_serializer instead of get_serializer_class
-        instance = get_object_or_404(
-            Subject,
-            lesson__numeral=self.kwargs['lesson_numeral'],
-            numeral=self.kwargs['subject_numeral'],
-        )
-        if instance.has_video_material():
-            serializer = VideoMaterialSerializer
-        elif instance.has_image_material():
-            serializer = ImageMaterialSerializer
-        elif instance.has_assignment_material():
-            serializer = AssignmentMaterialSerializer
-        elif instance.has_quiz_material:
-            serializer = QuizMaterialSerializer
-        else:
-            raise NotFound('Subject without material')
-        return serializer
+        material = self.get_material()
+        return self.serializer_classes[material.subject.material_type]
 
+    def get_material(self):
+        if getattr(self, '_material', None) is None:
+            self._material = get_subject_material(self.kwargs['lesson_numeral'], self.kwargs['subject_numeral'])
+        return self._material
 
-class SubjectListView(ListAPIView):
+
+class SubjectListView(ConditionalGetMixin, StreamingListMixin, ListAPIView):
+    revision_models = (Subject,)
+    keyset_ordering = ('lesson_id', 'numeral', 'id')
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
 
 
-class VideoMaterialViewSet(ModelViewSet):
+class VideoMaterialViewSet(ConditionalGetMixin, StreamingListMixin, ReadSerializerMixin, ModelViewSet):
+    revision_models = (VideoMaterial,)
     queryset = VideoMaterial.objects.all()
     serializer_class = VideoMaterialSerializer
+    read_serializer_class = VideoMaterialReadSerializer
 
 
-class ImageMaterialViewSet(ModelViewSet):
+class ImageMaterialViewSet(ConditionalGetMixin, StreamingListMixin, ReadSerializerMixin, ModelViewSet):
+    revision_models = (ImageMaterial, Image)
     queryset = ImageMaterial.objects.all()
     serializer_class = ImageMaterialSerializer
+    read_serializer_class = ImageMaterialReadSerializer
 
 
 class ImageDeleteView(DestroyAPIView):
@@ -81,16 +231,108 @@ class ImageDeleteView(DestroyAPIView):
     serializer_class = ImageSerializer
 
 
-class AssignmentMaterialViewSet(ModelViewSet):
+class AssignmentMaterialViewSet(ConditionalGetMixin, StreamingListMixin, ReadSerializerMixin, ModelViewSet):
+    revision_models = (AssignmentMaterial,)
     queryset = AssignmentMaterial.objects.all()
     serializer_class = AssignmentMaterialSerializer
+    read_serializer_class = AssignmentMaterialReadSerializer
 
 
-class QuizMaterialViewSet(ModelViewSet):
+class QuizMaterialViewSet(ConditionalGetMixin, StreamingListMixin, ReadSerializerMixin, ModelViewSet):
+    revision_models = (QuizMaterial, Task)
     queryset = QuizMaterial.objects.all()
     serializer_class = QuizMaterialSerializer
+    read_serializer_class = RawAnswersQuizMaterialReadSerializer
+
+    @action(detail=True, methods=['post'])
+    def grade(self, request, pk=None):
+        """
+        Grades one attempt {"answers": {task_id: response}} or batch of attempts {"attempts": [...]}.
+        Answer keys are built once for all attempts.
+        """
+        grader = QuizGrader(self.get_object())
+        batch = 'attempts' in request.data
+        serializer_class = AttemptBatchSerializer if batch else AttemptSerializer
+        serializer = serializer_class(data=request.data, context={'grader': grader})
+        serializer.is_valid(raise_exception=True)
+        if batch:
+            attempts = serializer.validated_data['attempts']
+            return Response({'results': [grader.grade(attempt['answers']) for attempt in attempts]})
+        return Response(grader.grade(serializer.validated_data['answers']))
+
 
+class MaterialBatchUpdateView(APIView):
+    """
+    Partial updates of materials of any type {"updates": [{"subject": subject_id, field: value, ...}, ...]},
+    applied together in one transaction. Response contains result of every update in the same order.
+    """
+    max_updates = 500
 
-class TaskRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView):
+    def patch(self, request):
+        serializer = MaterialBatchPatchSerializer(data=request.data, context={'max_updates': self.max_updates})
+        serializer.is_valid(raise_exception=True)
+        results = MaterialBatchUpdater(serializer.validated_data['updates']).apply()
+        return Response({'results': results})
+
+
+class MaterialBulkDeleteView(APIView):
+    """ Deletes materials {"subjects": [subject_id, ...]} with their subjects, see qazline.bulk_deletion. """
+
+    def post(self, request):
+        serializer = MaterialBulkDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        subjects = Subject.objects.filter(pk__in=serializer.validated_data['subjects'])
+        return Response({'deleted': delete_materials(subjects)})
+
+
+class TaskRetrieveUpdateDestroyView(ConditionalGetMixin, RetrieveUpdateDestroyAPIView):
+    revision_models = (Task,)
     queryset = Task.objects.all()
     serializer_class = TaskSerializer
+
+    def get_queryset(self):
+        if self.request.method in ('GET', 'HEAD'):
+            return Task.objects.with_raw_answers()
+        return super().get_queryset()
+
+
+class CourseTreeView(ConditionalGetMixin, APIView):
+    revision_models = CONTENT_MODELS
+
+    def get(self, request):
+        return self.get_conditional_response(self.get_tree, request)
+
+    def get_tree(self, request):
+        version, lessons = get_course_tree()
+        if request.query_params.get('materials') != 'full':
+            lessons = [
+                {
+                    **lesson,
+                    'subjects': [
+                        {key: value for key, value in subject.items() if key != 'material'}
+                        for subject in lesson['subjects']
+                    ],
+                } for lesson in lessons
+            ]
+        else:
+            absolutize_image_urls(lessons, request)
+        return Response({'version': version, 'lessons': lessons})
+
+
+class SearchView(ConditionalGetMixin, APIView):
+    """ Ranked search of subjects, materials and tasks by words or their beginnings, see qazline.search. """
+    revision_models = (Subject, *get_subclasses(), Task)
+
+    def get(self, request):
+        serializer = SearchQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return self.get_conditional_response(self.get_results, request, **serializer.validated_data)
+
+    def get_results(self, request, q, limit):
+        return Response({'results': search(q, limit)})
+
+
+@cache_control(public=True, max_age=60 * 60 * 24 * 365, immutable=True)
+def serve_media(request, path, document_root=None, show_indexes=False):
+    """ Serves media files, which are named by their content and therefore never change, from MEDIA_ROOT. """
+    return serve(request, path, document_root=document_root or settings.MEDIA_ROOT, show_indexes=show_indexes)
@@ -0,0 +1,66 @@
+import asyncio
+
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, TransactionTestCase
+from django.urls import resolve, reverse
+
+from qazline.models import Lesson, Subject, VideoMaterial, QuizMaterial, Task
+
+
+class AsyncViewsTest(TransactionTestCase):
+    """ Async views query database from thread pool, so data has to be committed. """
+
+    def setUp(self):
+        lesson = Lesson.objects.create(numeral=1, title='Sample lesson #1')
+        video_subject = Subject.objects.create(numeral=1, lesson=lesson, title='Video subject')
+        quiz_subject = Subject.objects.create(numeral=2, lesson=lesson, title='Quiz subject')
+        VideoMaterial.objects.create(subject=video_subject, url='http://sample_video.com')
+        quiz_material = QuizMaterial.objects.create(subject=quiz_subject, topic='Quiz')
+        Task.objects.create(
+            question='Hello my name is',
+            answers=[{'answer_text': 'John', 'correct': True}, {'answer_text': 'James', 'correct': False}],
+            quiz_material=quiz_material,
+        )
+        self.quiz_material = quiz_material
+        self.async_client = AsyncClient()
+
+    async def async_get(self, url):
+        return await self.async_client.get(url)
+
+    def get_url_pairs(self):
+        return [
+            (reverse('lesson-list'), reverse('async-lesson-list')),
+            (reverse('lesson-detail', args=[1]), reverse('async-lesson-detail', args=[1])),
+            (reverse('subject-list') + '?page_size=1', reverse('async-subject-list') + '?page_size=1'),
+            (reverse('subject-material-detail', args=[1, 1]), reverse('async-subject-material-detail', args=[1, 1])),
+            (reverse('subject-material-detail', args=[1, 2]), reverse('async-subject-material-detail', args=[1, 2])),
+            (
+                reverse('quiz-material-detail', args=[self.quiz_material.pk]),
+                reverse('async-quiz-material-detail', args=[self.quiz_material.pk]),
+            ),
+            (reverse('lesson-detail', args=[2]), reverse('async-lesson-detail', args=[2])),
+        ]
+
+    def test_responses_are_the_same_as_sync_responses(self):
+        for sync_url, async_url in self.get_url_pairs():
+            sync_response = self.client.get(sync_url)
+            async_response = async_to_sync(self.async_get)(async_url)
+            self.assertEqual(async_response.status_code, sync_response.status_code, async_url)
+            self.assertEqual(async_response.content, sync_response.content, async_url)
+            self.assertEqual(async_response.get('ETag'), sync_response.get('ETag'), async_url)
+
+    def test_views_are_coroutine_functions(self):
+        for _, async_url in self.get_url_pairs():
+            self.assertTrue(asyncio.iscoroutinefunction(resolve(async_url.split('?')[0]).func), async_url)
+
+    async def test_not_modified(self):
+        url = reverse('async-lesson-list')
+        response = await self.async_client.get(url)
+        # Extra arguments of AsyncClient are sent as headers
+        response = await self.async_client.get(url, **{'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_concurrent_requests(self):
+        url = reverse('async-subject-material-detail', args=[1, 2])
+        responses = await asyncio.gather(*(self.async_client.get(url) for _ in range(10)))
+        self.assertEqual({response.status_code for response in responses}, {200})
@@ -0,0 +1,100 @@
+from django.db import IntegrityError
+from mock import patch
+from rest_framework.reverse import reverse
+from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
+from rest_framework.test import APIRequestFactory
+
+from qazline.batch_updates import MaterialBatchUpdater
+from qazline.models import Lesson, LessonSnapshot, Subject, VideoMaterial, AssignmentMaterial, ImageMaterial
+from qazline.revisions import get_validators
+from qazline.snapshots import get_course_tree
+from qazline.views import MaterialBatchUpdateView
+from tests.setup import TestViewSetUp
+
+
+class MaterialBatchUpdateTest(TestViewSetUp):
+
+    request_factory = APIRequestFactory()
+
+    def setUp(self):
+        super().setUp()
+        self.subjects = {subject.title: subject.pk for subject in Subject.objects.all()}
+
+    def patch(self, updates):
+        request = self.request_factory.patch(reverse('material-batch-update'), {'updates': updates}, format='json')
+        return MaterialBatchUpdateView.as_view()(request)
+
+    def test_updates_of_different_materials_are_applied_together(self):
+        get_course_tree()
+        etag, _ = get_validators([VideoMaterial, Subject])
+        video_pk = self.subjects['Video subject']
+        updates = [
+            {'subject': video_pk, 'topic': 'Video topic'},
+            {'subject': self.subjects['Assignment subject'], 'task': 'New task', 'subject_title': 'Homework'},
+            {'subject': self.subjects['Image subject'], 'topic': 'Pictures'},
+            {'subject': video_pk, 'url': 'https://video.example.com/1'},
+        ]
+        # Locks of subjects, lessons are not checked, 3 materials and 1 subject are updated, snapshot and revisions
+        with self.assertNumQueries(12):
+            response = self.patch(updates)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(
+            [(result['subject'], result['material_type']) for result in response.data['results']],
+            [(video_pk, 'videomaterial'), (self.subjects['Assignment subject'], 'assignmentmaterial'),
+             (self.subjects['Image subject'], 'imagematerial'), (video_pk, 'videomaterial')],
+        )
+        video_material = VideoMaterial.objects.get(pk=video_pk)
+        self.assertEqual((video_material.topic, video_material.url), ('Video topic', 'https://video.example.com/1'))
+        assignment_material = AssignmentMaterial.objects.select_related('subject').get()
+        self.assertEqual((assignment_material.task, assignment_material.subject.title), ('New task', 'Homework'))
+        self.assertEqual(ImageMaterial.objects.get(pk=self.subjects['Image subject']).topic, 'Pictures')
+        self.assertIsNone(LessonSnapshot.objects.get(lesson_id=1).tree)
+        self.assertNotEqual(get_validators([VideoMaterial, Subject])[0], etag)
+
+    def test_numerals_of_subjects_can_be_swapped(self):
+        response = self.patch([
+            {'subject': self.subjects['Video subject'], 'subject_numeral': 3},
+            {'subject': self.subjects['Image subject'], 'subject_numeral': 2},
+        ])
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(Subject.objects.get(lesson_id=1, numeral=2).title, 'Image subject')
+        self.assertEqual(Subject.objects.get(lesson_id=1, numeral=3).title, 'Video subject')
+
+    def test_subject_can_be_moved_to_another_lesson(self):
+        Lesson.objects.create(numeral=2, title='Sample lesson #2')
+        get_course_tree()
+        response = self.patch([{'subject': self.subjects['Quiz subject'], 'lesson': 2, 'subject_numeral': 1}])
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(Subject.objects.get(pk=self.subjects['Quiz subject']).lesson_id, 2)
+        self.assertEqual(set(LessonSnapshot.objects.values_list('tree', flat=True)), {None})
+
+    def test_invalid_updates_are_reported_by_item_and_nothing_is_applied(self):
+        response = self.patch([
+            {'subject': self.subjects['Video subject'], 'topic': 'Applied only with the others'},
+            {'subject': self.subjects['Image subject'], 'url': 'https://video.example.com/1'},
+            {'subject': self.subjects['Empty subject'], 'topic': 'No material'},
+            {'subject': self.subjects['Quiz subject'], 'lesson': 100},
+        ])
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        errors = response.data['updates']
+        self.assertEqual(errors[0], {})
+        self.assertEqual(list(errors[1]), ['url'])
+        self.assertEqual(list(errors[2]), ['subject'])
+        self.assertEqual(list(errors[3]), ['lesson'])
+        self.assertEqual(VideoMaterial.objects.get(pk=self.subjects['Video subject']).topic, '')
+
+    def test_invalid_values_are_rejected_before_database_is_read(self):
+        with self.assertNumQueries(0):
+            response = self.patch([{'subject': self.subjects['Video subject'], 'url': 'not url'}])
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(list(response.data['updates'][0]), ['url'])
+
+    def test_duplicate_numerals_are_rejected(self):
+        response = self.patch([{'subject': self.subjects['Video subject'], 'subject_numeral': 1}])
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(Subject.objects.get(pk=self.subjects['Video subject']).numeral, 2)
+
+    def test_other_integrity_errors_are_not_reported_as_duplicate_numerals(self):
+        with patch.object(MaterialBatchUpdater, '_apply', side_effect=IntegrityError('other constraint')):
+            with self.assertRaisesMessage(IntegrityError, 'other constraint'):
+                MaterialBatchUpdater([{'subject': self.subjects['Video subject'], 'topic': 'Topic'}]).apply()
@@ -0,0 +1,111 @@
+import os
+
+from django.db import connection, transaction
+from django.db.models.signals import pre_delete
+from django.test.utils import CaptureQueriesContext
+from mock import Mock
+from rest_framework.reverse import reverse
+from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
+from rest_framework.test import APIRequestFactory
+
+from qazline.media_collector import sweep_scheduled_files
+from qazline.models import (
+    Lesson, LessonSnapshot, Subject, Image, ImageProcessingJob, Task, VideoMaterial, QuizMaterial, fs, get_subclasses,
+)
+from qazline.snapshots import get_course_tree
+from qazline.views import LessonViewSet, MaterialBulkDeleteView
+from tests.setup import TestViewSetUp
+
+
+class Rollback(Exception):
+    pass
+
+
+class BulkDeletionTest(TestViewSetUp):
+
+    request_factory = APIRequestFactory()
+
+    def setUp(self):
+        super().setUp()
+        image = Image.objects.first()
+        ImageProcessingJob.objects.create(image=image)
+        self.image_path = fs.path(image.image.name)
+
+    @staticmethod
+    def get_state():
+        return {
+            model._meta.model_name: set(model.objects.values_list('pk', flat=True))
+            for model in (Lesson, Subject, *get_subclasses(), Image, ImageProcessingJob, Task)
+        }
+
+    def delete_lesson_materials(self):
+        request = self.request_factory.delete(reverse('lesson-materials', args=[1]))
+        return LessonViewSet.as_view({'delete': 'materials'})(request, pk=1)
+
+    def test_lesson_materials_are_deleted_with_the_same_end_state_as_one_by_one(self):
+        try:
+            with transaction.atomic():
+                for model in get_subclasses():
+                    for material in model.objects.all():
+                        material.delete()
+                expected_state = self.get_state()
+                raise Rollback
+        except Rollback:
+            pass
+        get_course_tree()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.delete_lesson_materials()
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        deleted_tables = [
+            query['sql'].split('"')[1] for query in queries if query['sql'].startswith('DELETE FROM ')
+        ]
+        self.assertEqual(deleted_tables, [
+            'qazline_imageprocessingjob', 'qazline_image', 'qazline_task', 'qazline_videomaterial',
+            'qazline_imagematerial', 'qazline_assignmentmaterial', 'qazline_quizmaterial', 'qazline_subject',
+        ])
+        # Lesson, savepoint and its release, lock of subjects, names of files, 8 deletes, scheduled files,
+        # snapshot and revisions
+        self.assertEqual(len(queries), 16)
+        self.assertEqual(self.get_state(), expected_state)
+        self.assertEqual(Subject.objects.get().title, 'Empty subject')
+        self.assertEqual(response.data['deleted']['subject'], 6)
+        self.assertEqual(response.data['deleted']['image'], 2)
+        self.assertEqual(response.data['deleted']['task'], 1)
+        self.assertIsNone(LessonSnapshot.objects.get(lesson_id=1).tree)
+
+    def test_files_of_deleted_images_are_deleted_by_sweep(self):
+        self.delete_lesson_materials()
+        self.assertTrue(os.path.isfile(self.image_path))
+        sweep_scheduled_files()
+        self.assertFalse(os.path.isfile(self.image_path))
+
+    def test_materials_are_deleted_by_ids_of_subjects(self):
+        video_subject = Subject.objects.get(title='Video subject')
+        quiz_subject = Subject.objects.get(title='Quiz subject')
+        empty_subject = Subject.objects.get(title='Empty subject')
+        request = self.request_factory.post(
+            reverse('material-bulk-delete'), {'subjects': [video_subject.pk, quiz_subject.pk, empty_subject.pk]},
+            format='json',
+        )
+        response = MaterialBulkDeleteView.as_view()(request)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.data['deleted']['subject'], 2)
+        self.assertFalse(Subject.objects.filter(pk__in=[video_subject.pk, quiz_subject.pk]).exists())
+        self.assertTrue(Subject.objects.filter(pk=empty_subject.pk).exists())
+        self.assertEqual(VideoMaterial.objects.count(), 1)
+        self.assertFalse(QuizMaterial.objects.exists())
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual(Image.objects.count(), 2)
+
+    def test_ids_of_subjects_are_required(self):
+        request = self.request_factory.post(reverse('material-bulk-delete'), {'subjects': []}, format='json')
+        response = MaterialBulkDeleteView.as_view()(request)
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+
+    def test_rows_are_deleted_without_signals(self):
+        receiver = Mock()
+        pre_delete.connect(receiver, sender=Task)
+        self.addCleanup(pre_delete.disconnect, receiver, sender=Task)
+        self.delete_lesson_materials()
+        self.assertFalse(Task.objects.exists())
+        receiver.assert_not_called()
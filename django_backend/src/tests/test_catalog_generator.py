@@ -0,0 +1,43 @@
+from io import StringIO
+
+from django.core.management import call_command
+
+from qazline.catalog_generator import CatalogGenerator
+from qazline.models import Lesson, LessonSnapshot, Subject, Image, QuizMaterial, Task, fs
+from tests.setup import TestViewSetUp
+
+
+class CatalogGeneratorTest(TestViewSetUp):
+
+    def test_generated_catalog_is_consistent(self):
+        n_lessons = Lesson.objects.count()
+        stdout = StringIO()
+        call_command('generate_catalog', lessons=3, subjects_per_lesson=8, seed=1, lessons_per_chunk=2, stdout=stdout)
+        self.assertEqual(Lesson.objects.count(), n_lessons + 3)
+        self.assertEqual(LessonSnapshot.objects.count(), n_lessons + 3)
+        new_subjects = Subject.objects.filter(lesson__numeral__gt=1)
+        self.assertEqual(new_subjects.count(), 24)
+        self.assertFalse(new_subjects.filter(material_type=Subject.MaterialType.NO_MATERIAL).exists())
+        self.assertEqual(
+            Task.objects.filter(quiz_material__subject__lesson__numeral__gt=1).count(),
+            QuizMaterial.objects.filter(subject__lesson__numeral__gt=1).count() * 20,
+        )
+        for task in Task.objects.all():
+            task.full_clean()
+            answer_key = [getattr(task, field) for field in Task.ANSWER_KEY_FIELDS]
+            task._define_answer_key()
+            self.assertEqual([getattr(task, field) for field in Task.ANSWER_KEY_FIELDS], answer_key)
+        for image in Image.objects.all():
+            self.assertTrue(fs.exists(image.image.name))
+        self.assertIn('lesson: 3', stdout.getvalue())
+
+    def test_the_same_seed_generates_the_same_tasks(self):
+        generator = CatalogGenerator(seed=5)
+        other_generator = CatalogGenerator(seed=5)
+        quiz_material = QuizMaterial.objects.first()
+        tasks = [generator._build_task(quiz_material) for _ in range(10)]
+        other_tasks = [other_generator._build_task(quiz_material) for _ in range(10)]
+        self.assertEqual(
+            [(task.question, task.answers) for task in tasks],
+            [(task.question, task.answers) for task in other_tasks],
+        )
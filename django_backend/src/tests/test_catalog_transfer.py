@@ -0,0 +1,121 @@
+import json
+import os
+import tempfile
+import threading
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models.signals import post_init
+from django.test import TransactionTestCase
+from mock import Mock
+
+from qazline.catalog_transfer import export_catalog, iter_catalog_records
+from qazline.models import Lesson, LessonSnapshot, Subject, Task, Image, VideoMaterial
+from tests.setup import TestViewSetUp
+
+
+class CatalogTransferTest(TestViewSetUp):
+
+    def setUp(self):
+        super().setUp()
+        # Import validates fields, host names of fixture urls contain underscores
+        VideoMaterial.objects.update(url='http://video.example.com')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'catalog.ndjson')
+
+    @staticmethod
+    def delete_catalog():
+        Subject.objects.all().delete()
+        Lesson.objects.all().delete()
+
+    def export(self):
+        stream = StringIO()
+        export_catalog(stream)
+        return stream.getvalue()
+
+    def write_catalog(self, content):
+        with open(self.path, 'w', encoding='utf-8') as catalog:
+            catalog.write(content)
+
+    def test_exported_catalog_is_imported_back(self):
+        call_command('export_catalog', self.path, stdout=StringIO())
+        with open(self.path, encoding='utf-8') as catalog:
+            exported = catalog.read()
+        self.delete_catalog()
+        call_command('import_catalog', self.path, batch_size=2, stdout=StringIO())
+        self.assertEqual(self.export(), exported)
+        self.assertEqual(LessonSnapshot.objects.count(), 1)
+        self.assertFalse(Subject.objects.filter(numeral=1, material_type='').exists())
+        task = Task.objects.get()
+        self.assertEqual(task.task_type, Task.TaskType.SINGLE_ANSWER)
+        self.assertEqual(Image.objects.count(), 2)
+
+    def test_catalog_is_exported_to_stdout_of_command(self):
+        stdout = StringIO()
+        call_command('export_catalog', stdout=stdout)
+        self.assertEqual(stdout.getvalue(), self.export())
+
+    def test_every_task_is_built_once(self):
+        self.write_catalog(self.export())
+        self.delete_catalog()
+        receiver = Mock()
+        post_init.connect(receiver, sender=Task)
+        self.addCleanup(post_init.disconnect, receiver, sender=Task)
+        call_command('import_catalog', self.path, stdout=StringIO())
+        self.assertEqual(receiver.call_count, 1)
+
+    def test_invalid_record_rolls_back_import(self):
+        lines = self.export().splitlines()
+        self.delete_catalog()
+        task_index = next(i for i, line in enumerate(lines) if json.loads(line)['type'] == 'task')
+        task = json.loads(lines[task_index])
+        task['answers'] = [{'answer_text': 'John', 'correct': 'yes'}]
+        lines[task_index] = json.dumps(task)
+        self.write_catalog('\n'.join(lines))
+        with self.assertRaisesMessage(CommandError, f'Line {task_index + 1}: answers'):
+            call_command('import_catalog', self.path, stdout=StringIO())
+        self.assertFalse(Lesson.objects.exists())
+
+    def test_import_is_resumed_after_checkpoint(self):
+        lines = self.export().splitlines()
+        self.delete_catalog()
+        lines.append('{"type": "unknown"}')
+        self.write_catalog('\n'.join(lines))
+        with self.assertRaisesMessage(CommandError, 'Unknown record type'):
+            call_command('import_catalog', self.path, commit_every=3, stdout=StringIO())
+        self.assertTrue(Lesson.objects.exists())
+        with open(f'{self.path}.checkpoint') as checkpoint:
+            self.assertEqual(json.load(checkpoint)['line'], (len(lines) - 1) // 3 * 3)
+
+        self.write_catalog('\n'.join(lines[:-1]))
+        stdout = StringIO()
+        call_command('import_catalog', self.path, commit_every=3, resume=True, stdout=stdout)
+        self.assertIn('Resuming', stdout.getvalue())
+        self.assertEqual(Subject.objects.count(), 7)
+        self.assertEqual(Task.objects.count(), 1)
+        self.assertFalse(os.path.exists(f'{self.path}.checkpoint'))
+
+
+class CatalogExportSnapshotTest(TransactionTestCase):
+    """ Export reads tables while other connections commit, so data has to be committed. """
+
+    def test_writes_committed_during_export_are_not_exported(self):
+        lesson = Lesson.objects.create(numeral=1, title='Lesson')
+        Subject.objects.create(numeral=1, lesson=lesson, title='Exported subject')
+
+        def write():
+            try:
+                Subject.objects.create(numeral=2, lesson=lesson, title='Subject written during export')
+            finally:
+                connection.close()
+
+        records = iter_catalog_records()
+        self.assertEqual([next(records)['type'], next(records)['type']], ['catalog', 'lesson'])
+        thread = threading.Thread(target=write)
+        thread.start()
+        thread.join()
+        subjects = [record['title'] for record in records if record['type'] == 'subject']
+        self.assertEqual(subjects, ['Exported subject'])
@@ -0,0 +1,81 @@
+import time
+
+import psycopg2
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from mock import Mock
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INTRANS
+
+from config.postgresql_pool.pool import ConnectionPool, PoolTimeout, get_pools_stats
+
+
+def make_connection():
+    database_connection = Mock(closed=False, autocommit=True)
+    database_connection.info.transaction_status = TRANSACTION_STATUS_IDLE
+    return database_connection, None
+
+
+class ConnectionPoolTest(SimpleTestCase):
+
+    def test_released_connection_is_reused(self):
+        pool = ConnectionPool(make_connection)
+        pooled = pool.acquire()
+        pool.release(pooled)
+        self.assertIs(pool.acquire(), pooled)
+        self.assertEqual(pool.get_stats()['created'], 1)
+
+    def test_acquire_raises_timeout_when_pool_is_exhausted(self):
+        pool = ConnectionPool(make_connection, max_size=1, acquire_timeout=0.01)
+        pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        self.assertEqual(pool.get_stats()['timeouts'], 1)
+
+    def test_connection_is_recycled_after_max_lifetime(self):
+        pool = ConnectionPool(make_connection, max_lifetime=0)
+        pooled = pool.acquire()
+        time.sleep(0.001)
+        pool.release(pooled)
+        self.assertIsNot(pool.acquire(), pooled)
+        pooled.connection.close.assert_called_once()
+
+    def test_connection_failing_ping_is_replaced(self):
+        pool = ConnectionPool(make_connection, ping_interval=0)
+        pooled = pool.acquire()
+        pool.release(pooled)
+        pooled.connection.cursor.side_effect = psycopg2.OperationalError
+        self.assertIsNot(pool.acquire(), pooled)
+        self.assertEqual(pool.get_stats()['failed_checks'], 1)
+
+    def test_open_transaction_is_rolled_back_on_release(self):
+        pool = ConnectionPool(make_connection)
+        pooled = pool.acquire()
+        pooled.connection.info.transaction_status = TRANSACTION_STATUS_INTRANS
+        pool.release(pooled)
+        pooled.connection.rollback.assert_called_once()
+        self.assertEqual(pool.get_stats()['idle'], 1)
+
+
+class PooledDatabaseTest(TestCase):
+
+    def test_default_database_uses_pool(self):
+        connection.ensure_connection()
+        stats = [stats for stats in get_pools_stats() if stats['database'] == connection.settings_dict['NAME']]
+        self.assertEqual(len(stats), 1)
+        self.assertEqual(stats[0]['in_use'], 1)
+
+    def test_pool_stats_view_returns_pools_to_staff(self):
+        connection.ensure_connection()
+        self.client.force_login(get_user_model().objects.create_user('staff@example.com', 'password', is_staff=True))
+        response = self.client.get(reverse('db-pool-stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('in_use', response.json()['pools'][0])
+
+    def test_pool_stats_view_is_not_public(self):
+        response = self.client.get(reverse('db-pool-stats'))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('admin:login'), response['Location'])
+        self.client.force_login(get_user_model().objects.create_user('user@example.com', 'password'))
+        self.assertEqual(self.client.get(reverse('db-pool-stats')).status_code, 302)
@@ -0,0 +1,95 @@
+from rest_framework.reverse import reverse
+from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
+from rest_framework.test import APIRequestFactory
+
+from qazline.grading import AnswerKey
+from qazline.models import QuizMaterial, Task
+from qazline.views import QuizMaterialViewSet
+from tests.setup import TestViewSetUp
+
+
+class AnswerKeyTest(TestViewSetUp):
+
+    @staticmethod
+    def build_key(question, answers):
+        return AnswerKey.from_task(Task.build(question=question, answers=answers))
+
+    def test_multiple_answers_task_is_correct_only_with_all_correct_answers(self):
+        key = self.build_key('Cities of Kazakhstan', [
+            {'answer_text': 'Astana', 'correct': True},
+            {'answer_text': 'Almaty', 'correct': True},
+            {'answer_text': 'Moscow', 'correct': False},
+        ])
+        self.assertEqual(key.grade([1, 0]), 1.0)
+        self.assertEqual(key.grade([0]), 0.0)
+        self.assertEqual(key.grade([0, 1, 2]), 0.0)
+
+    def test_fill_in_the_blank_task_gets_partial_score(self):
+        key = self.build_key('_____ and _____', [{'answer_text': 'Paris'}, {'answer_text': 'New  York'}])
+        self.assertEqual(key.grade([' paris', 'new york']), 1.0)
+        self.assertEqual(key.grade(['Paris', 'Boston']), 0.5)
+
+    def test_responses_of_wrong_type_are_rejected(self):
+        key = self.build_key('Hello my name is', [
+            {'answer_text': 'John', 'correct': True},
+            {'answer_text': 'James', 'correct': False},
+        ])
+        self.assertIsNone(key.clean([1]))
+        self.assertIsNotNone(key.clean([0, 1]))
+        self.assertIsNotNone(key.clean([2]))
+        self.assertIsNotNone(key.clean([True]))
+        self.assertIsNotNone(key.clean('0'))
+
+
+class QuizGradingViewTest(TestViewSetUp):
+
+    request_factory = APIRequestFactory()
+
+    def setUp(self):
+        super().setUp()
+        self.quiz_material = QuizMaterial.objects.get(topic='Add task')
+        self.single_answer_task = self.quiz_material.tasks.get()
+        self.fill_in_the_blank_task = Task.objects.create(
+            question='Capital of France is _____', answers=[{'answer_text': 'Paris'}], quiz_material=self.quiz_material,
+        )
+
+    def grade(self, data):
+        request = self.request_factory.post(
+            reverse('quiz-material-grade', args=[self.quiz_material.pk]), data, format='json',
+        )
+        view = QuizMaterialViewSet.as_view({'post': 'grade'})
+        return view(request, pk=self.quiz_material.pk)
+
+    def test_quiz_view_grades_attempt(self):
+        response = self.grade({'answers': {str(self.single_answer_task.pk): [0]}})
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.data, {
+            'score': 1.0,
+            'max_score': 2,
+            'tasks': [
+                {'id': self.single_answer_task.pk, 'score': 1.0, 'correct': True},
+                {'id': self.fill_in_the_blank_task.pk, 'score': 0.0, 'correct': False},
+            ],
+        })
+
+    def test_quiz_view_grades_batch_of_attempts_by_two_queries(self):
+        attempts = [
+            {'answers': {str(self.single_answer_task.pk): [1], str(self.fill_in_the_blank_task.pk): ['paris']}},
+            {'answers': {str(self.single_answer_task.pk): [0], str(self.fill_in_the_blank_task.pk): ['Paris']}},
+        ] * 10
+        # Quiz and its tasks
+        with self.assertNumQueries(2):
+            response = self.grade({'attempts': attempts})
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual([result['score'] for result in response.data['results']], [1.0, 2.0] * 10)
+
+    def test_quiz_view_rejects_tasks_of_other_quiz(self):
+        lesson = self.quiz_material.subject.lesson
+        subject = lesson.subjects.create(numeral=self.get_last_subject_numeral(), title='Other quiz')
+        other_quiz_material = QuizMaterial.objects.create(subject=subject, topic='Other quiz')
+        other_task = Task.objects.create(
+            question='Other', answers=[{'answer_text': 'A', 'correct': True}], quiz_material=other_quiz_material,
+        )
+        response = self.grade({'attempts': [{'answers': {str(other_task.pk): [0]}}]})
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertIn(str(other_task.pk), response.data['attempts'][0]['answers'])
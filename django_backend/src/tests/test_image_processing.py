@@ -0,0 +1,73 @@
+from io import StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from mock import patch
+from rest_framework.reverse import reverse
+from rest_framework.test import APIRequestFactory
+
+from qazline.image_processing import claim_jobs, process_job
+from qazline.models import Image, ImageMaterial, ImageProcessingJob, LessonSnapshot, fs
+from qazline.revisions import get_validators
+from qazline.snapshots import get_course_tree
+from qazline.views import ImageMaterialViewSet
+from tests.setup import TestViewSetUp
+
+
+class ImageProcessingTest(TestViewSetUp):
+
+    request_factory = APIRequestFactory()
+
+    def upload_image(self, content):
+        image_material = ImageMaterial.objects.get(topic='Put image topic')
+        request_dict = {
+            'images': SimpleUploadedFile(name='test_image.jpg', content=content, content_type='image/jpeg'),
+            'descriptions': 'Uploaded image',
+        }
+        image_url = reverse('image-material-detail', kwargs={'pk': image_material.pk})
+        request = self.request_factory.patch(image_url, request_dict, format='multipart')
+        view = ImageMaterialViewSet.as_view({'patch': 'partial_update'})
+        view(request, pk=image_material.pk)
+        return Image.objects.get(description='Uploaded image')
+
+    def test_uploaded_image_is_queued(self):
+        image = self.upload_image(open('tests/test.jpeg', 'rb').read())
+        self.assertEqual(image.status, Image.Status.PENDING)
+        self.assertTrue(ImageProcessingJob.objects.filter(image=image).exists())
+
+    def test_process_images_command_makes_thumbnail(self):
+        image = self.upload_image(open('tests/test.jpeg', 'rb').read())
+        call_command('process_images', once=True, workers=1, stdout=StringIO())
+        image.refresh_from_db()
+        self.assertEqual(image.status, Image.Status.READY)
+        self.assertTrue(image.thumbnail)
+        self.assertFalse(ImageProcessingJob.objects.filter(image=image).exists())
+
+    def test_process_images_command_marks_invalid_image_as_failed(self):
+        image = self.upload_image(b'not an image')
+        call_command('process_images', once=True, workers=1, stdout=StringIO())
+        image.refresh_from_db()
+        self.assertEqual(image.status, Image.Status.FAILED)
+        self.assertFalse(ImageProcessingJob.objects.filter(image=image).exists())
+
+    def test_failed_attempt_is_recorded_and_queued_again(self):
+        image = self.upload_image(open('tests/test.jpeg', 'rb').read())
+        job_pk, = claim_jobs(batch_size=10)
+        with patch.object(fs, 'save', side_effect=OSError('disk full')):
+            self.assertFalse(process_job(job_pk))
+        job = ImageProcessingJob.objects.get(pk=job_pk)
+        self.assertEqual(job.error, 'disk full')
+        self.assertIsNone(job.locked_at)
+        self.assertEqual(Image.objects.get(pk=image.pk).status, Image.Status.PENDING)
+        self.assertEqual(claim_jobs(batch_size=10), [job_pk])
+        self.assertTrue(process_job(job_pk))
+        self.assertEqual(Image.objects.get(pk=image.pk).status, Image.Status.READY)
+
+    def test_claimed_image_changes_revision_and_snapshot(self):
+        image = self.upload_image(open('tests/test.jpeg', 'rb').read())
+        get_course_tree()
+        etag, _ = get_validators([Image])
+        self.assertEqual(claim_jobs(batch_size=10), [image.processing_job.pk])
+        self.assertEqual(Image.objects.get(pk=image.pk).status, Image.Status.PROCESSING)
+        self.assertNotEqual(get_validators([Image])[0], etag)
+        self.assertIsNone(LessonSnapshot.objects.get(lesson_id=image.image_material.subject.lesson_id).tree)
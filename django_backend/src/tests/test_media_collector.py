@@ -0,0 +1,50 @@
+import os
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+
+from qazline.media_collector import sweep_scheduled_files
+from qazline.models import Image, ImageMaterial, FileDeletion, fs
+from tests.setup import TestViewSetUp
+
+
+class MediaCollectorTest(TestViewSetUp):
+
+    def test_deleted_files_are_kept_until_sweep(self):
+        image_material = ImageMaterial.objects.get(topic='Put image topic')
+        name = Image.objects.first().image.name
+        Image.objects.all().delete()
+        self.assertTrue(fs.exists(name))
+        self.assertTrue(FileDeletion.objects.filter(name=name).exists())
+        self.assertEqual(sweep_scheduled_files(), (1, 1))
+        self.assertFalse(fs.exists(name))
+        self.assertFalse(FileDeletion.objects.exists())
+        self.assertFalse(image_material.images.exists())
+
+    def test_sweep_media_command_deletes_scheduled_unreferenced_files(self):
+        first_image, second_image = Image.objects.all()
+        path = fs.path(first_image.image.name)
+        first_image.delete()
+        stdout = StringIO()
+        call_command('sweep_media', once=True, batch_size=1, stdout=stdout)
+        self.assertTrue(os.path.isfile(path))
+        self.assertIn('Checked files: 1, deleted files: 0', stdout.getvalue())
+        second_image.delete()
+        call_command('sweep_media', once=True, stdout=StringIO())
+        self.assertFalse(os.path.isfile(path))
+        self.assertFalse(FileDeletion.objects.exists())
+
+    def test_reconcile_media_command_deletes_orphans_only(self):
+        orphan_name = fs.save('orphan.txt', ContentFile(b'orphan'))
+        image_path = fs.path(Image.objects.first().image.name)
+        stdout = StringIO()
+        call_command('reconcile_media', min_age=0, batch_size=1, stdout=stdout)
+        self.assertFalse(fs.exists(orphan_name))
+        self.assertTrue(os.path.isfile(image_path))
+        self.assertIn('orphan files deleted: 1', stdout.getvalue())
+
+    def test_reconcile_media_command_dry_run_keeps_files(self):
+        orphan_name = fs.save('orphan.txt', ContentFile(b'orphan'))
+        call_command('reconcile_media', min_age=0, dry_run=True, stdout=StringIO())
+        self.assertTrue(fs.exists(orphan_name))
@@ -0,0 +1,70 @@
+import json
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from mock import patch
+
+from qazline.middleware import QueryRecorder, get_fingerprint
+from qazline.models import Lesson, Subject
+
+
+class QueryRecorderTest(TestCase):
+
+    def setUp(self):
+        lesson = Lesson.objects.create(numeral=1, title='Lesson')
+        for numeral in range(1, 6):
+            Subject.objects.create(numeral=numeral, lesson=lesson, title=f'Subject #{numeral}')
+
+    def test_fingerprint_ignores_number_of_list_parameters(self):
+        self.assertEqual(
+            get_fingerprint('SELECT * FROM t WHERE id IN (%s, %s)'),
+            get_fingerprint('SELECT *  FROM t\nWHERE id IN (%s, %s, %s)'),
+        )
+
+    def test_repeated_query_is_reported(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for subject in Subject.objects.all():
+                subject.has_video_material()
+        self.assertEqual(recorder.n_queries, 6)
+        repeated_queries = recorder.get_repeated_queries(threshold=5)
+        self.assertEqual(len(repeated_queries), 1)
+        self.assertEqual(repeated_queries[0]['count'], 5)
+        self.assertEqual(recorder.get_repeated_queries(threshold=6), [])
+
+
+class QueryInstrumentationMiddlewareTest(TestCase):
+
+    @override_settings(QUERY_INSTRUMENTATION={'SAMPLE_RATE': 1, 'N_PLUS_ONE_THRESHOLD': 5})
+    def test_summary_is_logged(self):
+        with self.assertLogs('qazline.queries', 'INFO') as logs:
+            response = self.client.get(reverse('lesson-list'))
+        summary = json.loads(logs.records[0].getMessage())
+        self.assertEqual(summary['status'], response.status_code)
+        self.assertEqual(summary['view'], 'lesson-list')
+        self.assertGreater(summary['queries'], 0)
+        self.assertEqual(summary['n_plus_one'], [])
+
+    @override_settings(QUERY_INSTRUMENTATION={'SAMPLE_RATE': 0})
+    def test_request_is_not_sampled(self):
+        with patch('qazline.middleware.logger') as logger:
+            self.client.get(reverse('lesson-list'))
+        logger.info.assert_not_called()
+        logger.warning.assert_not_called()
+
+    @override_settings(QUERY_INSTRUMENTATION={'SAMPLE_RATE': 1, 'N_PLUS_ONE_THRESHOLD': 5})
+    def test_queries_of_streaming_response_are_counted(self):
+        lesson = Lesson.objects.create(numeral=1, title='Lesson')
+        for numeral in range(1, 6):
+            Subject.objects.create(numeral=numeral, lesson=lesson, title=f'Subject #{numeral}')
+        with self.assertLogs('qazline.queries', 'INFO') as logs:
+            response = self.client.get(reverse('subject-list'), {'stream': 1})
+            self.assertTrue(response.streaming)
+            logger_records = list(logs.records)
+            content = b''.join(response.streaming_content)
+        self.assertEqual(logger_records, [])
+        self.assertEqual(len(json.loads(content)), 5)
+        summary = json.loads(logs.records[0].getMessage())
+        # Validators are read by the view, subjects while response is sent
+        self.assertEqual(summary['queries'], 2)
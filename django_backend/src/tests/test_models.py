@@ -1,6 +1,6 @@
 from django.core.exceptions import ValidationError
 from django.core.files import File
-from django.db import IntegrityError
+from django.db import IntegrityError, connection, transaction
 from mock import Mock
 
 from qazline.models import (
@@ -21,6 +21,56 @@ class ModelsTest(TestModelSetUp):
             image_material = ImageMaterial.objects.create(topic='image', subject=subject)
             Image.objects.create(image=file_mock, image_material=image_material)
 
+    def test_material_sets_material_type_of_subject(self):
+        subject = Subject.objects.filter(material_type=Subject.MaterialType.NO_MATERIAL).first()
+        quiz_material = QuizMaterial.objects.create(topic='quiz', subject=subject)
+        subject.refresh_from_db()
+        self.assertEqual(subject.material_type, Subject.MaterialType.QUIZ)
+        self.assertEqual(subject.get_material(), quiz_material)
+
+    def test_bulk_create_materials_sets_material_type_of_subjects(self):
+        subjects = list(Subject.objects.all()[:3])
+        VideoMaterial.objects.bulk_create([
+            VideoMaterial(subject=subject, url='http://sample.com') for subject in subjects
+        ])
+        material_types = set(
+            Subject.objects.filter(pk__in=[subject.pk for subject in subjects]).values_list('material_type', flat=True)
+        )
+        self.assertEqual(material_types, {Subject.MaterialType.VIDEO})
+
+    def test_bulk_create_materials_raises_integrity_error_on_subject_with_material(self):
+        subject, other_subject = Subject.objects.all()[:2]
+        QuizMaterial.objects.create(topic='quiz', subject=subject)
+        with self.assertRaises(IntegrityError):
+            AssignmentMaterial.objects.bulk_create([
+                AssignmentMaterial(subject=subject), AssignmentMaterial(subject=other_subject),
+            ])
+        self.assertFalse(AssignmentMaterial.objects.exists())
+        other_subject.refresh_from_db()
+        self.assertEqual(other_subject.material_type, Subject.MaterialType.NO_MATERIAL)
+
+    def test_database_rejects_material_of_unclaimed_subject(self):
+        subject = Subject.objects.filter(material_type=Subject.MaterialType.NO_MATERIAL).first()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            # Raw save, like loaddata does, bypasses claim of subject
+            VideoMaterial(topic='video', subject=subject, url='http://sample.com').save_base(raw=True)
+            connection.check_constraints()
+
+    def test_database_rejects_other_material_type_of_subject_with_material(self):
+        subject = Subject.objects.filter(material_type=Subject.MaterialType.NO_MATERIAL).first()
+        QuizMaterial.objects.create(topic='quiz', subject=subject)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Subject.objects.filter(pk=subject.pk).update(material_type=Subject.MaterialType.VIDEO)
+            connection.check_constraints()
+
+    def test_update_material_does_not_check_other_material_tables(self):
+        subject = Subject.objects.first()
+        material = AssignmentMaterial.objects.create(topic='assignment', subject=subject)
+        material.topic = 'updated assignment'
+        # Update of material, invalidation of lesson snapshot and revision bump
+        with self.assertNumQueries(3):
+            material.save()
+
     def test_delete_material_also_delete_subject(self):
         last_subject_numeral = Subject.objects.order_by('-numeral').first().numeral + 1
         subject = Subject.objects.create(numeral=last_subject_numeral, title='deleted subject title')
@@ -0,0 +1,72 @@
+import json
+
+from django.db.models import Prefetch
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from qazline.models import Lesson, Subject, Image, Task, QuizMaterial, get_subclasses
+from qazline.read_serializers import LessonReadSerializer, QuizMaterialReadSerializer, MATERIAL_READ_SERIALIZERS
+from qazline.renderers import FastJSONRenderer
+from qazline.serializers import LessonSerializer, MATERIAL_SERIALIZERS
+from tests.setup import TestViewSetUp
+
+
+class ReadSerializersTest(TestViewSetUp):
+
+    renderer = FastJSONRenderer()
+
+    def setUp(self):
+        super().setUp()
+        Lesson.objects.create(numeral=2, title='Lesson without subjects')
+        lesson = Lesson.objects.create(numeral=3, title='Лексика')
+        for numeral in (3, 1, 2):
+            Subject.objects.create(numeral=numeral, lesson=lesson, title=f'Тақырып {numeral}')
+        Image.objects.filter(pk=Image.objects.first().pk).update(thumbnail='thumbnail.jpg')
+        Task.objects.create(
+            question='Capital of France is _____', answers=[{'answer_text': 'Paris'}],
+            quiz_material=QuizMaterial.objects.get(),
+        )
+        self.context = {'request': Request(APIRequestFactory().get('/'))}
+
+    def assertSameJSON(self, data, read_data):
+        self.assertEqual(self.renderer.render(read_data), self.renderer.render(data))
+
+    def test_lessons_are_rendered_the_same(self):
+        lessons = Lesson.objects.prefetch_related(Prefetch('subjects', queryset=Subject.objects.order_by('numeral')))
+        rows = Lesson.objects.values(*LessonReadSerializer.fields)
+        self.assertSameJSON(
+            LessonSerializer(lessons.order_by('numeral'), many=True).data,
+            LessonReadSerializer(rows.order_by('numeral'), many=True).data,
+        )
+        self.assertSameJSON(LessonSerializer(lessons.get(pk=3)).data, LessonReadSerializer(rows.get(pk=3)).data)
+
+    def test_materials_are_rendered_the_same(self):
+        for model in get_subclasses():
+            material_type = model._meta.model_name
+            materials = list(model.objects.prefetch_related(*model.prefetch_children).order_by('pk'))
+            self.assertTrue(materials, material_type)
+            for context in ({}, self.context):
+                self.assertSameJSON(
+                    MATERIAL_SERIALIZERS[material_type](materials, many=True, context=context).data,
+                    MATERIAL_READ_SERIALIZERS[material_type](materials, many=True, context=context).data,
+                )
+                self.assertSameJSON(
+                    MATERIAL_SERIALIZERS[material_type](materials[0], context=context).data,
+                    MATERIAL_READ_SERIALIZERS[material_type](materials[0], context=context).data,
+                )
+
+    def test_read_serializers_read_children_of_all_materials_by_one_query(self):
+        for model in get_subclasses():
+            materials = list(model.objects.all())
+            read_serializer = MATERIAL_READ_SERIALIZERS[model._meta.model_name](materials, many=True)
+            with self.assertNumQueries(1 if model.prefetch_children else 0):
+                read_serializer.data
+
+    def test_raw_answers_are_the_same_json_as_decoded_answers(self):
+        materials = list(QuizMaterial.objects.order_by('pk'))
+        data = QuizMaterialReadSerializer(materials, many=True).data
+        raw_data = QuizMaterialReadSerializer(materials, many=True, raw_answers=True).data
+        self.assertEqual(json.loads(self.renderer.render(raw_data)), json.loads(self.renderer.render(data)))
+        # Stored JSON text is formatted by PostgreSQL, decoded answers are rendered compact
+        self.assertIn(b'"answers":[{"answer_text": "Paris"}]', self.renderer.render(raw_data))
+        self.assertIn(b'"answers":[{"answer_text":"Paris"}]', self.renderer.render(data))
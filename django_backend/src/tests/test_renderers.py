@@ -0,0 +1,94 @@
+import datetime
+import decimal
+import io
+import json
+import uuid
+
+from django.utils.translation import gettext_lazy
+from mock import patch
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.reverse import reverse
+from rest_framework.test import APIRequestFactory
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from qazline import renderers
+from qazline.models import Task
+from qazline.renderers import FastJSONRenderer, FastJSONParser, RawJSON
+from qazline.views import QuizMaterialViewSet, TaskRetrieveUpdateDestroyView
+from tests.setup import TestViewSetUp
+
+
+class FastJSONRendererTest(TestViewSetUp):
+
+    request_factory = APIRequestFactory()
+    renderer = FastJSONRenderer()
+    data = ReturnDict({
+        'text': 'Қазақ тілі  ',
+        'number': 1.5,
+        'decimal': decimal.Decimal('2.50'),
+        'datetime': datetime.datetime(2021, 2, 3, 4, 5, 6, 789012, tzinfo=datetime.timezone.utc),
+        'date': datetime.date(2021, 2, 3),
+        'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'lazy': gettext_lazy('Not found.'),
+        'list': ReturnList([(1, None), {2: True}], serializer=None),
+    }, serializer=None)
+
+    def test_output_is_the_same_as_of_json_renderer(self):
+        self.assertEqual(self.renderer.render(self.data), JSONRenderer().render(self.data))
+        self.assertEqual(self.renderer.render(None), b'')
+
+    def test_output_is_the_same_without_orjson(self):
+        with patch.object(renderers, 'orjson', None):
+            self.assertEqual(self.renderer.render(self.data), JSONRenderer().render(self.data))
+
+    def test_raw_json_is_rendered_as_it_is(self):
+        data = {'answers': RawJSON('[{"correct": true, "answer_text": "Қ"}]')}
+        self.assertEqual(self.renderer.render(data), '{"answers":[{"correct": true, "answer_text": "Қ"}]}'.encode())
+
+    def test_raw_json_is_decoded_for_indented_output(self):
+        data = {'answers': RawJSON('[{"correct": true}]')}
+        self.assertEqual(
+            self.renderer.render(data, 'application/json; indent=2'),
+            JSONRenderer().render({'answers': [{'correct': True}]}, 'application/json; indent=2'),
+        )
+
+    def test_parser_parses_json(self):
+        parser = FastJSONParser()
+        content = '{"answers": [{"answer_text": "Қ"}]}'
+        self.assertEqual(parser.parse(io.BytesIO(content.encode())), json.loads(content))
+        self.assertEqual(
+            parser.parse(io.BytesIO(content.encode('utf-16')), parser_context={'encoding': 'utf-16'}),
+            json.loads(content),
+        )
+        with self.assertRaises(ParseError):
+            parser.parse(io.BytesIO(b'{"answers": NaN}'))
+
+    def test_task_answers_are_read_and_rendered_as_stored(self):
+        task = Task.objects.get()
+        stored_answers = Task.objects.with_raw_answers().get(pk=task.pk).raw_answers
+        request = self.request_factory.get(reverse('task-detail', args=[task.pk]))
+        with patch('django.db.models.JSONField.from_db_value') as from_db_value:
+            response = TaskRetrieveUpdateDestroyView.as_view()(request, pk=task.pk).render()
+        decoded_fields = [call.args[1].target.name for call in from_db_value.call_args_list]
+        self.assertNotIn('answers', decoded_fields)
+        self.assertIn(f'"answers":{stored_answers},'.encode(), response.content)
+        self.assertEqual(json.loads(response.content)['answers'], task.answers)
+
+    def test_quiz_answers_are_rendered_as_stored(self):
+        task = Task.objects.get()
+        stored_answers = Task.objects.with_raw_answers().get(pk=task.pk).raw_answers
+        pk = task.quiz_material_id
+        request = self.request_factory.get(reverse('quiz-material-detail', args=[pk]))
+        response = QuizMaterialViewSet.as_view({'get': 'retrieve'})(request, pk=pk).render()
+        self.assertIn(f'"answers":{stored_answers},'.encode(), response.content)
+        self.assertEqual(json.loads(response.content)['tasks'][0]['answers'], task.answers)
+
+    def test_updated_task_answers_are_rendered(self):
+        task = Task.objects.get()
+        answers = [{'answer_text': 'Paris', 'correct': True}, {'answer_text': 'Rome', 'correct': False}]
+        request = self.request_factory.patch(
+            reverse('task-detail', args=[task.pk]), {'answers': answers}, format='json',
+        )
+        response = TaskRetrieveUpdateDestroyView.as_view()(request, pk=task.pk).render()
+        self.assertEqual(json.loads(response.content)['answers'], answers)
@@ -0,0 +1,22 @@
+from django.test import TestCase
+
+from qazline.models import Revision, Lesson, Subject
+from qazline.revisions import bump_revisions, get_validators
+
+
+class RevisionsTest(TestCase):
+
+    def test_counters_are_created_and_incremented_by_one_statement(self):
+        Revision.objects.all().delete()
+        with self.assertNumQueries(1):
+            bump_revisions([Lesson, Subject, Subject])
+        self.assertEqual(dict(Revision.objects.values_list('name', 'number')), {'lesson': 1, 'subject': 1})
+        etag, _ = get_validators([Lesson, Subject])
+        with self.assertNumQueries(1):
+            bump_revisions([Subject])
+        self.assertEqual(dict(Revision.objects.values_list('name', 'number')), {'lesson': 1, 'subject': 2})
+        self.assertNotEqual(get_validators([Lesson, Subject])[0], etag)
+
+    def test_nothing_is_written_without_models(self):
+        with self.assertNumQueries(0):
+            bump_revisions([])
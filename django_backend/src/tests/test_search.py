@@ -0,0 +1,98 @@
+from django.contrib.postgres.search import SearchRank, SearchVector
+from django.db import connection
+from mock import patch
+from rest_framework.reverse import reverse
+from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
+from rest_framework.test import APIRequestFactory
+
+from qazline.models import Subject, AssignmentMaterial, Task
+from qazline import search as search_module
+from qazline.search import SEARCH_CONFIG, get_search_query, search
+from qazline.views import SearchView
+from tests.setup import TestViewSetUp
+
+
+class SearchViewTest(TestViewSetUp):
+
+    request_factory = APIRequestFactory()
+
+    def search(self, **params):
+        request = self.request_factory.get(reverse('search'), params)
+        return SearchView.as_view()(request)
+
+    def test_search_finds_subjects_materials_and_tasks_by_beginning_of_word(self):
+        response = self.search(q='subj')
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(
+            {(result['type'], result['field']) for result in response.data['results']},
+            {('subject', 'title'), ('imagematerial', 'topic')},
+        )
+        response = self.search(q='TASK')
+        self.assertEqual(
+            {(result['type'], result['field'], result['text']) for result in response.data['results']},
+            {('assignmentmaterial', 'task', 'sample task'), ('quizmaterial', 'topic', 'Add task')},
+        )
+
+    def test_results_refer_to_lesson_and_subject_numerals(self):
+        task = Task.objects.get()
+        response = self.search(q='hello name')
+        self.assertEqual(response.data['results'], [{
+            'type': 'task', 'field': 'question', 'id': task.pk, 'lesson': 1, 'subject': 6,
+            'text': 'Hello my name is', 'rank': response.data['results'][0]['rank'],
+        }])
+
+    def test_results_are_ordered_by_rank_and_limited(self):
+        Subject.objects.filter(numeral=7).update(title='image image image')
+        response = self.search(q='image', limit=2)
+        results = response.data['results']
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]['text'], 'image image image')
+        self.assertGreaterEqual(results[0]['rank'], results[1]['rank'])
+
+    def test_best_rows_of_source_are_returned_regardless_of_order_of_rows(self):
+        quiz_material = Task.objects.get().quiz_material
+        Task.objects.bulk_create([
+            Task(question=f'capital {"capital " * (i % 3)}#{i}', answers=[], quiz_material=quiz_material)
+            for i in range(30)
+        ])
+        results = search('capital', limit=10)
+        query = get_search_query('capital')
+        vector = SearchVector('question', config=SEARCH_CONFIG)
+        ranks = Task.objects.annotate(search=vector, rank=SearchRank(vector, query)).filter(search=query).order_by(
+            '-rank',
+        ).values_list('rank', flat=True)
+        self.assertEqual([result['rank'] for result in results], list(ranks[:10]))
+
+    def test_only_candidates_of_source_are_ranked(self):
+        quiz_material = Task.objects.get().quiz_material
+        Task.objects.bulk_create([Task(question='capital', answers=[], quiz_material=quiz_material) for _ in range(10)])
+        with patch.object(search_module, 'MAX_CANDIDATES', 3):
+            self.assertEqual(len(search('capital', limit=10)), 3)
+
+    def test_short_words_are_matched_as_whole_words(self):
+        Subject.objects.filter(numeral=7).update(title='su suite')
+        self.assertEqual([result['text'] for result in self.search(q='SU').data['results']], ['su suite'])
+        self.assertEqual(self.search(q='ta').data['results'], [])
+        self.assertEqual(len(self.search(q='tas').data['results']), 2)
+
+    def test_search_matches_kazakh_and_russian_words(self):
+        AssignmentMaterial.objects.update(task='Оқулық: қазақ тілінің грамматикасы, упражнения по грамматике')
+        response = self.search(q='ҚАЗАҚ грамм')
+        self.assertEqual([result['type'] for result in response.data['results']], ['assignmentmaterial'])
+        response = self.search(q='упражнение')
+        self.assertEqual(response.data['results'], [])
+
+    def test_query_without_words_returns_no_results(self):
+        response = self.search(q='?!')
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.data['results'], [])
+
+    def test_invalid_parameters_are_rejected(self):
+        self.assertEqual(self.search().status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.search(q='task', limit=0).status_code, HTTP_400_BAD_REQUEST)
+
+    def test_searched_columns_have_indexes(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT indexname FROM pg_indexes WHERE indexname LIKE '%%_search_idx'")
+            index_names = {row[0] for row in cursor.fetchall()}
+        self.assertEqual(len(index_names), 7)
@@ -0,0 +1,75 @@
+import os
+import threading
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from rest_framework.test import APIRequestFactory
+
+from qazline.media_collector import delete_unreferenced_files, sweep_scheduled_files
+from qazline.models import Image, ImageMaterial, fs
+from qazline.views import serve_media
+from tests.setup import TestViewSetUp, MEDIA_ROOT
+
+
+class ContentAddressedStorageTest(TestViewSetUp):
+
+    def test_identical_images_are_stored_once(self):
+        names = set(Image.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertRegex(name, r'^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+        self.assertTrue(fs.exists(name))
+
+    def test_different_content_is_stored_under_different_names(self):
+        first_name = fs.save('first.txt', ContentFile(b'first'))
+        second_name = fs.save('second.txt', ContentFile(b'second'))
+        self.assertNotEqual(first_name, second_name)
+        self.assertEqual(fs.save('again.txt', ContentFile(b'first')), first_name)
+        self.assertEqual(os.listdir(os.path.dirname(fs.path(first_name))), [os.path.basename(first_name)])
+
+    def test_shared_file_is_deleted_with_last_image(self):
+        first_image, second_image = Image.objects.all()
+        path = first_image.image.path
+        first_image.delete()
+        sweep_scheduled_files()
+        self.assertTrue(os.path.isfile(path))
+        second_image.delete()
+        sweep_scheduled_files()
+        self.assertFalse(os.path.isfile(path))
+
+    def test_uploaded_image_reuses_stored_file(self):
+        image_material = ImageMaterial.objects.get(topic='Put image topic')
+        image_file = SimpleUploadedFile(name='copy.JPG', content=open('tests/test.jpeg', 'rb').read())
+        stored_name = Image.objects.first().image.name
+        image = Image.objects.create(image=image_file, image_material=image_material)
+        self.assertEqual(image.image.name, stored_name)
+
+    def test_serve_media_returns_immutable_cache_headers(self):
+        name = Image.objects.first().image.name
+        request = APIRequestFactory().get(f'/media/{name}')
+        response = serve_media(request, name, document_root=MEDIA_ROOT)
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_media_is_served_with_immutable_cache_headers_without_debug(self):
+        name = Image.objects.first().image.name
+        response = self.client.get(f'/media/{name}')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_sweep_skips_file_reused_by_upload_in_progress(self):
+        name = fs.save('first.txt', ContentFile(b'first'))
+        # Transaction of test is not committed, so the name stays locked by the save
+
+        def sweep():
+            try:
+                deleted.update(delete_unreferenced_files([name]))
+            finally:
+                connection.close()
+
+        deleted = set()
+        thread = threading.Thread(target=sweep)
+        thread.start()
+        thread.join()
+        self.assertEqual(deleted, set())
+        self.assertTrue(fs.exists(name))
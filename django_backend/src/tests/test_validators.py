@@ -0,0 +1,45 @@
+import jsonschema
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase
+
+from qazline.validators import ANSWER_JSON_FIELD_SCHEMA, JSONSchemaValidator, get_schema_validator
+
+
+class JSONSchemaValidatorTest(SimpleTestCase):
+
+    answers_samples = [
+        [{'answer_text': 'John', 'correct': True}, {'answer_text': 'James', 'correct': False}],
+        [{'answer_text': 'John'}],
+        [],
+        [{'answer_text': 'John'}] * 11,
+        [{'answer_text': 1}],
+        [{'answer_text': 'John', 'correct': 1}],
+        [{'answer_text': 'John', 'correct': None}],
+        [{'correct': True}],
+        [{'answer_text': 'John', 'extra': 'value'}],
+        ['John'],
+        {'answer_text': 'John'},
+        'John',
+        None,
+    ]
+
+    def test_answers_fast_path_agrees_with_jsonschema(self):
+        validator = get_schema_validator(ANSWER_JSON_FIELD_SCHEMA)
+        for value in self.answers_samples:
+            with self.subTest(value=value):
+                expected = jsonschema.Draft7Validator(ANSWER_JSON_FIELD_SCHEMA).is_valid(value)
+                self.assertEqual(validator.is_valid(value), expected)
+
+    def test_validator_is_built_once_per_schema(self):
+        schema = {'type': 'array', 'items': {'type': 'integer'}}
+        self.assertIs(get_schema_validator(schema), get_schema_validator(schema))
+
+    def test_validator_raises_validation_error_on_invalid_value(self):
+        validator = JSONSchemaValidator(limit_value=ANSWER_JSON_FIELD_SCHEMA)
+        with self.assertRaises(ValidationError):
+            validator([{'aaaa': 'John'}])
+
+    def test_validate_many_returns_errors_by_index(self):
+        validator = JSONSchemaValidator(limit_value=ANSWER_JSON_FIELD_SCHEMA)
+        errors = validator.validate_many([[{'answer_text': 'John'}], [], [{'answer_text': 'Jack'}], None])
+        self.assertEqual(sorted(errors), [1, 3])
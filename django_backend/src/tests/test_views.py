@@ -1,19 +1,28 @@
 import json
 from collections import OrderedDict
 
+from asgiref.sync import async_to_sync
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.handlers.asgi import ASGIHandler
+from django.core.signals import request_started
+from django.db import close_old_connections, connection
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework.reverse import reverse
-from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_404_NOT_FOUND, HTTP_400_BAD_REQUEST
+from rest_framework.status import (
+    HTTP_200_OK, HTTP_201_CREATED, HTTP_404_NOT_FOUND, HTTP_400_BAD_REQUEST, HTTP_304_NOT_MODIFIED,
+)
 from rest_framework.test import APIRequestFactory
 
 from qazline.models import (
-    Subject, VideoMaterial, AssignmentMaterial, Lesson, ImageMaterial, QuizMaterial, Task,
+    Subject, VideoMaterial, AssignmentMaterial, Lesson, LessonSnapshot, ImageMaterial, QuizMaterial, Task,
 )
 from qazline.views import (
     VideoMaterialViewSet, AssignmentMaterialViewSet, SubjectMaterialDetailView, SubjectListView,
-    ImageMaterialViewSet, QuizMaterialViewSet,
+    ImageMaterialViewSet, QuizMaterialViewSet, CourseTreeView, LessonViewSet,
 )
+from qazline.pagination import KeysetPagination
+from qazline.snapshots import get_course_tree
 from tests.setup import TestViewSetUp
 
 
@@ -87,6 +96,8 @@ class SubjectMaterialViewsTest(TestViewSetUp):
                     # TODO Find out how to get image url in unittest
                     ('image', f'http://testserver{image.image.url}'),
                     ('description', image.description),
+                    ('thumbnail', None),
+                    ('status', image.status),
                 ]) for image in image_material.images.all()
             ]
         }
@@ -125,13 +136,15 @@ class SubjectMaterialViewsTest(TestViewSetUp):
             'topic': quiz_material.topic,
             'tasks': [
                 OrderedDict([
+                    ('id', task.pk),
                     ('question', task.question),
                     ('answers', task.answers),
                     ('task_type', task.task_type),
                 ]) for task in quiz_material.tasks.all()
             ],
         }
-        self.assertEqual(response.data, expected_response)
+        # Answers are stored JSON text, which is rendered as it is
+        self.assertEqual(json.loads(response.render().content), expected_response)
 
     def test_subject_detail_view_returns_not_found_when_subject_without_material(self):
         subject = Subject.objects.select_related('lesson').get(title='Empty subject')
@@ -146,6 +159,34 @@ class SubjectMaterialViewsTest(TestViewSetUp):
         response = view(request, subject_numeral=subject_numeral, lesson_numeral=lesson_numeral)
         self.assertEqual(response.status_code, HTTP_404_NOT_FOUND)
 
+    def test_subject_detail_view_resolves_video_material_by_one_query_after_validators(self):
+        video_material = VideoMaterial.objects.select_related('subject').first()
+        subject_numeral = video_material.subject.numeral
+        lesson_numeral = video_material.subject.lesson_id
+        subject_url = reverse(
+            'subject-material-detail',
+            kwargs={'subject_numeral': subject_numeral, 'lesson_numeral': lesson_numeral}
+        )
+        request = self.request_factory.get(subject_url)
+        view = SubjectMaterialDetailView.as_view()
+        with self.assertNumQueries(2):
+            response = view(request, subject_numeral=subject_numeral, lesson_numeral=lesson_numeral)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+
+    def test_subject_detail_view_resolves_quiz_material_with_tasks_by_two_queries_after_validators(self):
+        quiz_material = QuizMaterial.objects.select_related('subject').first()
+        subject_numeral = quiz_material.subject.numeral
+        lesson_numeral = quiz_material.subject.lesson_id
+        subject_url = reverse(
+            'subject-material-detail',
+            kwargs={'subject_numeral': subject_numeral, 'lesson_numeral': lesson_numeral}
+        )
+        request = self.request_factory.get(subject_url)
+        view = SubjectMaterialDetailView.as_view()
+        with self.assertNumQueries(3):
+            response = view(request, subject_numeral=subject_numeral, lesson_numeral=lesson_numeral)
+        self.assertEqual(len(response.data['tasks']), 1)
+
 
 class ViewsTest(TestViewSetUp):
 
@@ -449,6 +490,49 @@ class ViewsTest(TestViewSetUp):
         self.assertEqual(response.status_code, HTTP_200_OK)
         self.assertEqual(2, n_task)
 
+    def test_quiz_view_reports_task_errors_by_index(self):
+        subject_numeral = self.get_last_subject_numeral()
+        quiz_dict = {
+            'lesson': Lesson.objects.first().pk,
+            'subject_title': 'Quiz subject',
+            'subject_numeral': subject_numeral,
+            'topic': 'just topic',
+            'tasks': [
+                {
+                    'question': 'fill the blank task _____',
+                    'answers': [{'answer_text': 'first'}],
+                },
+                {
+                    'question': 'fill the blank task without blank',
+                    'answers': [{'answer_text': 'first'}],
+                },
+            ],
+        }
+        quiz_url = reverse('quiz-material-list')
+        request = self.request_factory.post(quiz_url, json.dumps(quiz_dict), content_type='application/json')
+        view = QuizMaterialViewSet.as_view({'post': 'create'})
+        response = view(request)
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['tasks'][0], {})
+        self.assertIn('answers', response.data['tasks'][1])
+        self.assertFalse(Subject.objects.filter(numeral=subject_numeral).exists())
+
+    def test_quiz_view_adds_tasks_by_one_insert(self):
+        quiz_material = QuizMaterial.objects.get(topic='Add task')
+        pk = quiz_material.pk
+        quiz_dict = {'tasks': [
+            {'question': f'question _____ #{i}', 'answers': [{'answer_text': 'answer'}]} for i in range(20)
+        ]}
+        quiz_url = reverse('quiz-material-detail', kwargs={'pk': pk})
+        request = self.request_factory.patch(quiz_url, json.dumps(quiz_dict), content_type='application/json')
+        view = QuizMaterialViewSet.as_view({'patch': 'partial_update'})
+        with CaptureQueriesContext(connection) as queries:
+            response = view(request, pk=pk)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        inserts = [query['sql'] for query in queries if query['sql'].startswith('INSERT INTO "qazline_task"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(21, quiz_material.tasks.count())
+
     def test_quiz_view_updates_subject_title_of_quiz_material(self):
         patched_subject_title = 'New subject title'
         quiz = QuizMaterial.objects.get(topic='Add task')
@@ -528,3 +612,272 @@ class ViewsTest(TestViewSetUp):
         n_task = quiz_material.tasks.count()
         self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
         self.assertEqual(1, n_task)
+
+
+class CourseTreeViewTest(TestViewSetUp):
+
+    request_factory = APIRequestFactory()
+
+    def get_course_tree(self, **params):
+        request = self.request_factory.get(reverse('course-tree'), params)
+        view = CourseTreeView.as_view()
+        return view(request)
+
+    def test_course_tree_view_returns_subjects_with_material_types(self):
+        response = self.get_course_tree()
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        subjects = response.data['lessons'][0]['subjects']
+        self.assertEqual(len(subjects), Subject.objects.count())
+        quiz_subject = next(subject for subject in subjects if subject['title'] == 'Quiz subject')
+        self.assertEqual(quiz_subject['material_type'], Subject.MaterialType.QUIZ)
+        self.assertEqual(quiz_subject['topic'], 'Add task')
+        self.assertNotIn('material', quiz_subject)
+
+    def test_course_tree_view_returns_full_materials(self):
+        response = self.get_course_tree(materials='full')
+        subjects = response.data['lessons'][0]['subjects']
+        video_subject = next(subject for subject in subjects if subject['title'] == 'Video subject')
+        self.assertEqual(video_subject['material']['url'], 'http://sample_video.com')
+
+    def test_course_tree_view_returns_absolute_image_urls_like_material_view(self):
+        image_material = ImageMaterial.objects.select_related('subject__lesson').get(topic='Put image topic')
+        subject = image_material.subject
+        kwargs = {'lesson_numeral': subject.lesson.numeral, 'subject_numeral': subject.numeral}
+        request = self.request_factory.get(reverse('subject-material-detail', kwargs=kwargs))
+        material_data = SubjectMaterialDetailView.as_view()(request, **kwargs).data
+        self.assertTrue(material_data['images'][0]['image'].startswith('http://testserver/'))
+        for _ in range(2):
+            subjects = self.get_course_tree(materials='full').data['lessons'][0]['subjects']
+            image_subject = next(subject_tree for subject_tree in subjects if subject_tree['title'] == subject.title)
+            self.assertEqual(image_subject['material'], material_data)
+        snapshot_subjects = LessonSnapshot.objects.get(lesson_id=1).tree['subjects']
+        snapshot_subject = next(tree for tree in snapshot_subjects if tree['title'] == subject.title)
+        self.assertFalse(snapshot_subject['material']['images'][0]['image'].startswith('http'))
+
+    def test_course_tree_view_reads_fresh_snapshot_by_one_query_after_validators(self):
+        self.get_course_tree()
+        with self.assertNumQueries(2):
+            self.get_course_tree()
+
+    def test_course_tree_view_rebuilds_snapshot_on_task_save(self):
+        version = self.get_course_tree(materials='full').data['version']
+        quiz_material = QuizMaterial.objects.get(topic='Add task')
+        Task.objects.create(
+            question='Hello my name is _____', answers=[{'answer_text': 'John'}], quiz_material=quiz_material,
+        )
+        response = self.get_course_tree(materials='full')
+        subjects = response.data['lessons'][0]['subjects']
+        quiz_subject = next(subject for subject in subjects if subject['title'] == 'Quiz subject')
+        self.assertNotEqual(response.data['version'], version)
+        self.assertEqual(len(quiz_subject['material']['tasks']), 2)
+
+
+class ConditionalGetTest(TestViewSetUp):
+
+    request_factory = APIRequestFactory()
+
+    def get_lessons(self, **headers):
+        request = self.request_factory.get(reverse('lesson-list'), **headers)
+        view = LessonViewSet.as_view({'get': 'list'})
+        return view(request)
+
+    def test_lesson_list_view_returns_etag_and_last_modified(self):
+        response = self.get_lessons()
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+
+    def test_lesson_list_view_returns_not_modified_by_one_query(self):
+        etag = self.get_lessons()['ETag']
+        with self.assertNumQueries(1):
+            response = self.get_lessons(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_lesson_list_view_changes_etag_on_subject_save(self):
+        etag = self.get_lessons()['ETag']
+        subject = Subject.objects.get(title='Empty subject')
+        subject.title = 'Renamed subject'
+        subject.save()
+        response = self.get_lessons(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_subject_list_view_keeps_etag_on_unrelated_save(self):
+        request = self.request_factory.get(reverse('subject-list'))
+        etag = SubjectListView.as_view()(request)['ETag']
+        VideoMaterial.objects.filter(url='http://sample_video.com').first().save()
+        request = self.request_factory.get(reverse('subject-list'), HTTP_IF_NONE_MATCH=etag)
+        response = SubjectListView.as_view()(request)
+        self.assertEqual(response.status_code, HTTP_304_NOT_MODIFIED)
+
+    def test_subject_list_view_changes_etag_on_delete_of_lesson(self):
+        request = self.request_factory.get(reverse('subject-list'))
+        etag = SubjectListView.as_view()(request)['ETag']
+        Lesson.objects.get(pk=1).delete()
+        request = self.request_factory.get(reverse('subject-list'), HTTP_IF_NONE_MATCH=etag)
+        response = SubjectListView.as_view()(request)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual({subject['lesson'] for subject in response.data}, {None})
+
+    def test_detail_view_returns_not_found_for_missing_object_on_conditional_request(self):
+        view = QuizMaterialViewSet.as_view({'get': 'retrieve'})
+        pk = QuizMaterial.objects.get().pk
+        etag = view(self.request_factory.get(reverse('quiz-material-detail', args=[pk])), pk=pk)['ETag']
+        request = self.request_factory.get(reverse('quiz-material-detail', args=[pk + 1]), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(view(request, pk=pk + 1).status_code, HTTP_404_NOT_FOUND)
+
+    def test_etag_depends_on_media_type(self):
+        response = self.get_lessons()
+        html_request = self.request_factory.get(reverse('lesson-list'), HTTP_ACCEPT='text/html')
+        html_response = LessonViewSet.as_view({'get': 'list'})(html_request)
+        self.assertEqual(html_response['Content-Type'], 'text/html; charset=utf-8')
+        self.assertNotEqual(html_response['ETag'], response['ETag'])
+        self.assertIn('Accept', response['Vary'])
+        response = self.get_lessons(HTTP_IF_NONE_MATCH=html_response['ETag'])
+        self.assertEqual(response.status_code, HTTP_200_OK)
+
+
+class KeysetPaginationTest(TestViewSetUp):
+
+    request_factory = APIRequestFactory()
+
+    def get_subjects(self, **params):
+        request = self.request_factory.get(reverse('subject-list'), params)
+        view = SubjectListView.as_view()
+        return view(request)
+
+    def test_subject_list_view_walks_all_pages_by_cursor(self):
+        lesson = Lesson.objects.create(numeral=2, title='Sample lesson #2')
+        Subject.objects.create(numeral=1, lesson=lesson, title='Second lesson subject')
+        Subject.objects.create(numeral=1, lesson=None, title='Subject without lesson #1')
+        Subject.objects.create(numeral=1, lesson=None, title='Subject without lesson #2')
+        titles = []
+        params = {'page_size': 3}
+        while True:
+            response = self.get_subjects(**params)
+            self.assertEqual(response.status_code, HTTP_200_OK)
+            self.assertLessEqual(len(response.data), 3)
+            titles.extend(subject['title'] for subject in response.data)
+            if 'X-Next-Cursor' not in response:
+                break
+            params['cursor'] = response['X-Next-Cursor']
+        expected_titles = list(Subject.objects.order_by('lesson_id', 'numeral', 'id').values_list('title', flat=True))
+        self.assertEqual(titles, expected_titles)
+
+    def test_subject_list_view_returns_page_of_requested_size(self):
+        response = self.get_subjects(page_size=1)
+        self.assertEqual(len(response.data), 1)
+        self.assertIn('rel="next"', response['Link'])
+
+    def test_subject_list_view_returns_not_found_on_invalid_cursor(self):
+        response = self.get_subjects(cursor='invalid')
+        self.assertEqual(response.status_code, HTTP_404_NOT_FOUND)
+
+    def test_subject_list_view_returns_not_found_on_cursor_with_wrong_types(self):
+        for position in ([1, 'abc', 1], [1, 1, {}], [[], 1, 1]):
+            cursor = KeysetPagination.encode_cursor(position)
+            response = self.get_subjects(cursor=cursor)
+            self.assertEqual(response.status_code, HTTP_404_NOT_FOUND, position)
+
+
+class StreamingListTest(TestViewSetUp):
+
+    request_factory = APIRequestFactory()
+
+    def get_list(self, view, url, **params):
+        request = self.request_factory.get(url, params)
+        response = view(request)
+        if response.streaming:
+            return response, json.loads(b''.join(response.streaming_content))
+        response.render()
+        return response, json.loads(response.content)
+
+    def test_streamed_subject_list_is_the_same_as_all_pages(self):
+        view = SubjectListView.as_view()
+        Subject.objects.create(numeral=1, lesson=None, title='Subject without lesson')
+        response, streamed = self.get_list(view, reverse('subject-list'), stream=1)
+        self.assertTrue(response.streaming)
+        self.assertIn('ETag', response)
+        _, listed = self.get_list(view, reverse('subject-list'), page_size=1000)
+        self.assertEqual(streamed, listed)
+
+    def test_streamed_quiz_list_prefetches_tasks_by_chunk(self):
+        lesson = Lesson.objects.get(numeral=1)
+        for numeral in range(8, 11):
+            subject = Subject.objects.create(numeral=numeral, lesson=lesson, title=f'Quiz subject #{numeral}')
+            quiz_material = QuizMaterial.objects.create(subject=subject, topic='Quiz')
+            Task.objects.create(question='Question', answers=[{'answer_text': 'A', 'correct': True}],
+                                quiz_material=quiz_material)
+        view = QuizMaterialViewSet.as_view({'get': 'list'})
+        view.cls.stream_chunk_size = 2
+        self.addCleanup(setattr, view.cls, 'stream_chunk_size', 500)
+        # Validators, server side cursor of materials and tasks of two chunks
+        with self.assertNumQueries(4):
+            _, streamed = self.get_list(view, reverse('quiz-material-list'), stream=1)
+        self.assertEqual(len(streamed), 4)
+        self.assertEqual([len(material['tasks']) for material in streamed], [1, 1, 1, 1])
+
+    def test_whole_list_is_returned_under_asgi(self):
+        _, listed = self.get_list(SubjectListView.as_view(), reverse('subject-list'), page_size=1000)
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {'type': 'http', 'method': 'GET', 'path': reverse('subject-list'), 'query_string': b'stream=1'}
+        # Like test client, connection of test transaction is kept open
+        request_started.disconnect(close_old_connections)
+        self.addCleanup(request_started.connect, close_old_connections)
+        # Response is iterated by ASGIHandler in event loop, where ORM can not be used
+        async_to_sync(ASGIHandler())(scope, receive, send)
+        self.assertEqual(messages[0]['status'], HTTP_200_OK)
+        content = b''.join(message.get('body', b'') for message in messages[1:])
+        self.assertEqual(json.loads(content), listed)
+        self.assertIn((b'Content-Length', str(len(content)).encode()), messages[0]['headers'])
+
+    def test_streamed_empty_list(self):
+        QuizMaterial.objects.all().delete()
+        view = QuizMaterialViewSet.as_view({'get': 'list'})
+        _, streamed = self.get_list(view, reverse('quiz-material-list'), stream=1)
+        self.assertEqual(streamed, [])
+
+
+class LessonReorderTest(TestViewSetUp):
+
+    request_factory = APIRequestFactory()
+
+    def reorder(self, data):
+        request = self.request_factory.post(reverse('lesson-reorder', args=[1]), data, format='json')
+        return LessonViewSet.as_view({'post': 'reorder'})(request, pk=1)
+
+    def test_reorder_permutes_numerals_by_one_update(self):
+        subject_pks = list(Subject.objects.filter(lesson_id=1).order_by('numeral').values_list('pk', flat=True))
+        get_course_tree()
+        self.assertIsNotNone(LessonSnapshot.objects.get(lesson_id=1).tree)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.reorder({'subjects': subject_pks[::-1]})
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "qazline_subject"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(
+            list(Subject.objects.filter(lesson_id=1).order_by('numeral').values_list('pk', flat=True)),
+            subject_pks[::-1],
+        )
+        self.assertEqual([subject['numeral'] for subject in response.data['subjects']], list(range(1, 8)))
+        self.assertEqual(response.data['subjects'][0]['title'], 'Empty subject')
+        self.assertIsNone(LessonSnapshot.objects.get(lesson_id=1).tree)
+
+    def test_reorder_must_contain_every_subject_of_lesson_once(self):
+        subject_pks = list(Subject.objects.filter(lesson_id=1).values_list('pk', flat=True))
+        other_lesson = Lesson.objects.create(numeral=2, title='Other lesson')
+        other_subject = Subject.objects.create(numeral=1, lesson=other_lesson, title='Other subject')
+        for subjects in (subject_pks[1:], subject_pks + [subject_pks[0]], subject_pks + [other_subject.pk], []):
+            response = self.reorder({'subjects': subjects})
+            self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            sorted(Subject.objects.filter(lesson_id=1).values_list('numeral', flat=True)), list(range(1, 8)),
+        )